@@ -0,0 +1,12 @@
+"""
+批量分配模块
+"""
+from .job_queue import JobQueue, JobSpec, Job
+from .runner import BatchRunner
+
+__all__ = [
+    'JobQueue',
+    'JobSpec',
+    'Job',
+    'BatchRunner'
+]
@@ -0,0 +1,382 @@
+"""
+批量分配任务队列 - 基于本地 SQLite 的持久化队列（定时计划 + 待执行任务）
+"""
+import json
+import os
+import socket
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from database.config import CACHE_DIR
+
+# 队列数据库文件
+QUEUE_FILE = os.path.join(CACHE_DIR, "batch_jobs.db")
+
+# 默认最多尝试次数
+DEFAULT_MAX_ATTEMPTS = 3
+
+# 重试间隔（秒），第 n 次失败后等待 RETRY_DELAY × 2^(n-1)
+RETRY_DELAY = 60
+
+# 每晚执行的时刻（时）
+NIGHTLY_HOUR = 2
+
+# 执行租约（秒）：执行中的任务超过该时间没有心跳，视为执行进程已退出，可由其他进程重新领取
+LEASE_SECONDS = 600
+
+# 执行进程刷新心跳的间隔（秒）
+HEARTBEAT_INTERVAL = 60
+
+# 任务状态
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedules (
+    name TEXT PRIMARY KEY,
+    spec TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    next_run REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    spec TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    not_before REAL NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    worker TEXT,
+    heartbeat_at REAL,
+    finished_at REAL,
+    timings TEXT,
+    outputs TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, not_before);
+"""
+
+# 旧版本队列文件缺少的列
+MIGRATIONS = {
+    "worker": "ALTER TABLE jobs ADD COLUMN worker TEXT",
+    "heartbeat_at": "ALTER TABLE jobs ADD COLUMN heartbeat_at REAL",
+}
+
+
+@dataclass
+class JobSpec:
+    """批量分配任务定义"""
+    name: str  # 任务名称
+    plan: str  # 计划文件（CSV/xlsx）
+    strategy: str = "priority"  # 分配策略 priority/kit/optimal
+    snapshot: str = "current"  # 库存来源：current 当前库存 / history 先保存历史版本再分配 / 历史版本号或日期
+    by_partition: bool = False  # 是否按分区分配
+    cross_partition: bool = False  # 按分区分配时是否允许跨分区调拨
+    fixed_point: bool = False  # 是否以定点整数计算分配
+    outputs: List[str] = field(default_factory=list)  # 输出目标：CSV路径（可含 {name}/{date}/{time}）或 "table"
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS  # 最多尝试次数
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "JobSpec":
+        """由 JSON 字典创建（忽略调度相关的键）"""
+        known = {name: data[name] for name in cls.__dataclass_fields__ if name in data}
+        return cls(**known)
+
+
+@dataclass
+class Job:
+    """队列中的一次任务执行"""
+    id: int  # 任务编号
+    spec: JobSpec  # 任务定义
+    status: str  # 状态
+    attempts: int  # 已尝试次数
+    created_at: float  # 入队时间
+    started_at: Optional[float] = None  # 最近一次开始时间
+    worker: Optional[str] = None  # 领取任务的执行进程
+    heartbeat_at: Optional[float] = None  # 执行进程最近一次心跳时间
+    finished_at: Optional[float] = None  # 完成时间
+    timings: Dict[str, float] = field(default_factory=dict)  # 各阶段耗时（秒）
+    outputs: List[str] = field(default_factory=list)  # 已写入的输出
+    error: Optional[str] = None  # 最近一次失败原因
+
+
+def next_run_time(interval: str, after: float) -> float:
+    """
+    计算下一次执行时间
+
+    Args:
+        interval: hourly（每小时整点）/ nightly（每天 NIGHTLY_HOUR 点）/ 秒数
+        after: 从该时间戳之后计算
+
+    Returns:
+        时间戳
+    """
+    moment = datetime.fromtimestamp(after)
+    if interval == "hourly":
+        return (moment.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)).timestamp()
+    if interval == "nightly":
+        run = moment.replace(hour=NIGHTLY_HOUR, minute=0, second=0, microsecond=0)
+        if run <= moment:
+            run += timedelta(days=1)
+        return run.timestamp()
+    return after + float(interval)
+
+
+class JobQueue:
+    """持久化任务队列（多个执行进程可共享同一个队列文件）"""
+
+    def __init__(self, path: str = QUEUE_FILE, worker: Optional[str] = None):
+        """
+        Args:
+            path: SQLite 文件路径
+            worker: 执行进程标识（写入领取的任务）；默认为 主机名:进程号
+        """
+        self.path = path
+        self.worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+            columns = {row["name"] for row in connection.execute("PRAGMA table_info(jobs)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    connection.execute(statement)
+
+    @contextmanager
+    def _connect(self):
+        """每次操作使用独立连接（可在工作线程中调用），用完即关闭"""
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def add_schedule(self, spec: JobSpec, interval: str, start: Optional[float] = None):
+        """
+        新增或更新定时计划
+
+        Args:
+            spec: 任务定义
+            interval: hourly / nightly / 秒数
+            start: 首次执行时间；默认按 interval 计算下一次
+        """
+        next_run = start if start is not None else next_run_time(interval, time.time())
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO schedules (name, spec, interval, next_run) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET spec = excluded.spec, interval = excluded.interval, "
+                "next_run = excluded.next_run",
+                (spec.name, json.dumps(spec.__dict__, ensure_ascii=False), str(interval), next_run)
+            )
+
+    def schedules(self) -> List[Dict]:
+        """全部定时计划"""
+        with self._connect() as connection:
+            return [dict(row) for row in connection.execute("SELECT * FROM schedules ORDER BY name")]
+
+    def enqueue(self, spec: JobSpec, not_before: Optional[float] = None) -> int:
+        """
+        加入一个待执行任务
+
+        Returns:
+            任务编号
+        """
+        now = time.time()
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO jobs (name, spec, status, max_attempts, not_before, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (spec.name, json.dumps(spec.__dict__, ensure_ascii=False), STATUS_PENDING,
+                 spec.max_attempts, not_before or now, now)
+            )
+            return cursor.lastrowid
+
+    def enqueue_schedule(self, name: str) -> int:
+        """立即执行一次定时计划（不影响其下一次执行时间）"""
+        with self._connect() as connection:
+            row = connection.execute("SELECT spec FROM schedules WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise ValueError(f"未找到定时计划: {name}")
+        return self.enqueue(JobSpec.from_dict(json.loads(row["spec"])))
+
+    def enqueue_due(self, now: Optional[float] = None) -> int:
+        """
+        将到期的定时计划加入队列并推算下一次执行时间
+
+        Returns:
+            新加入的任务数
+        """
+        now = now or time.time()
+        count = 0
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                for row in connection.execute(
+                    "SELECT * FROM schedules WHERE next_run <= ?", (now,)
+                ).fetchall():
+                    spec = JobSpec.from_dict(json.loads(row["spec"]))
+                    connection.execute(
+                        "INSERT INTO jobs (name, spec, status, max_attempts, not_before, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (spec.name, row["spec"], STATUS_PENDING, spec.max_attempts, now, now)
+                    )
+                    connection.execute(
+                        "UPDATE schedules SET next_run = ? WHERE name = ?",
+                        (next_run_time(row["interval"], now), row["name"])
+                    )
+                    count += 1
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        return count
+
+    def claim(self, limit: Optional[int] = None, now: Optional[float] = None) -> List[Job]:
+        """
+        领取到期的待执行任务（标记为执行中并记录执行进程和心跳，多个进程不会领到同一任务）
+
+        Args:
+            limit: 最多领取的任务数
+            now: 当前时间戳
+
+        Returns:
+            任务列表
+        """
+        now = now or time.time()
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                query = "SELECT * FROM jobs WHERE status = ? AND not_before <= ? ORDER BY id"
+                params = [STATUS_PENDING, now]
+                if limit:
+                    query += " LIMIT ?"
+                    params.append(limit)
+                rows = connection.execute(query, params).fetchall()
+                connection.executemany(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, worker = ?, "
+                    "heartbeat_at = ? WHERE id = ?",
+                    [(STATUS_RUNNING, now, self.worker, now, row["id"]) for row in rows]
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        return [
+            self._job(
+                row, attempts=row["attempts"] + 1, status=STATUS_RUNNING,
+                started_at=now, worker=self.worker, heartbeat_at=now
+            )
+            for row in rows
+        ]
+
+    def heartbeat(self, jobs: List[Job], now: Optional[float] = None) -> int:
+        """
+        刷新本进程执行中任务的心跳（延长租约）
+
+        Args:
+            jobs: 本进程领取的任务
+            now: 当前时间戳
+
+        Returns:
+            仍由本进程持有的任务数
+        """
+        now = now or time.time()
+        with self._connect() as connection:
+            return connection.executemany(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ? AND worker = ?",
+                [(now, job.id, STATUS_RUNNING, self.worker) for job in jobs]
+            ).rowcount
+
+    def complete(self, job: Job, timings: Dict[str, float], outputs: List[str]) -> bool:
+        """
+        标记任务完成（租约已过期并被其他进程重新领取时不修改）
+
+        Returns:
+            是否仍由本进程持有
+        """
+        with self._connect() as connection:
+            return connection.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, timings = ?, outputs = ?, error = NULL "
+                "WHERE id = ? AND status = ? AND worker = ?",
+                (STATUS_DONE, time.time(), json.dumps(timings), json.dumps(outputs, ensure_ascii=False),
+                 job.id, STATUS_RUNNING, self.worker)
+            ).rowcount > 0
+
+    def fail(self, job: Job, error: str, timings: Optional[Dict[str, float]] = None) -> bool:
+        """
+        记录任务失败：未达到最多尝试次数时延迟重试（租约已过期并被其他进程重新领取时不修改）
+
+        Returns:
+            是否还会重试
+        """
+        retry = job.attempts < job.spec.max_attempts
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, not_before = ?, finished_at = ?, timings = ?, error = ? "
+                "WHERE id = ? AND status = ? AND worker = ?",
+                (
+                    STATUS_PENDING if retry else STATUS_FAILED,
+                    time.time() + RETRY_DELAY * 2 ** (job.attempts - 1),
+                    None if retry else time.time(),
+                    json.dumps(timings or {}),
+                    error,
+                    job.id,
+                    STATUS_RUNNING,
+                    self.worker
+                )
+            )
+        return retry
+
+    def recover(self, now: Optional[float] = None, lease: float = LEASE_SECONDS) -> int:
+        """
+        将租约已过期（执行进程异常退出，超过 lease 秒没有心跳）的执行中任务重新放回队列；
+        其他进程正在执行的任务不受影响
+
+        Args:
+            now: 当前时间戳
+            lease: 租约时长（秒）
+
+        Returns:
+            重新放回队列的任务数
+        """
+        now = now or time.time()
+        with self._connect() as connection:
+            return connection.execute(
+                "UPDATE jobs SET status = ?, worker = NULL WHERE status = ? "
+                "AND COALESCE(heartbeat_at, started_at, 0) < ?",
+                (STATUS_PENDING, STATUS_RUNNING, now - lease)
+            ).rowcount
+
+    def jobs(self, limit: int = 50) -> List[Job]:
+        """最近的任务（新的在前）"""
+        with self._connect() as connection:
+            rows = connection.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [self._job(row) for row in rows]
+
+    @staticmethod
+    def _job(row: sqlite3.Row, **overrides) -> Job:
+        values = dict(
+            id=row["id"],
+            spec=JobSpec.from_dict(json.loads(row["spec"])),
+            status=row["status"],
+            attempts=row["attempts"],
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            worker=row["worker"],
+            heartbeat_at=row["heartbeat_at"],
+            finished_at=row["finished_at"],
+            timings=json.loads(row["timings"]) if row["timings"] else {},
+            outputs=json.loads(row["outputs"]) if row["outputs"] else [],
+            error=row["error"]
+        )
+        values.update(overrides)
+        return Job(**values)
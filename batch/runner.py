@@ -0,0 +1,272 @@
+"""
+批量分配执行器 - 按周期领取队列中的任务，同一周期内共享BOM和库存加载，由工作线程池并行分配
+"""
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from core.allocation import InventoryAllocator, STRATEGIES
+from core.history import inventory_history
+from core.partition import PartitionedAllocator
+from core.plan_import import PlanImporter, PlanRunResult, read_plan_lines
+from batch.job_queue import JobQueue, Job, HEARTBEAT_INTERVAL
+
+# 默认工作线程数
+DEFAULT_BATCH_WORKERS = 4
+
+# 队列轮询间隔（秒）
+POLL_INTERVAL = 30
+
+
+@dataclass
+class CyclePlan:
+    """单个任务在本周期中的准备结果"""
+    lines: list = field(default_factory=list)  # 有效计划行
+    configs: list = field(default_factory=list)  # 机型配置
+    errors: List[str] = field(default_factory=list)  # 被跳过的行
+    timings: Dict[str, float] = field(default_factory=dict)  # 各阶段耗时（含共享加载）
+    allocator: object = None  # 共享的分配器
+    inventory_version: str = ""  # 使用的库存版本
+    error: Optional[str] = None  # 准备失败的原因
+
+
+class BatchRunner:
+    """批量分配执行器"""
+
+    def __init__(self, db_manager, queue: Optional[JobQueue] = None, workers: int = DEFAULT_BATCH_WORKERS):
+        """
+        Args:
+            db_manager: 已连接的数据库管理器
+            queue: 任务队列；默认使用本地队列文件
+            workers: 工作线程数
+        """
+        self.db_manager = db_manager
+        self.queue = queue or JobQueue()
+        self.workers = workers
+        self.importer = PlanImporter(db_manager)
+
+    def run_forever(self, poll_interval: float = POLL_INTERVAL):
+        """持续执行：每个周期加入到期的定时计划并执行全部到期任务"""
+        while True:
+            self.run_cycle()
+            time.sleep(poll_interval)
+
+    def run_cycle(self) -> List[Job]:
+        """
+        执行一个周期（先重新排队租约已过期的任务）
+
+        Returns:
+            本周期领取的任务
+        """
+        recovered = self.queue.recover()
+        if recovered:
+            print(f"重新排队 {recovered} 个执行进程已退出的任务")
+        self.queue.enqueue_due()
+        jobs = self.queue.claim()
+        if not jobs:
+            return []
+
+        started = time.perf_counter()
+        # 执行期间定时刷新心跳，其他执行进程不会把这些任务当作遗留任务重新领取
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(jobs, stop), daemon=True)
+        heartbeat.start()
+        try:
+            plans = self.prepare(jobs)
+            with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(jobs)))) as executor:
+                list(executor.map(lambda job: self.run_job(job, plans[job.id]), jobs))
+        finally:
+            stop.set()
+            heartbeat.join()
+        print(f"批量周期完成：{len(jobs)} 个任务，耗时 {time.perf_counter() - started:.2f} 秒")
+        return jobs
+
+    def _heartbeat(self, jobs: List[Job], stop: threading.Event, interval: float = HEARTBEAT_INTERVAL):
+        """心跳线程：每 interval 秒刷新一次本周期任务的心跳，直到 stop 被设置"""
+        while not stop.wait(interval):
+            try:
+                self.queue.heartbeat(jobs)
+            except Exception as e:
+                print(f"刷新任务心跳失败: {e}")
+
+    def prepare(self, jobs: List[Job]) -> Dict[int, CyclePlan]:
+        """
+        读取各任务的计划文件，合并查询BOM，并按库存来源共享加载库存
+
+        Args:
+            jobs: 本周期的任务
+
+        Returns:
+            {任务编号: 准备结果}
+        """
+        plans = {job.id: CyclePlan() for job in jobs}
+        for job in jobs:
+            plan = plans[job.id]
+            started = time.perf_counter()
+            try:
+                plan.lines = list(read_plan_lines(job.spec.plan, plan.errors))
+            except (OSError, ValueError) as e:
+                plan.error = f"读取计划文件失败: {e}"
+            plan.timings["read"] = time.perf_counter() - started
+
+        active = [job for job in jobs if plans[job.id].error is None]
+        started = time.perf_counter()
+        try:
+            bom_items = self.importer.load_bom_items(
+                {line.model_code for job in active for line in plans[job.id].lines}
+            )
+        except Exception as e:
+            for job in active:
+                plans[job.id].error = f"加载BOM失败: {e}"
+            return plans
+        shared_bom = time.perf_counter() - started
+
+        groups: Dict[Tuple, List[Job]] = {}
+        for job in active:
+            plan = plans[job.id]
+            plan.timings["bom"] = shared_bom
+            plan.lines, plan.configs = PlanImporter.build_configs(
+                plan.lines, bom_items, plan.errors, job.spec.by_partition
+            )
+            groups.setdefault(self._inventory_key(job), []).append(job)
+
+        # 相同库存来源的任务共用一次库存加载
+        for key, group in groups.items():
+            started = time.perf_counter()
+            try:
+                allocator, version = self._load_inventory(key, [plans[job.id] for job in group])
+            except Exception as e:
+                for job in group:
+                    plans[job.id].error = f"加载库存失败: {e}"
+                continue
+            elapsed = time.perf_counter() - started
+            for job in group:
+                plans[job.id].allocator = allocator
+                plans[job.id].inventory_version = version
+                plans[job.id].timings["inventory"] = elapsed
+        return plans
+
+    @staticmethod
+    def _inventory_key(job: Job) -> Tuple:
+        """任务的库存来源：("partition",) / ("current",) / ("history",) / ("version", 版本号或日期)"""
+        if job.spec.by_partition:
+            return ("partition",)
+        if job.spec.snapshot in ("current", "history"):
+            return (job.spec.snapshot,)
+        return ("version", job.spec.snapshot)
+
+    def _load_inventory(self, key: Tuple, plans: List[CyclePlan]):
+        """按库存来源加载共享的分配器"""
+        material_codes = InventoryAllocator.collect_material_codes(
+            *(config for plan in plans for config in plan.configs)
+        )
+        if key[0] == "partition":
+            allocator = PartitionedAllocator(self.db_manager, material_codes)
+            if material_codes and not allocator.inventory_data:
+                raise RuntimeError("未读取到分区库存")
+            return allocator, ""
+        if key[0] == "current":
+            allocator = InventoryAllocator(self.db_manager, material_codes)
+            if material_codes and not allocator.inventory_data:
+                raise RuntimeError("未读取到库存")
+            return allocator, allocator.inventory_version
+        if key[0] == "history":
+            # 先保存当前库存为历史版本，本周期结果可按该版本重放
+            version = inventory_history.capture(self.db_manager)
+        else:
+            version = inventory_history.resolve(key[1])
+        allocator = InventoryAllocator(
+            self.db_manager,
+            inventory_data=inventory_history.load(version.version),
+            inventory_version=version.fingerprint
+        )
+        return allocator, version.version
+
+    def run_job(self, job: Job, plan: CyclePlan):
+        """执行单个任务并写入输出；失败时按重试策略重新排队"""
+        spec = job.spec
+        try:
+            if plan.error:
+                raise RuntimeError(plan.error)
+            if spec.strategy not in STRATEGIES:
+                raise ValueError(f"未知的分配策略: {spec.strategy}")
+            options = STRATEGIES[spec.strategy]
+            if not plan.configs:
+                result = PlanRunResult(plan.lines, [], plan.errors, plan.timings)
+            elif spec.by_partition:
+                result = PlanImporter.allocate_partitioned(
+                    plan.lines, plan.configs, plan.allocator,
+                    options.get("kit_aware", False), options.get("optimal", False),
+                    spec.cross_partition, plan.errors, plan.timings, spec.fixed_point
+                )
+            else:
+                result = PlanImporter.allocate(
+                    plan.lines, plan.configs, plan.allocator,
+                    options.get("kit_aware", False), options.get("optimal", False),
+                    plan.errors, plan.timings, spec.fixed_point
+                )
+
+            started = time.perf_counter()
+            outputs = self.write_outputs(job, result, plan.inventory_version)
+            plan.timings["output"] = time.perf_counter() - started
+            if not self.queue.complete(job, plan.timings, outputs):
+                print(f"任务 {job.id} {spec.name} 的执行租约已过期，已由其他执行进程重新领取")
+                return
+            print(f"任务 {job.id} {spec.name} 完成：{len(result)} 个计划行，跳过 {len(result.errors)} 行")
+        except Exception as e:
+            retry = self.queue.fail(job, f"{e}\n{traceback.format_exc()}", plan.timings)
+            print(f"任务 {job.id} {spec.name} 失败（第 {job.attempts} 次{'，稍后重试' if retry else ''}）: {e}")
+
+    def write_outputs(self, job: Job, result: PlanRunResult, inventory_version: str) -> List[str]:
+        """
+        写入任务的各输出目标
+
+        Args:
+            job: 任务
+            result: 分配结果
+            inventory_version: 使用的库存版本
+
+        Returns:
+            已写入的输出（文件路径或表名）
+        """
+        from database.config import TABLE_ALLOCATION_RESULT
+
+        now = datetime.now()
+        written = []
+        for target in job.spec.outputs:
+            if target == "table":
+                rows = [
+                    {
+                        "RunTime": now,
+                        "JobId": job.id,
+                        "JobName": job.spec.name,
+                        "InventoryVersion": inventory_version,
+                        "ModelCode": code,
+                        "PlanQuantity": quantity,
+                        "Priority": priority,
+                        "PartitionName": partition,
+                        "BuildableQuantity": units,
+                        "SatisfactionRate": round(rate, 4),
+                        "BottleneckMaterial": bottleneck or "",
+                    }
+                    for code, quantity, priority, units, rate, bottleneck, partition, _ in result.rows()
+                ]
+                # 重试时先删除本任务上次写入的行，结果表中每个任务只保留一份结果
+                if not self.db_manager.write_allocation_results(rows, replace_job=job.id):
+                    raise RuntimeError(f"写入 {TABLE_ALLOCATION_RESULT} 失败")
+                written.append(TABLE_ALLOCATION_RESULT)
+            else:
+                path = target.format(
+                    name=job.spec.name, job=job.id,
+                    date=now.strftime("%Y%m%d"), time=now.strftime("%H%M%S")
+                )
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                result.to_csv(path)
+                written.append(path)
+        return written
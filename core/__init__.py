@@ -1,10 +1,54 @@
 """
 核心业务逻辑模块
 """
-from .allocation import InventoryAllocator
+from .allocation import InventoryAllocator, STRATEGIES
 from .calculator import SatisfactionCalculator
+from .scheduler import PriorityScheduler
+from .optimizer import OptimalAllocator
+from .bom_matrix import BOMMatrix
+from .simulation import MonteCarloSimulator, SimulationResult
+from .sensitivity import SensitivityAnalyzer, ModelSensitivity
+from .snapshot import InventorySnapshot
+from .result_cache import ResultCache, result_cache
+from .trace import TraceRecorder, TraceLog
+from .plan_import import PlanImporter, PlanRunResult
+from .partition import PartitionedAllocator, PartitionAllocation, PartitionSummary
+from .comparison import RunComparison, ModelDelta, compare_results
+from .memory import MemoryMonitor, MemoryBudgetExceeded, memory_monitor
+from .history import InventoryHistory, HistoryVersion, inventory_history
+from .buildability import BuildabilityReport, compute_buildability, build_report
 
 __all__ = [
     'InventoryAllocator',
-    'SatisfactionCalculator'
+    'STRATEGIES',
+    'SatisfactionCalculator',
+    'PriorityScheduler',
+    'OptimalAllocator',
+    'MonteCarloSimulator',
+    'SimulationResult',
+    'SensitivityAnalyzer',
+    'ModelSensitivity',
+    'InventorySnapshot',
+    'ResultCache',
+    'result_cache',
+    'TraceRecorder',
+    'TraceLog',
+    'PlanImporter',
+    'PlanRunResult',
+    'PartitionedAllocator',
+    'PartitionAllocation',
+    'PartitionSummary',
+    'RunComparison',
+    'ModelDelta',
+    'compare_results',
+    'MemoryMonitor',
+    'MemoryBudgetExceeded',
+    'memory_monitor',
+    'InventoryHistory',
+    'HistoryVersion',
+    'inventory_history',
+    'BOMMatrix',
+    'BuildabilityReport',
+    'compute_buildability',
+    'build_report'
 ]
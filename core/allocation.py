@@ -1,233 +1,272 @@
 """
 库存分配算法 - 核心业务逻辑
 """
+import copy
+from itertools import islice
 from typing import Dict, List
-from database.models import ModelConfig, BOMItem, AllocationResult, MaterialAllocation
+from database.models import ModelConfig
+from core.scheduler import PriorityScheduler
+from core.optimizer import OptimalAllocator
+from core.result_cache import inventory_fingerprint
+from core.memory import memory_monitor, MemoryBudgetExceeded
+
+# 加载库存时每读取多少行检查一次内存预算
+MEMORY_CHECK_ROWS = 10000
+
+# 分配过程中同时存在的 机型×物料 矩阵个数（需求、层级、分配及中间结果），用于预估内存
+ALLOCATION_MATRIX_COPIES = 8
+
+# 分配策略名称 -> InventoryAllocator.allocate_models 的参数（分配服务和批量任务共用）
+STRATEGIES = {
+    "priority": {},
+    "kit": {"kit_aware": True},
+    "optimal": {"optimal": True},
+}
 
 
 class InventoryAllocator:
     """库存分配器"""
     
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, material_codes=None, inventory_data=None, inventory_version=None):
         """
         初始化分配器
         
         Args:
             db_manager: 数据库管理器实例
+            material_codes: 需要加载库存的物料编码；为 None 时加载全部库存
+            inventory_data: 已有的库存数据（如共享内存快照的库存视图），提供时不访问数据库
+            inventory_version: inventory_data 的版本；为空时按内容计算
         """
         self.db_manager = db_manager
         self.inventory_data = {}
-        self.load_inventory_data()
+        self.loaded_materials = set()  # 已查询过库存的物料；None 表示已加载全部库存
+        self.inventory_version = None  # 库存内容版本，用于分配结果缓存
+        self.trace = None  # 可选的 TraceRecorder，设置后记录每个分配决策
+        if inventory_data is not None:
+            self.inventory_data = inventory_data
+            self.loaded_materials = None
+            self.inventory_version = inventory_version or inventory_fingerprint(inventory_data)
+        else:
+            self.load_inventory_data(material_codes)
+    
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """
+        基于共享内存快照创建分配器（零拷贝，不访问数据库）
+        
+        Args:
+            snapshot: 已挂载的 InventorySnapshot
+        """
+        return cls(None, inventory_data=snapshot.inventory, inventory_version=snapshot.version)
+    
+    def copy(self) -> "InventoryAllocator":
+        """
+        复制分配器：库存缓存独立，副本补充加载库存不影响原分配器（可在后台线程中使用）
+        
+        Returns:
+            分配器副本
+        """
+        clone = copy.copy(self)
+        if self.loaded_materials is not None:
+            clone.inventory_data = dict(self.inventory_data)
+            clone.loaded_materials = set(self.loaded_materials)
+        return clone
     
-    def load_inventory_data(self):
-        """加载库存数据"""
+    def load_inventory_data(self, material_codes=None):
+        """
+        加载库存数据（流式读取，仅保留分配涉及的物料）
+        
+        Args:
+            material_codes: 需要加载库存的物料编码；为 None 时加载全部库存
+
+        Returns:
+            是否加载成功（失败时库存为空）
+        """
+        loaded = False
         try:
-            inventory_rows = self.db_manager.get_inventory_data()
-            if inventory_rows:
-                self.inventory_data = {
-                    row[0]: row[1] if row[1] else 0.0
-                    for row in inventory_rows
-                }
+            with memory_monitor.stage("load"):
+                self.inventory_data = {}
+                rows = self.db_manager.get_inventory_data(material_codes)
+                while True:
+                    # 分块读取，每块之后检查内存预算（超出时中止加载）
+                    chunk = {
+                        matnr: clabs if clabs else 0.0
+                        for matnr, clabs in islice(rows, MEMORY_CHECK_ROWS)
+                    }
+                    self.inventory_data.update(chunk)
+                    memory_monitor.check("load")
+                    if len(chunk) < MEMORY_CHECK_ROWS:
+                        break
+            self.loaded_materials = None if material_codes is None else set(material_codes)
+            loaded = True
+        except MemoryBudgetExceeded:
+            self.inventory_data = {}
+            self.loaded_materials = set()
+            raise
         except Exception as e:
             print(f"加载库存数据失败: {e}")
             self.inventory_data = {}
+            self.loaded_materials = set()
+        self.inventory_version = inventory_fingerprint(self.inventory_data)
+        return loaded
     
-    def allocate(self, config_a: ModelConfig, config_b: ModelConfig) -> Dict:
+    def load_missing_inventory(self, material_codes):
+        """
+        补充加载缓存中尚未包含的物料库存，已加载的物料沿用缓存
+        
+        Args:
+            material_codes: 本次分配涉及的物料编码
+
+        Returns:
+            是否加载成功（失败时缓存保持不变）
+        """
+        if self.loaded_materials is None:
+            return True
+        missing = set(material_codes) - self.loaded_materials
+        if not missing:
+            return True
+        try:
+            # 全部读取完成后才并入缓存，查询中途失败时这些物料下次重新查询
+            loaded = {
+                matnr: clabs if clabs else 0.0
+                for matnr, clabs in self.db_manager.get_inventory_data(missing)
+            }
+        except Exception as e:
+            print(f"加载库存数据失败: {e}")
+            return False
+        self.inventory_data.update(loaded)
+        self.loaded_materials |= missing
+        self.inventory_version = inventory_fingerprint(self.inventory_data)
+        return True
+    
+    @staticmethod
+    def collect_material_codes(*configs: ModelConfig) -> set:
+        """汇总各机型BOM涉及的物料编码"""
+        return {
+            item.component_item_number
+            for config in configs
+            for item in config.bom_items
+        }
+    
+    def allocate(
+        self,
+        config_a: ModelConfig,
+        config_b: ModelConfig,
+        kit_aware: bool = False,
+        optimal: bool = False,
+        fixed_point: bool = False
+    ) -> Dict:
         """
         执行库存分配
         
         Args:
             config_a: 机型A配置
             config_b: 机型B配置
+            kit_aware: 是否齐套分配
+            optimal: 是否按加权可制造数量最大求最优分配
+            fixed_point: 是否以定点整数计算分配
             
         Returns:
             分配结果字典，包含两个机型的分配结果和物料分配详情
         """
-        # 1. 识别共用物料和专属物料
-        materials_a = self._extract_materials(config_a.bom_items)
-        materials_b = self._extract_materials(config_b.bom_items)
-        
-        shared_materials = self._find_shared_materials(materials_a, materials_b)
-        exclusive_materials_a = self._find_exclusive_materials(materials_a, materials_b)
-        exclusive_materials_b = self._find_exclusive_materials(materials_b, materials_a)
-        
-        # 2. 计算各机型的物料需求
-        requirements_a = self._calculate_requirements(config_a)
-        requirements_b = self._calculate_requirements(config_b)
+        allocation = self.allocate_models([config_a, config_b], kit_aware, optimal, fixed_point)
+        allocation_a, allocation_b = allocation['models']
         
-        # 3. 分配库存
-        # 先分配专属物料
-        allocated_exclusive_a = self._allocate_exclusive(
-            exclusive_materials_a, requirements_a
-        )
-        allocated_exclusive_b = self._allocate_exclusive(
-            exclusive_materials_b, requirements_b
-        )
-        
-        # 再按优先级分配共用物料
-        allocated_shared = self._allocate_shared_materials(
-            shared_materials,
-            requirements_a,
-            requirements_b,
-            config_a.priority,
-            config_b.priority
-        )
-        
-        # 4. 合并分配结果
-        final_allocation_a = self._merge_allocation(
-            allocated_exclusive_a,
-            allocated_shared.get('model_a', {})
-        )
-        final_allocation_b = self._merge_allocation(
-            allocated_exclusive_b,
-            allocated_shared.get('model_b', {})
-        )
-        
-        # 5. 计算物料分配详情（用于展示）
-        materials_detail = self._calculate_materials_detail(
-            shared_materials,
-            allocated_shared,
-            requirements_a,
-            requirements_b
-        )
+        # 物料分配详情（用于展示）
+        materials_detail = {}
+        for material_code, detail in allocation['materials'].items():
+            allocated_a, allocated_b = detail['allocated']
+            materials_detail[material_code] = {
+                'total_inventory': detail['total_inventory'],
+                'allocated_a': allocated_a,
+                'allocated_b': allocated_b
+            }
         
-        # 6. 返回分配结果
         return {
-            'model_a': final_allocation_a,
-            'model_b': final_allocation_b,
+            'model_a': allocation_a,
+            'model_b': allocation_b,
             'materials': materials_detail
         }
     
-    def _extract_materials(self, bom_items: List[BOMItem]) -> Dict[str, float]:
-        """从BOM项目中提取物料清单"""
-        return {
-            item.component_item_number: item.component_num
-            for item in bom_items
-        }
-    
-    def _find_shared_materials(self, materials_a: Dict, materials_b: Dict) -> set:
-        """找出共用物料"""
-        return set(materials_a.keys()) & set(materials_b.keys())
-    
-    def _find_exclusive_materials(self, materials_a: Dict, materials_b: Dict) -> set:
-        """找出专属物料"""
-        return set(materials_a.keys()) - set(materials_b.keys())
-    
-    def _calculate_requirements(self, config: ModelConfig) -> Dict[str, float]:
-        """计算机型物料需求（考虑制造数量）"""
-        requirements = {}
-        for item in config.bom_items:
-            material_code = item.component_item_number
-            quantity_per_unit = item.component_num
-            total_required = quantity_per_unit * config.plan_quantity
-            requirements[material_code] = total_required
-        return requirements
-    
-    def _allocate_exclusive(self, exclusive_materials: set, requirements: Dict) -> Dict[str, float]:
-        """分配专属物料"""
-        allocation = {}
-        for material_code in exclusive_materials:
-            required_qty = requirements.get(material_code, 0)
-            available_qty = self.inventory_data.get(material_code, 0)
-            
-            # 分配可用库存，最多分配到需求量
-            allocated_qty = min(required_qty, available_qty)
-            allocation[material_code] = allocated_qty
-        
-        return allocation
-    
-    def _allocate_shared_materials(
+    def allocate_models(
         self,
-        shared_materials: set,
-        requirements_a: Dict,
-        requirements_b: Dict,
-        priority_a: int,
-        priority_b: int
+        configs: List[ModelConfig],
+        kit_aware: bool = False,
+        optimal: bool = False,
+        fixed_point: bool = False
     ) -> Dict:
         """
-        按优先级分配共用物料
+        多机型按优先级层级分配库存
+        
+        专属物料只有一个使用方，按层级分配时自然得到 min(需求, 库存)；
+        共用物料按优先级从高到低逐层分配，同一层级的机型按需求量等比例分配。
+        齐套分配模式下，机型受其他物料限制而用不上的共用物料会让给低层级机型。
+        最优分配模式下，以优先级换算的权重求加权可制造数量最大的整数规划解。
         
         Args:
-            shared_materials: 共用物料集合
-            requirements_a: 机型A的需求
-            requirements_b: 机型B的需求
-            priority_a: 机型A的优先级（数字越小优先级越高）
-            priority_b: 机型B的优先级
+            configs: 机型配置列表
+            kit_aware: 是否齐套分配
+            optimal: 是否求最优分配（优先于 kit_aware）
+            fixed_point: 是否以定点整数计算分配（库存和单台用量按物料精度缩放为 int64，结果精确）
             
         Returns:
-            分配结果 {'model_a': {...}, 'model_b': {...}, 'material_detail': {...}}
+            {'models': [各机型 {物料编码: 分配数量}], 'materials': {物料编码: 分配详情}}
         """
-        allocation_a = {}
-        allocation_b = {}
-        
-        # 按优先级排序机型
-        models = [
-            ('A', requirements_a, priority_a, allocation_a),
-            ('B', requirements_b, priority_b, allocation_b)
-        ]
-        models.sort(key=lambda x: x[2])  # 按优先级排序（数字越小优先级越高）
-        
-        # 逐个分配共用物料
-        for material_code in shared_materials:
-            total_inventory = self.inventory_data.get(material_code, 0)
-            remaining_inventory = total_inventory
+        with memory_monitor.stage("allocate"):
+            scheduler = PriorityScheduler(configs, fixed_point)
+            allocation = self.allocation_matrix(scheduler, kit_aware, optimal)
+            materials_detail = self._calculate_materials_detail(scheduler, allocation)
             
-            # 按优先级依次分配
-            for model_name, requirements, priority, allocation in models:
-                if remaining_inventory <= 0:
-                    break
-                
-                required_qty = requirements.get(material_code, 0)
-                if required_qty > 0:
-                    # 分配可用库存，最多分配到需求量
-                    allocated_qty = min(required_qty, remaining_inventory)
-                    allocation[material_code] = allocated_qty
-                    remaining_inventory -= allocated_qty
-        
-        return {
-            'model_a': allocation_a,
-            'model_b': allocation_b
-        }
-    
-    def _merge_allocation(self, base: Dict, additional: Dict) -> Dict:
-        """合并两次分配的结果"""
-        merged = base.copy()
-        for material_code, qty in additional.items():
-            if material_code in merged:
-                merged[material_code] += qty
-            else:
-                merged[material_code] = qty
-        return merged
+            return {
+                'models': scheduler.to_material_dicts(allocation),
+                'materials': materials_detail
+            }
     
-    def _calculate_materials_detail(
+    def allocation_matrix(
         self,
-        shared_materials: set,
-        allocated_shared: Dict,
-        requirements_a: Dict,
-        requirements_b: Dict
-    ) -> Dict:
+        scheduler: PriorityScheduler,
+        kit_aware: bool = False,
+        optimal: bool = False
+    ):
+        """
+        按所选策略计算分配矩阵
+        
+        Args:
+            scheduler: 优先级调度器
+            kit_aware: 是否齐套分配
+            optimal: 是否求最优分配（优先于 kit_aware）
+            
+        Returns:
+            分配矩阵，形状 (机型数, 物料数)
+        """
+        memory_monitor.check("allocate", scheduler.per_unit.nbytes * ALLOCATION_MATRIX_COPIES)
+        inventory = scheduler.inventory_vector(self.inventory_data)
+        if optimal:
+            allocation = OptimalAllocator(scheduler).allocate(inventory)
+            if self.trace is not None:
+                scheduler.record_trace(self.trace, inventory, allocation)
+            return allocation
+        return scheduler.allocate(inventory, kit_aware=kit_aware, trace=self.trace)
+    
+    def _calculate_materials_detail(self, scheduler: PriorityScheduler, allocation) -> Dict:
         """计算物料分配详情（用于展示）"""
         materials_detail = {}
+        model_count = len(scheduler.configs)
         
-        # 添加专属物料信息
+        # 库存中存在但未被任何机型使用的物料
         for material_code, inventory_qty in self.inventory_data.items():
-            if material_code not in shared_materials:
+            if material_code not in scheduler.material_index:
                 materials_detail[material_code] = {
                     'total_inventory': inventory_qty,
-                    'allocated_a': 0,
-                    'allocated_b': 0
+                    'allocated': [0] * model_count
                 }
         
-        # 添加共用物料分配信息
-        for material_code in shared_materials:
-            allocated_a = allocated_shared.get('model_a', {}).get(material_code, 0)
-            allocated_b = allocated_shared.get('model_b', {}).get(material_code, 0)
-            total_inventory = self.inventory_data.get(material_code, 0)
-            
+        # BOM涉及的物料（含专属物料和共用物料）
+        allocated_columns = allocation.T.tolist()
+        for material_code, allocated in zip(scheduler.material_codes, allocated_columns):
             materials_detail[material_code] = {
-                'total_inventory': total_inventory,
-                'allocated_a': allocated_a,
-                'allocated_b': allocated_b
+                'total_inventory': self.inventory_data.get(material_code, 0),
+                'allocated': allocated
             }
         
         return materials_detail
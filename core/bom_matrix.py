@@ -0,0 +1,110 @@
+"""
+BOM稀疏矩阵 - 父项 × 物料的CSR存储
+"""
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+from database.models import BOMItem
+
+
+class BOMMatrix:
+    """BOM稀疏矩阵（CSR：每行一个父项，列为物料，值为单台用量）"""
+
+    def __init__(
+        self,
+        parent_codes: List[str],
+        material_codes: List[str],
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        data: np.ndarray
+    ):
+        """
+        Args:
+            parent_codes: 父项编码（行）
+            material_codes: 物料编码（列）
+            indptr: 行指针，第 i 行的非零元为 indices/data[indptr[i]:indptr[i + 1]]
+            indices: 非零元的列号
+            data: 非零元的单台用量
+        """
+        self.parent_codes = parent_codes
+        self.material_codes = material_codes
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.parent_index = {code: row for row, code in enumerate(parent_codes)}
+        self.material_index = {code: column for column, code in enumerate(material_codes)}
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.parent_codes), len(self.material_codes)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, str, float]]) -> "BOMMatrix":
+        """
+        由BOM行构建稀疏矩阵（同一父项下同一物料多行时以最后一行为准）
+
+        Args:
+            rows: (父项编码, 物料编码, 单台用量) 的可迭代对象，可为流式游标
+
+        Returns:
+            BOM稀疏矩阵
+        """
+        parent_index: Dict[str, int] = {}
+        material_index: Dict[str, int] = {}
+        row_ids, column_ids, values = [], [], []
+        for parent, component, quantity in rows:
+            row_ids.append(parent_index.setdefault(parent, len(parent_index)))
+            column_ids.append(material_index.setdefault(component, len(material_index)))
+            values.append(quantity if quantity else 0.0)
+
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        column_ids = np.asarray(column_ids, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+
+        # 按 (行, 列) 排序；稳定排序保证重复项中最后出现的排在最后
+        order = np.lexsort((column_ids, row_ids))
+        row_ids, column_ids, values = row_ids[order], column_ids[order], values[order]
+        if len(order):
+            keep = np.ones(len(order), dtype=bool)
+            keep[:-1] = (row_ids[1:] != row_ids[:-1]) | (column_ids[1:] != column_ids[:-1])
+            row_ids, column_ids, values = row_ids[keep], column_ids[keep], values[keep]
+
+        indptr = np.zeros(len(parent_index) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_ids, minlength=len(parent_index)), out=indptr[1:])
+        return cls(list(parent_index), list(material_index), indptr, column_ids, values)
+
+    @classmethod
+    def load(cls, db_manager) -> "BOMMatrix":
+        """一次性流式读取整张BOM表并构建稀疏矩阵"""
+        return cls.from_rows(db_manager.iter_all_bom_rows())
+
+    def inventory_vector(self, inventory_data: Dict[str, float]) -> np.ndarray:
+        """将库存字典转换为与物料列对齐的库存向量"""
+        return np.array(
+            [inventory_data.get(code, 0.0) for code in self.material_codes],
+            dtype=np.float64
+        )
+
+    def row(self, parent_code: str) -> Dict[str, float]:
+        """取出单个父项的 {物料编码: 单台用量}"""
+        row = self.parent_index[parent_code]
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return {
+            self.material_codes[column]: quantity
+            for column, quantity in zip(self.indices[start:end].tolist(), self.data[start:end].tolist())
+        }
+
+    def bom_items(self, parent_code: str) -> List[BOMItem]:
+        """取出父项的BOM子项（稀疏矩阵不保存物料描述）"""
+        return [
+            BOMItem(
+                parent_item_number=parent_code,
+                component_item_number=material_code,
+                component_description="",
+                component_num=quantity
+            )
+            for material_code, quantity in self.row(parent_code).items()
+        ]
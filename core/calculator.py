@@ -1,13 +1,23 @@
 """
 满足率计算器 - 计算各机型的满足率
 """
-from typing import Dict
-from database.models import ModelConfig, AllocationResult
+from typing import Dict, List
+import numpy as np
+from database.models import ModelConfig, AllocationResult, MaterialMetrics
+from core.memory import memory_monitor
+from core.kernels import fixed_point_scale, to_fixed
 
 
 class SatisfactionCalculator:
     """满足率计算器"""
     
+    def __init__(self, fixed_point: bool = False):
+        """
+        Args:
+            fixed_point: 是否按定点整数计算可制造数量和短缺数量（与定点分配配合，结果无浮点误差）
+        """
+        self.fixed_point = fixed_point
+    
     def calculate_satisfaction(
         self,
         config_a: ModelConfig,
@@ -29,11 +39,12 @@ class SatisfactionCalculator:
         allocation_a = allocation_results.get('model_a', {})
         allocation_b = allocation_results.get('model_b', {})
         
-        # 计算机型A的满足率
-        result_a = self._calculate_model_satisfaction(config_a, allocation_a)
-        
-        # 计算机型B的满足率
-        result_b = self._calculate_model_satisfaction(config_b, allocation_b)
+        with memory_monitor.stage("calculate"):
+            # 计算机型A的满足率
+            result_a = self._calculate_model_satisfaction(config_a, allocation_a)
+            
+            # 计算机型B的满足率
+            result_b = self._calculate_model_satisfaction(config_b, allocation_b)
         
         return {
             'model_a': result_a,
@@ -41,6 +52,27 @@ class SatisfactionCalculator:
             'materials': allocation_results.get('materials', {})
         }
     
+    def calculate_models(
+        self,
+        configs: List[ModelConfig],
+        allocations: List[Dict[str, float]]
+    ) -> List[AllocationResult]:
+        """
+        计算多个机型的满足率
+        
+        Args:
+            configs: 机型配置列表
+            allocations: 与配置一一对应的 {物料编码: 分配数量}
+            
+        Returns:
+            各机型的分配结果
+        """
+        with memory_monitor.stage("calculate"):
+            return [
+                self._calculate_model_satisfaction(config, allocated)
+                for config, allocated in zip(configs, allocations)
+            ]
+    
     def _calculate_model_satisfaction(
         self,
         config: ModelConfig,
@@ -56,49 +88,62 @@ class SatisfactionCalculator:
         Returns:
             分配结果对象
         """
-        # 计算每个物料的短缺情况
-        shortage_materials = {}
+        # 单次遍历BOM，生成物料指标表（同一物料多行时以最后一行为准，与分配逻辑一致）
+        per_unit = {}
         for item in config.bom_items:
-            material_code = item.component_item_number
-            required_per_unit = item.component_num
+            per_unit[item.component_item_number] = item.component_num
+        
+        fixed = self._fixed_quantities(per_unit, allocated_materials, config.plan_quantity) if self.fixed_point else None
+        
+        metrics = MaterialMetrics()
+        shortage_materials = {}
+        total_satisfaction = 0.0
+        material_count = 0
+        
+        for material_code, required_per_unit in per_unit.items():
             total_required = required_per_unit * config.plan_quantity
             allocated_qty = allocated_materials.get(material_code, 0)
+            if fixed is None:
+                shortage = total_required - allocated_qty
+            else:
+                # 按该物料的定点整数比较，用量×数量 与分配量之间的浮点误差不计为短缺
+                scale, _, required_fixed, allocated_fixed = fixed[material_code]
+                shortage = (required_fixed - allocated_fixed) / scale
+            
+            if total_required > 0:
+                ratio = min(allocated_qty / total_required, 1.0)
+                total_satisfaction += ratio * 100
+                material_count += 1
+            else:
+                ratio = 1.0
             
-            shortage = total_required - allocated_qty
             if shortage > 0:
                 shortage_materials[material_code] = shortage
+                # 限制性物料：短缺物料中满足比例最低的
+                if ratio < metrics.bottleneck_ratio or metrics.bottleneck_material is None:
+                    metrics.bottleneck_material = material_code
+                    metrics.bottleneck_ratio = ratio
+            
+            metrics.material_codes.append(material_code)
+            metrics.required.append(total_required)
+            metrics.allocated.append(allocated_qty)
+            metrics.shortage.append(max(shortage, 0))
+            metrics.ratio.append(ratio)
+        
+        if material_count > 0 and allocated_materials:
+            metrics.avg_satisfaction = total_satisfaction / material_count
         
         # 计算可制造数量（基于最紧缺的物料）
         allocated_quantity = config.plan_quantity
-        
-        if shortage_materials:
-            # 找出限制性物料（短缺比例最大的）
-            min_ratio = float('inf')
-            limiting_material = None
-            
-            for item in config.bom_items:
-                material_code = item.component_item_number
-                required_per_unit = item.component_num
-                total_required = required_per_unit * config.plan_quantity
-                allocated_qty = allocated_materials.get(material_code, 0)
-                
-                if allocated_qty < total_required:
-                    ratio = allocated_qty / total_required if total_required > 0 else 0
-                    if ratio < min_ratio:
-                        min_ratio = ratio
-                        limiting_material = material_code
-            
-            if limiting_material and min_ratio < float('inf'):
-                # 重新计算可制造数量
-                limiting_item = None
-                for item in config.bom_items:
-                    if item.component_item_number == limiting_material:
-                        limiting_item = item
-                        break
-                
-                if limiting_item and limiting_item.component_num > 0:
-                    allocated_qty_for_limiting = allocated_materials.get(limiting_material, 0)
-                    allocated_quantity = int(allocated_qty_for_limiting / limiting_item.component_num)
+        limiting_material = metrics.bottleneck_material
+        if limiting_material and per_unit[limiting_material] > 0:
+            if fixed is None:
+                allocated_quantity = int(
+                    allocated_materials.get(limiting_material, 0) / per_unit[limiting_material]
+                )
+            else:
+                _, per_unit_fixed, _, allocated_fixed = fixed[limiting_material]
+                allocated_quantity = allocated_fixed // per_unit_fixed
         
         # 计算满足率
         satisfaction_rate = 0.0
@@ -114,5 +159,45 @@ class SatisfactionCalculator:
             satisfaction_rate=satisfaction_rate,
             allocated_materials=allocated_materials,
             shortage_materials=shortage_materials,
-            bom_items=config.bom_items
+            bom_items=config.bom_items,
+            material_metrics=metrics
         )
+    
+    @staticmethod
+    def _fixed_quantities(
+        per_unit: Dict[str, float],
+        allocated_materials: Dict[str, float],
+        plan_quantity: float
+    ) -> Dict[str, tuple]:
+        """
+        按各物料自身的定点精度（与分配内核相同的 fixed_point_scale）转换单台用量、需求和分配量
+        
+        Args:
+            per_unit: {物料编码: 单台用量}
+            allocated_materials: {物料编码: 分配数量}
+            plan_quantity: 计划数量
+            
+        Returns:
+            {物料编码: (缩放倍数, 单台用量, 需求数量, 分配数量)}，后三项为定点整数
+            
+        Raises:
+            ValueError: 非零单台用量小于定点精度（缩放后为 0）
+        """
+        codes = list(per_unit)
+        if not codes:
+            return {}
+        per_unit_values = np.array([per_unit[code] for code in codes], dtype=np.float64)
+        allocated_values = np.array([allocated_materials.get(code, 0) for code in codes], dtype=np.float64)
+        required_values = per_unit_values * plan_quantity
+        scale = fixed_point_scale(per_unit_values, allocated_values, required_values)
+        per_unit_fixed = to_fixed(per_unit_values, scale)
+        underflow = np.flatnonzero((per_unit_values != 0) & (per_unit_fixed == 0))
+        if len(underflow):
+            code = codes[underflow[0]]
+            raise ValueError(f"物料 {code} 的单台用量 {per_unit[code]} 小于定点精度，不能按定点计算")
+        return dict(zip(codes, zip(
+            scale.tolist(),
+            per_unit_fixed.tolist(),
+            to_fixed(required_values, scale).tolist(),
+            to_fixed(allocated_values, scale).tolist()
+        )))
@@ -0,0 +1,232 @@
+"""
+分配结果对比 - 按机型和物料编码对齐两次分配结果，以数组运算计算差异
+"""
+from dataclasses import dataclass, field
+from itertools import repeat
+from typing import Dict, List, Optional
+import numpy as np
+from database.models import AllocationResult, MaterialMetrics
+
+# 数量/比例差异的判定容差
+COMPARE_TOLERANCE = 1e-6
+
+# 物料行状态
+STATUS_ADDED = "新增"
+STATUS_REMOVED = "移除"
+STATUS_CHANGED = "变化"
+
+
+@dataclass
+class ModelDelta:
+    """机型级差异"""
+    model_code: str  # 机型编码
+    plan_before: Optional[int]  # 基准计划数量（基准中没有该机型时为 None）
+    plan_after: Optional[int]  # 当前计划数量（当前结果中没有该机型时为 None）
+    units_before: float  # 基准可制造数量
+    units_after: float  # 当前可制造数量
+    rate_before: float  # 基准满足率（%）
+    rate_after: float  # 当前满足率（%）
+    bottleneck_before: Optional[str]  # 基准瓶颈物料
+    bottleneck_after: Optional[str]  # 当前瓶颈物料
+
+    @property
+    def bottleneck_changed(self) -> bool:
+        return self.bottleneck_before != self.bottleneck_after
+
+    @property
+    def changed(self) -> bool:
+        return (
+            self.plan_before != self.plan_after
+            or abs(self.units_after - self.units_before) > COMPARE_TOLERANCE
+            or abs(self.rate_after - self.rate_before) > COMPARE_TOLERANCE
+            or self.bottleneck_changed
+        )
+
+
+@dataclass
+class RunComparison:
+    """两次分配结果的差异（物料差异为列式存储，只保留发生变化的行）"""
+    models: List[ModelDelta] = field(default_factory=list)  # 机型级差异（全部机型）
+    model_codes: List[str] = field(default_factory=list)  # 变化行的机型编码
+    material_codes: List[str] = field(default_factory=list)  # 变化行的物料编码
+    status: List[str] = field(default_factory=list)  # 变化行状态（新增/移除/变化）
+    allocated_before: np.ndarray = field(default_factory=lambda: np.zeros(0))  # 基准分配数量
+    allocated_after: np.ndarray = field(default_factory=lambda: np.zeros(0))  # 当前分配数量
+    shortage_before: np.ndarray = field(default_factory=lambda: np.zeros(0))  # 基准短缺数量
+    shortage_after: np.ndarray = field(default_factory=lambda: np.zeros(0))  # 当前短缺数量
+    ratio_before: np.ndarray = field(default_factory=lambda: np.zeros(0))  # 基准满足比例（0~1）
+    ratio_after: np.ndarray = field(default_factory=lambda: np.zeros(0))  # 当前满足比例（0~1）
+    compared_rows: int = 0  # 参与对比的物料行数
+
+    def __len__(self):
+        return len(self.material_codes)
+
+    def changed_models(self) -> List[ModelDelta]:
+        """发生变化的机型"""
+        return [delta for delta in self.models if delta.changed]
+
+    def rows(self):
+        """
+        按行遍历变化的物料
+        (机型编码, 物料编码, 状态, 基准分配, 当前分配, 分配差, 基准短缺, 当前短缺, 短缺差, 基准满足比例, 当前满足比例)
+        """
+        allocated_delta = (self.allocated_after - self.allocated_before).tolist()
+        shortage_delta = (self.shortage_after - self.shortage_before).tolist()
+        return zip(
+            self.model_codes, self.material_codes, self.status,
+            self.allocated_before.tolist(), self.allocated_after.tolist(), allocated_delta,
+            self.shortage_before.tolist(), self.shortage_after.tolist(), shortage_delta,
+            self.ratio_before.tolist(), self.ratio_after.tolist()
+        )
+
+    def to_excel(self, filename: str):
+        """导出为Excel（机型差异、物料差异两个工作表）"""
+        import pandas as pd
+
+        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+            pd.DataFrame([
+                {
+                    '机型编码': delta.model_code,
+                    '基准计划数量': delta.plan_before,
+                    '当前计划数量': delta.plan_after,
+                    '基准可制造': delta.units_before,
+                    '当前可制造': delta.units_after,
+                    '基准满足率(%)': round(delta.rate_before, 2),
+                    '当前满足率(%)': round(delta.rate_after, 2),
+                    '满足率变化(%)': round(delta.rate_after - delta.rate_before, 2),
+                    '基准瓶颈物料': delta.bottleneck_before or '',
+                    '当前瓶颈物料': delta.bottleneck_after or '',
+                }
+                for delta in self.changed_models()
+            ]).to_excel(writer, sheet_name='机型差异', index=False)
+
+            pd.DataFrame({
+                '机型编码': self.model_codes,
+                '物料编码': self.material_codes,
+                '状态': self.status,
+                '基准分配': self.allocated_before,
+                '当前分配': self.allocated_after,
+                '分配差': self.allocated_after - self.allocated_before,
+                '基准短缺': self.shortage_before,
+                '当前短缺': self.shortage_after,
+                '短缺差': self.shortage_after - self.shortage_before,
+                '基准满足比例(%)': self.ratio_before * 100,
+                '当前满足比例(%)': self.ratio_after * 100,
+            }).to_excel(writer, sheet_name='物料差异', index=False)
+
+
+def _metric_arrays(result: Optional[AllocationResult]) -> Dict[str, np.ndarray]:
+    """取出结果的物料指标列（缺少结果时为空列）"""
+    metrics = result.material_metrics if result else MaterialMetrics()
+    return {
+        name: np.fromiter(getattr(metrics, name), dtype=np.float64, count=len(metrics))
+        for name in ("allocated", "shortage", "ratio")
+    }
+
+
+def _align(before: Optional[AllocationResult], after: Optional[AllocationResult]):
+    """
+    按物料编码对齐一个机型的两次结果
+
+    Returns:
+        (物料编码, 基准下标, 当前下标)；下标 -1 表示该侧没有该物料
+    """
+    before_codes = before.material_metrics.material_codes if before else []
+    after_codes = after.material_metrics.material_codes if after else []
+    if before_codes == after_codes:
+        # 物料清单未变（只调整了数量或库存）时无需建索引
+        matched = np.arange(len(after_codes), dtype=np.int64)
+    else:
+        before_index = dict(zip(before_codes, range(len(before_codes))))
+        matched = np.fromiter(
+            map(before_index.get, after_codes, repeat(-1)), dtype=np.int64, count=len(after_codes)
+        )
+    removed = np.ones(len(before_codes), dtype=bool)
+    removed[matched[matched >= 0]] = False
+    removed_positions = np.flatnonzero(removed)
+
+    codes = list(after_codes) + [before_codes[position] for position in removed_positions.tolist()]
+    before_positions = np.concatenate([matched, removed_positions])
+    after_positions = np.concatenate([
+        np.arange(len(after_codes), dtype=np.int64),
+        np.full(len(removed_positions), -1, dtype=np.int64)
+    ])
+    return codes, before_positions, after_positions
+
+
+def _take(values: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """按下标取值，下标 -1 取 0"""
+    if not len(values):
+        return np.zeros(len(positions))
+    return np.where(positions >= 0, values[np.maximum(positions, 0)], 0.0)
+
+
+def compare_results(
+    baseline: List[AllocationResult],
+    current: List[AllocationResult]
+) -> RunComparison:
+    """
+    对比两次分配结果（按机型编码配对，按物料编码对齐）
+
+    Args:
+        baseline: 基准结果
+        current: 当前结果
+
+    Returns:
+        差异报告，只保留分配数量、短缺数量或满足比例发生变化的物料行
+    """
+    before_by_model = {result.model_code: result for result in baseline if result}
+    after_by_model = {result.model_code: result for result in current if result}
+    model_codes = list(after_by_model) + [code for code in before_by_model if code not in after_by_model]
+
+    comparison = RunComparison()
+    parts = {name: [] for name in (
+        "allocated_before", "allocated_after", "shortage_before",
+        "shortage_after", "ratio_before", "ratio_after"
+    )}
+    status_parts = []
+    for model_code in model_codes:
+        before = before_by_model.get(model_code)
+        after = after_by_model.get(model_code)
+        comparison.models.append(ModelDelta(
+            model_code=model_code,
+            plan_before=before.plan_quantity if before else None,
+            plan_after=after.plan_quantity if after else None,
+            units_before=before.allocated_quantity if before else 0,
+            units_after=after.allocated_quantity if after else 0,
+            rate_before=before.satisfaction_rate if before else 0.0,
+            rate_after=after.satisfaction_rate if after else 0.0,
+            bottleneck_before=before.material_metrics.bottleneck_material if before else None,
+            bottleneck_after=after.material_metrics.bottleneck_material if after else None
+        ))
+
+        codes, before_positions, after_positions = _align(before, after)
+        before_values = _metric_arrays(before)
+        after_values = _metric_arrays(after)
+        columns = {}
+        for name in ("allocated", "shortage", "ratio"):
+            columns[f"{name}_before"] = _take(before_values[name], before_positions)
+            columns[f"{name}_after"] = _take(after_values[name], after_positions)
+
+        added = before_positions < 0
+        removed = after_positions < 0
+        changed = added | removed
+        for name in ("allocated", "shortage", "ratio"):
+            changed |= np.abs(columns[f"{name}_after"] - columns[f"{name}_before"]) > COMPARE_TOLERANCE
+        rows = np.flatnonzero(changed)
+        comparison.compared_rows += len(codes)
+
+        comparison.model_codes.extend([model_code] * len(rows))
+        comparison.material_codes.extend([codes[row] for row in rows.tolist()])
+        status = np.full(len(rows), STATUS_CHANGED, dtype=object)
+        status[added[rows]] = STATUS_ADDED
+        status[removed[rows]] = STATUS_REMOVED
+        status_parts.append(status)
+        for name, values in columns.items():
+            parts[name].append(values[rows])
+
+    comparison.status = np.concatenate(status_parts).tolist() if status_parts else []
+    for name, values in parts.items():
+        if values:
+            setattr(comparison, name, np.concatenate(values))
+    return comparison
@@ -0,0 +1,236 @@
+"""
+库存历史 - 将每次库存快照保存为相对上一版本的压缩增量，可还原任意历史版本用于重放分配
+"""
+import json
+import os
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from database.config import CACHE_DIR
+from core.result_cache import inventory_fingerprint
+
+# 历史库存目录
+HISTORY_DIR = os.path.join(CACHE_DIR, "history")
+
+# 版本清单文件
+MANIFEST_FILE = "manifest.json"
+
+# 每隔多少个版本保存一次完整快照（还原时最多回放 KEYFRAME_INTERVAL - 1 个增量）
+KEYFRAME_INTERVAL = 30
+
+# 版本号格式（按保存时间）
+VERSION_FORMAT = "%Y%m%d-%H%M%S"
+
+
+@dataclass
+class HistoryVersion:
+    """历史库存版本"""
+    version: str  # 版本号（保存时间 YYYYMMDD-HHMMSS）
+    taken_at: str  # 保存时间（ISO 格式）
+    keyframe: bool  # 是否为完整快照（否则为相对上一版本的增量）
+    fingerprint: str  # 库存内容版本（与分配结果缓存使用的版本一致）
+    materials: int  # 物料数
+    changed: int  # 相对上一版本变化的物料数
+
+
+class InventoryHistory:
+    """
+    库存历史存储
+
+    同一条增量链共用一张只增不减的物料编码表：完整快照保存编码表和全部库存，
+    增量只保存新增的物料编码以及库存发生变化的下标（差分编码）和新值，已删除的物料记为 NaN。
+    """
+
+    def __init__(self, history_dir: str = HISTORY_DIR, keyframe_interval: int = KEYFRAME_INTERVAL):
+        """
+        Args:
+            history_dir: 存储目录
+            keyframe_interval: 完整快照间隔（版本数）
+        """
+        self.history_dir = history_dir
+        self.keyframe_interval = keyframe_interval
+        self._versions: Optional[List[HistoryVersion]] = None
+        # 最近一次还原的状态 (版本号, 物料编码表, 库存数组)，连续保存/还原时避免重复回放
+        self._state: Optional[Tuple[str, List[str], np.ndarray]] = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.history_dir, name)
+
+    def versions(self) -> List[HistoryVersion]:
+        """按时间顺序返回全部版本"""
+        if self._versions is None:
+            try:
+                with open(self._path(MANIFEST_FILE), encoding="utf-8") as f:
+                    self._versions = [HistoryVersion(**entry) for entry in json.load(f)]
+            except FileNotFoundError:
+                self._versions = []
+        return self._versions
+
+    def _save_manifest(self):
+        """写入版本清单（先写临时文件再替换）"""
+        temp_file = self._path(f"{MANIFEST_FILE}.tmp")
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump([asdict(version) for version in self.versions()], f, ensure_ascii=False)
+        os.replace(temp_file, self._path(MANIFEST_FILE))
+
+    def resolve(self, version_or_date: str) -> HistoryVersion:
+        """
+        按版本号或日期查找版本（日期取当天及之前的最后一个版本）
+
+        Args:
+            version_or_date: 版本号，或 YYYY-MM-DD / YYYY-MM-DD HH:MM 格式的时间
+
+        Returns:
+            历史版本
+        """
+        versions = self.versions()
+        for version in versions:
+            if version.version == version_or_date:
+                return version
+        try:
+            moment = datetime.fromisoformat(version_or_date)
+        except ValueError:
+            raise ValueError(f"未找到历史库存版本: {version_or_date}")
+        if len(version_or_date) <= 10:
+            moment = moment.replace(hour=23, minute=59, second=59)
+        earlier = [version for version in versions if datetime.fromisoformat(version.taken_at) <= moment]
+        if not earlier:
+            raise ValueError(f"{version_or_date} 之前没有历史库存版本")
+        return earlier[-1]
+
+    def _replay(self, position: int) -> Tuple[List[str], np.ndarray]:
+        """从最近的完整快照回放增量，还原第 position 个版本的编码表和库存数组"""
+        versions = self.versions()
+        start = position
+        if self._state is not None:
+            cached = next((index for index, version in enumerate(versions) if version.version == self._state[0]), None)
+        else:
+            cached = None
+        while not versions[start].keyframe and start != cached:
+            start -= 1
+
+        if start == cached:
+            codes, values = list(self._state[1]), self._state[2].copy()
+        else:
+            with np.load(self._path(f"{versions[start].version}.npz")) as data:
+                codes = data["codes"].tolist()
+                values = data["values"]
+        for version in versions[start + 1:position + 1]:
+            with np.load(self._path(f"{version.version}.npz")) as data:
+                new_codes = data["new_codes"].tolist()
+                if new_codes:
+                    codes.extend(new_codes)
+                    values = np.concatenate([values, np.full(len(new_codes), np.nan)])
+                values[np.cumsum(data["indices"])] = data["values"]
+        self._state = (versions[position].version, codes, values)
+        return codes, values
+
+    def load(self, version: str) -> Dict[str, float]:
+        """
+        还原指定版本的库存
+
+        Args:
+            version: 版本号（或日期，见 resolve）
+
+        Returns:
+            {物料编码: 库存数量}
+        """
+        target = self.resolve(version)
+        position = self.versions().index(target)
+        codes, values = self._replay(position)
+        present = np.flatnonzero(~np.isnan(values))
+        return dict(zip([codes[index] for index in present.tolist()], values[present].tolist()))
+
+    def record(self, inventory_data: Dict[str, float], taken_at: Optional[datetime] = None) -> HistoryVersion:
+        """
+        保存一个库存快照（内容与最新版本相同时不新建版本）
+
+        Args:
+            inventory_data: {物料编码: 库存数量}
+            taken_at: 快照时间；默认当前时间
+
+        Returns:
+            保存的（或内容相同的最新）版本
+        """
+        taken_at = taken_at or datetime.now()
+        fingerprint = inventory_fingerprint(inventory_data)
+        versions = self.versions()
+        if versions and versions[-1].fingerprint == fingerprint:
+            return versions[-1]
+
+        os.makedirs(self.history_dir, exist_ok=True)
+        version = taken_at.strftime(VERSION_FORMAT)
+        if any(existing.version == version for existing in versions):
+            raise ValueError(f"历史库存版本 {version} 已存在")
+
+        keyframe = not versions or len(versions) % self.keyframe_interval == 0
+        if keyframe:
+            codes = list(inventory_data)
+            values = np.array([inventory_data[code] for code in codes], dtype=np.float64)
+            np.savez_compressed(
+                self._path(f"{version}.npz"),
+                codes=np.array(codes, dtype=str),
+                values=values
+            )
+            changed = len(codes)
+        else:
+            codes, previous = self._replay(len(versions) - 1)
+            index = dict(zip(codes, range(len(codes))))
+            new_codes = [code for code in inventory_data if code not in index]
+            codes = codes + new_codes
+            values = np.full(len(codes), np.nan)
+            positions = np.fromiter((index.get(code, -1) for code in inventory_data), dtype=np.int64, count=len(inventory_data))
+            positions[positions < 0] = np.arange(len(previous), len(codes))
+            values[positions] = np.fromiter(inventory_data.values(), dtype=np.float64, count=len(inventory_data))
+
+            old = np.concatenate([previous, np.full(len(new_codes), np.nan)])
+            # NaN 与 NaN 视为相同（物料持续不存在）
+            differs = ~((old == values) | (np.isnan(old) & np.isnan(values)))
+            indices = np.flatnonzero(differs)
+            np.savez_compressed(
+                self._path(f"{version}.npz"),
+                new_codes=np.array(new_codes, dtype=str),
+                indices=np.diff(indices, prepend=0).astype(np.int32),
+                values=values[indices]
+            )
+            changed = len(indices)
+
+        entry = HistoryVersion(
+            version=version,
+            taken_at=taken_at.isoformat(timespec="seconds"),
+            keyframe=keyframe,
+            fingerprint=fingerprint,
+            materials=len(inventory_data),
+            changed=changed
+        )
+        versions.append(entry)
+        self._save_manifest()
+        self._state = (version, codes, values)
+        return entry
+
+    def capture(self, db_manager) -> HistoryVersion:
+        """
+        从数据库读取全部库存并保存为新版本
+
+        Args:
+            db_manager: 已连接的数据库管理器
+
+        Returns:
+            保存的版本
+        """
+        inventory_data = {
+            matnr: clabs if clabs else 0.0
+            for matnr, clabs in db_manager.get_inventory_data()
+        }
+        return self.record(inventory_data)
+
+    def size(self) -> int:
+        """存储占用的字节数"""
+        return sum(
+            os.path.getsize(self._path(f"{version.version}.npz")) for version in self.versions()
+        )
+
+
+# 全局库存历史存储
+inventory_history = InventoryHistory()
@@ -0,0 +1,387 @@
+"""
+数值计算内核 - 分配与可制造数量的数组运算
+"""
+import numpy as np
+
+# 齐套分配的最大迭代次数
+KIT_MAX_ITERATIONS = 10
+
+# 定点数量的最大小数位数（每种物料取能精确表示其库存和单台用量的最少位数，超出部分四舍五入）
+FIXED_POINT_MAX_DECIMALS = 6
+
+# 判断数量是否为整数时的相对容差（吸收数据库 float 存储带来的误差）
+FIXED_POINT_TOLERANCE = 1e-9
+
+# 层级足量后剩余库存低于 剩余库存 × 该值 的残差视为 0（十进制数量的浮点表示误差量级）
+FILL_ROUNDING_MARGIN = 4 * np.finfo(np.float64).eps
+
+# int64 上限（定点乘积超出时改用浮点计算）
+INT64_LIMIT = 2 ** 63 - 1
+
+# float64 可精确表示的最大整数
+FLOAT64_EXACT_LIMIT = 2 ** 53
+
+
+def fixed_point_scale(*quantities: np.ndarray) -> np.ndarray:
+    """
+    计算各物料的定点缩放倍数：10 的最少位数次方，使该物料的全部数量乘以倍数后为整数
+
+    Args:
+        *quantities: 数量数组，形状 (..., 物料数)，如单台用量矩阵和库存向量
+
+    Returns:
+        缩放倍数（物料数,），int64
+    """
+    material_count = np.shape(quantities[0])[-1]
+    # 只检查非零数量（单台用量矩阵大多为 0）
+    values = []
+    columns = []
+    for array in quantities:
+        array = np.abs(np.asarray(array, dtype=np.float64)).reshape(-1, material_count)
+        rows, array_columns = np.nonzero(array)
+        values.append(array[rows, array_columns])
+        columns.append(array_columns)
+    return column_scale(np.concatenate(values), np.concatenate(columns), material_count)
+
+
+def column_scale(values: np.ndarray, columns: np.ndarray, material_count: int) -> np.ndarray:
+    """
+    按 (数量, 物料列) 列表计算各物料的定点缩放倍数（fixed_point_scale 的稀疏形式，如 CSR 的 data/indices）
+
+    Args:
+        values: 非负数量
+        columns: 各数量所属的物料列
+        material_count: 物料数
+
+    Returns:
+        缩放倍数（物料数,），int64
+    """
+    # 逐位数筛掉已能精确表示的数量
+    decimals = np.zeros(material_count, dtype=np.int64)
+    for digits in range(FIXED_POINT_MAX_DECIMALS + 1):
+        scaled = values * 10.0 ** digits
+        inexact = np.abs(scaled - np.rint(scaled)) > FIXED_POINT_TOLERANCE * np.maximum(scaled, 1.0)
+        if digits == FIXED_POINT_MAX_DECIMALS or not inexact.any():
+            break
+        values = values[inexact]
+        columns = columns[inexact]
+        decimals[columns] = digits + 1
+    return 10 ** decimals
+
+
+def to_fixed(quantities: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """
+    将数量转换为定点整数（按物料缩放后四舍五入）
+
+    Args:
+        quantities: 数量数组，形状 (..., 物料数)
+        scale: 各物料的缩放倍数（见 fixed_point_scale）
+
+    Returns:
+        int64 数组
+    """
+    return np.rint(np.asarray(quantities, dtype=np.float64) * scale).astype(np.int64)
+
+
+def allocate_by_tiers(
+    inventory: np.ndarray,
+    requirements: np.ndarray,
+    tier_index: np.ndarray,
+    tier_count: int,
+    stock_levels: np.ndarray = None
+) -> np.ndarray:
+    """
+    按优先级层级逐层分配库存（同一层级内按需求量等比例分配）
+
+    先按层级汇总每种物料的需求（O(机型数 × 物料数)），再逐层计算满足比例
+    （O(层级数 × 物料数)），最后一次性回填到各机型。
+
+    Args:
+        inventory: 库存向量，形状 (..., 物料数)，前置维度可用于批量样本
+        requirements: 需求矩阵，形状 (..., 机型数, 物料数)
+        tier_index: 机型对各物料的层级序号（机型数, 物料数），0 为最高层级，-1 表示不使用
+        tier_count: 层级数
+        stock_levels: 可选输出（层级数 + 1, ..., 物料数），写入每个层级分配前的剩余库存，
+            最后一行为全部层级分配后的剩余库存（用于分配追溯）
+
+    Returns:
+        分配矩阵，形状与需求矩阵广播后一致
+    """
+    remaining = np.maximum(inventory, 0).astype(np.float64)
+    material_count = remaining.shape[-1]
+    columns = np.arange(material_count)
+    batch_shape = np.broadcast_shapes(requirements.shape[:-2], remaining.shape[:-1])
+    requirements = np.broadcast_to(requirements, batch_shape + requirements.shape[-2:])
+    remaining = np.broadcast_to(remaining, batch_shape + (material_count,)).copy()
+
+    # 末行对应 tier_index == -1（不使用），其满足比例始终为 0；按 层级 × 物料数 + 物料 展平累加
+    tier_demand = np.zeros(batch_shape + ((tier_count + 1) * material_count,))
+    # 累加的舍入误差（TwoSum），层级需求精确值 = tier_demand + demand_error
+    demand_error = np.zeros_like(tier_demand)
+    flat_index = tier_index * material_count + columns
+    for row in range(tier_index.shape[0]):
+        cells = flat_index[row]
+        total = tier_demand[..., cells]
+        value = requirements[..., row, :]
+        summed = total + value
+        virtual = summed - total
+        demand_error[..., cells] += (total - (summed - virtual)) + (value - virtual)
+        tier_demand[..., cells] = summed
+    tier_demand = tier_demand.reshape(batch_shape + (tier_count + 1, material_count))
+    demand_error = demand_error.reshape(tier_demand.shape)
+
+    fill = np.zeros_like(tier_demand)
+    tier_stock = np.zeros_like(tier_demand)
+    for tier in range(tier_count):
+        if stock_levels is not None:
+            stock_levels[tier] = remaining
+        tier_stock[..., tier, :] = remaining
+        demand = tier_demand[..., tier, :]
+        error = demand_error[..., tier, :]
+        tier_fill = np.divide(
+            remaining, demand,
+            out=np.zeros_like(remaining), where=demand > 0
+        )
+        np.minimum(tier_fill, 1.0, out=tier_fill)
+        short = (demand > 0) & (tier_fill < 1.0)
+        # 比例向上舍入（需求 × 比例 的精确值超出剩余库存）时退一位，各机型分配量最多超出精确份额一位
+        product = demand * tier_fill
+        excess = (product - remaining) + (_product_error(demand, tier_fill, product) + error * tier_fill)
+        tier_fill = np.where(short & (excess > 0), np.nextafter(tier_fill, 0), tier_fill)
+        fill[..., tier, :] = tier_fill
+        # 短缺物料本层级用完，剩余库存精确为 0；足量物料按层级需求精确值计算差值并向下舍入，
+        # 小于舍入误差量级的残差归零，低层级不会分到浮点残差，累计分配也不超过库存
+        left = remaining - demand
+        correction = (-demand - (left - remaining)) - error
+        left, rounded = left + correction, left
+        virtual = left - rounded
+        rounded_up = (rounded - (left - virtual)) + (correction - virtual) < 0
+        left = np.where(rounded_up, np.nextafter(left, 0), left)
+        left[left <= remaining * FILL_ROUNDING_MARGIN] = 0.0
+        remaining = np.where(short, 0.0, left)
+    if stock_levels is not None:
+        stock_levels[tier_count] = remaining
+
+    cell_fill = fill[..., tier_index, columns]
+    allocation = requirements * cell_fill
+    cells = np.nonzero((cell_fill < 1.0) & (requirements > 0))
+    if len(cells[0]):
+        rows, cell_columns = cells[-2], cells[-1]
+        tier_cells = cells[:-2] + (tier_index[rows, cell_columns], cell_columns)
+        required = requirements[cells]
+        shares = allocation[cells]
+        demand = tier_demand[tier_cells]
+        stock = tier_stock[tier_cells]
+        # 分配量超过精确份额 需求 × 剩余库存 ÷ 层级需求 时退一位，同层级分配量之和不超过剩余库存
+        scaled = shares * demand
+        claimed = required * stock
+        excess = (scaled - claimed) + (
+            _product_error(shares, demand, scaled) - _product_error(required, stock, claimed)
+            + shares * demand_error[tier_cells]
+        )
+        shares = np.where(excess > 0, np.nextafter(shares, 0), shares)
+        # 只有一个机型有需求（需求等于层级需求）时精确分到本层级分配前的剩余库存，即 min(需求, 剩余库存)
+        sole = required == demand
+        shares[sole] = stock[sole]
+        allocation[cells] = shares
+    return allocation
+
+
+def _product_error(a: np.ndarray, b: np.ndarray, product: np.ndarray) -> np.ndarray:
+    """
+    浮点乘积的舍入误差（Dekker TwoProduct）：a × b 的精确值 = product + 返回值
+
+    Args:
+        a: 乘数
+        b: 乘数
+        product: a * b 的浮点结果
+
+    Returns:
+        舍入误差（负数表示乘积被向上舍入）
+    """
+    a_high, a_low = _split(a)
+    b_high, b_low = _split(b)
+    return ((a_high * b_high - product) + a_high * b_low + a_low * b_high) + a_low * b_low
+
+
+def _split(value: np.ndarray):
+    """Veltkamp 拆分：value = 高位 + 低位，各自不超过 26 位有效数字"""
+    scaled = value * 134217729.0  # 2 ** 27 + 1
+    high = scaled - (scaled - value)
+    return high, value - high
+
+
+def allocate_by_tiers_fixed(
+    inventory: np.ndarray,
+    requirements: np.ndarray,
+    tier_index: np.ndarray,
+    tier_count: int,
+    stock_levels: np.ndarray = None
+) -> np.ndarray:
+    """
+    定点整数版 allocate_by_tiers：数量均为 int64，分配结果精确守恒
+
+    库存足够的层级按需求足额分配；库存不足时同一层级按需求量等比例取整，
+    取整后余下的最小单位按余数从大到小（相同时按机型顺序）逐个补给，剩余库存恰好分完。
+    需求 × 库存 的乘积须在 int64 范围内。
+
+    Args:
+        inventory: 定点库存向量，形状 (..., 物料数)
+        requirements: 定点需求矩阵，形状 (..., 机型数, 物料数)
+        tier_index: 层级序号矩阵（机型数, 物料数），-1 表示不使用
+        tier_count: 层级数
+        stock_levels: 可选输出（层级数 + 1, ..., 物料数），int64
+
+    Returns:
+        定点分配矩阵（int64）
+    """
+    remaining = np.maximum(inventory, 0).astype(np.int64)
+    material_count = remaining.shape[-1]
+    columns = np.arange(material_count)
+    batch_shape = np.broadcast_shapes(requirements.shape[:-2], remaining.shape[:-1])
+    requirements = np.broadcast_to(requirements, batch_shape + requirements.shape[-2:])
+    remaining = np.broadcast_to(remaining, batch_shape + (material_count,)).copy()
+    model_count = requirements.shape[-2]
+    positions = np.arange(model_count).reshape(model_count, 1)
+
+    # 按层级汇总需求：单组库存且数量在 float64 可精确表示的范围内时一次 bincount 完成，否则逐行累加
+    if not batch_shape and int(requirements.sum(axis=0).max(initial=0)) < FLOAT64_EXACT_LIMIT:
+        bins = (np.where(tier_index >= 0, tier_index, tier_count) * material_count + columns).ravel()
+        tier_demand = np.bincount(
+            bins, weights=requirements.ravel(), minlength=(tier_count + 1) * material_count
+        ).astype(np.int64).reshape(tier_count + 1, material_count)
+    else:
+        tier_demand = np.zeros(batch_shape + (tier_count + 1, material_count), dtype=np.int64)
+        for row in range(model_count):
+            tier_demand[..., tier_index[row], columns] += requirements[..., row, :]
+
+    # 默认足额分配（不使用的物料需求为 0），只重算库存不足的物料列
+    allocation = requirements.copy()
+    for tier in range(tier_count):
+        if stock_levels is not None:
+            stock_levels[tier] = remaining
+        demand = tier_demand[..., tier, :]
+        short = demand > remaining
+        if short.any():
+            short_columns = np.flatnonzero(short.reshape(-1, material_count).any(axis=0))
+            column_short = short[..., short_columns][..., None, :]
+            in_tier = tier_index[:, short_columns] == tier
+            tier_requirements = np.where(in_tier, requirements[..., short_columns], 0)
+            stock = remaining[..., short_columns][..., None, :]
+            divisor = np.where(column_short, demand[..., short_columns][..., None, :], 1)
+            share, rest = np.divmod(tier_requirements * stock, divisor)
+            leftover = np.where(column_short[..., 0, :], stock[..., 0, :] - share.sum(axis=-2), 0)
+            # 按余数从大到小排名，名次小于剩余单位数的机型各补 1
+            rest = np.where(in_tier & (tier_requirements > 0), rest, -1)
+            order = np.argsort(-rest, axis=-2, kind="stable")
+            ranks = np.empty_like(order)
+            np.put_along_axis(ranks, order, np.broadcast_to(positions, order.shape), axis=-2)
+            share += ranks < leftover[..., None, :]
+            allocation[..., short_columns] = np.where(
+                in_tier & column_short, share, allocation[..., short_columns]
+            )
+        # 库存不足的物料恰好分完
+        remaining = np.where(short, 0, remaining - demand)
+    if stock_levels is not None:
+        stock_levels[tier_count] = remaining
+
+    return allocation
+
+
+def buildable_units_fixed(
+    allocation: np.ndarray,
+    per_unit: np.ndarray,
+    plan_quantities: np.ndarray
+) -> np.ndarray:
+    """
+    定点整数版 buildable_units：整数除法，不存在浮点误差
+
+    Args:
+        allocation: 定点分配矩阵，形状 (..., 机型数, 物料数)
+        per_unit: 定点单台用量矩阵（机型数, 物料数），0 表示不使用该物料
+        plan_quantities: 整数计划数量，形状 (..., 机型数)
+
+    Returns:
+        可制造数量（int64），形状 (..., 机型数)
+    """
+    plan = np.asarray(plan_quantities, dtype=np.int64)
+    units = np.where(
+        per_unit > 0,
+        np.floor_divide(allocation, np.where(per_unit > 0, per_unit, 1)),
+        INT64_LIMIT
+    )
+    return np.minimum(units.min(axis=-1), plan)
+
+
+def buildable_units(
+    allocation: np.ndarray,
+    per_unit: np.ndarray,
+    plan_quantities: np.ndarray
+) -> np.ndarray:
+    """
+    计算各机型按已分配物料可齐套制造的数量（不超过计划数量）
+
+    Args:
+        allocation: 分配矩阵，形状 (..., 机型数, 物料数)
+        per_unit: 单台用量矩阵（机型数, 物料数），0 表示不使用该物料
+        plan_quantities: 计划数量，形状 (..., 机型数)
+
+    Returns:
+        可制造数量，形状 (..., 机型数)
+    """
+    plan = np.asarray(plan_quantities, dtype=np.float64)[..., None]
+    shape = np.broadcast_shapes(allocation.shape, per_unit.shape, plan.shape)
+    units = np.divide(
+        allocation, per_unit,
+        out=np.full(shape, np.inf), where=per_unit > 0
+    )
+    np.floor(units, out=units)
+    # 已足额分配的物料不构成限制（避免 用量×数量÷用量 的浮点误差少算一台）
+    units[np.broadcast_to(allocation >= per_unit * plan, shape)] = np.inf
+    return np.minimum(units.min(axis=-1), plan[..., 0])
+
+
+def allocate_kit_aware(
+    inventory: np.ndarray,
+    requirements: np.ndarray,
+    per_unit: np.ndarray,
+    plan_quantities: np.ndarray,
+    tier_index: np.ndarray,
+    tier_count: int,
+    max_iterations: int = KIT_MAX_ITERATIONS,
+    fixed_point: bool = False
+) -> np.ndarray:
+    """
+    齐套分配：不把机型用不上的库存锁定在该机型上
+
+    每轮按层级分配后，按仍然短缺（分配量小于当前需求）的物料估算各机型的可制造上限，
+    把其余物料的需求削减到该上限实际消耗的量，释放的库存在下一轮让给低层级；
+    上限提高时需求随之恢复，高层级可以从低层级收回。需求不再变化时停止。
+
+    Args:
+        inventory: 库存向量，形状 (..., 物料数)
+        requirements: 需求矩阵，形状 (..., 机型数, 物料数)
+        per_unit: 单台用量矩阵（机型数, 物料数）
+        plan_quantities: 计划数量，形状 (..., 机型数)
+        tier_index: 层级序号矩阵（机型数, 物料数）
+        tier_count: 层级数
+        max_iterations: 最大迭代次数
+        fixed_point: 数量是否为定点整数（使用整数内核）
+
+    Returns:
+        分配矩阵（每个机型只保留其可制造数量实际消耗的物料）
+    """
+    allocate = allocate_by_tiers_fixed if fixed_point else allocate_by_tiers
+    units_of = buildable_units_fixed if fixed_point else buildable_units
+    demand = requirements
+    for _ in range(max_iterations):
+        allocation = allocate(inventory, demand, tier_index, tier_count)
+        short = allocation < demand
+        cap = units_of(np.where(short, allocation, requirements), per_unit, plan_quantities)
+        new_demand = np.where(short, requirements, np.minimum(per_unit * cap[..., None], requirements))
+        if np.array_equal(new_demand, demand):
+            break
+        demand = new_demand
+
+    units = units_of(allocation, per_unit, plan_quantities)
+    return np.minimum(allocation, per_unit * units[..., None])
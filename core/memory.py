@@ -0,0 +1,178 @@
+"""
+内存统计 - 基于 tracemalloc 记录各阶段（加载、分配、计算、展示、导出）的峰值和留存内存，
+并在设置内存预算时提供超预算检查（中止或降级处理）
+"""
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# 各阶段名称（按流程顺序，用于报告排序）
+MEMORY_STAGES = ("load", "allocate", "calculate", "render", "export")
+
+STAGE_LABELS = {
+    "load": "加载",
+    "allocate": "分配",
+    "calculate": "计算",
+    "render": "展示",
+    "export": "导出",
+}
+
+# tracemalloc 记录的调用栈深度（1 层开销最小）
+TRACE_FRAMES = 1
+
+
+class MemoryBudgetExceeded(MemoryError):
+    """当前阶段的内存占用将超出预算"""
+
+
+@dataclass
+class StageMemory:
+    """阶段内存统计"""
+    stage: str  # 阶段名称
+    calls: int = 0  # 执行次数
+    peak: int = 0  # 阶段内最大峰值增量（字节，相对进入阶段时）
+    retained: int = 0  # 最近一次执行后留存的内存增量（字节）
+    elapsed: float = 0.0  # 最近一次执行耗时（秒）
+
+
+def _format_bytes(size: float) -> str:
+    """格式化字节数"""
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class MemoryMonitor:
+    """
+    阶段内存监视器
+
+    未启用时 stage() 只是空的上下文，不产生开销；启用后 tracemalloc 约使分配密集的代码变慢一倍，
+    因此只在排查内存问题或设置了内存预算时开启。
+    """
+
+    def __init__(self, budget: Optional[int] = None):
+        """
+        Args:
+            budget: 内存预算（字节，按 tracemalloc 统计的 Python 分配内存计）；为 None 时不限制
+        """
+        self.budget = budget
+        self.stages: Dict[str, StageMemory] = {}
+        self._active: List[list] = []  # 正在执行的阶段 [阶段名称, 进入时内存, 已观测峰值, 开始时间]
+        self._started_tracing = False
+        self._lock = threading.Lock()  # 后台分配线程与界面线程可能同时进入阶段
+
+    @property
+    def enabled(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, budget: Optional[int] = None):
+        """
+        开始统计
+
+        Args:
+            budget: 内存预算（字节）；为 None 时沿用当前设置
+        """
+        if budget is not None:
+            self.budget = budget
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            self._started_tracing = True
+
+    def stop(self):
+        """停止统计（只停止由本对象开启的 tracemalloc）"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._active.clear()
+
+    def current(self) -> int:
+        """当前已分配的内存（字节）；未启用时为 0"""
+        return tracemalloc.get_traced_memory()[0] if self.enabled else 0
+
+    def fits(self, estimated: int = 0) -> bool:
+        """
+        判断再分配 estimated 字节后是否仍在预算内（未启用或未设置预算时总是 True）
+
+        Args:
+            estimated: 预计新增的内存（字节）
+        """
+        if self.budget is None or not self.enabled:
+            return True
+        return self.current() + estimated <= self.budget
+
+    def check(self, stage: str, estimated: int = 0):
+        """
+        超出预算时抛出 MemoryBudgetExceeded，用于中止当前阶段
+
+        Args:
+            stage: 阶段名称
+            estimated: 预计新增的内存（字节）
+        """
+        if not self.fits(estimated):
+            raise MemoryBudgetExceeded(
+                f"{STAGE_LABELS.get(stage, stage)}阶段内存将超出预算"
+                f"（当前 {_format_bytes(self.current())}，预计新增 {_format_bytes(estimated)}，"
+                f"预算 {_format_bytes(self.budget)}）"
+            )
+
+    def _observe_peak(self):
+        """把当前峰值计入所有正在执行的阶段，然后重置峰值"""
+        peak = tracemalloc.get_traced_memory()[1]
+        for entry in self._active:
+            entry[2] = max(entry[2], peak)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        统计一个阶段的峰值和留存内存（可嵌套）
+
+        Args:
+            name: 阶段名称（见 MEMORY_STAGES）
+        """
+        if not self.enabled:
+            yield
+            return
+        with self._lock:
+            self._observe_peak()
+            entry = [name, tracemalloc.get_traced_memory()[0], 0, time.perf_counter()]
+            self._active.append(entry)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._observe_peak()
+                self._active = [active for active in self._active if active is not entry]
+            stats = self.stages.setdefault(name, StageMemory(name))
+            stats.calls += 1
+            stats.peak = max(stats.peak, entry[2] - entry[1])
+            stats.retained = tracemalloc.get_traced_memory()[0] - entry[1]
+            stats.elapsed = time.perf_counter() - entry[3]
+
+    def report(self) -> List[StageMemory]:
+        """按流程顺序返回各阶段统计"""
+        order = {stage: position for position, stage in enumerate(MEMORY_STAGES)}
+        return sorted(self.stages.values(), key=lambda stats: order.get(stats.stage, len(order)))
+
+    def summary(self) -> str:
+        """单行摘要：各阶段峰值/留存"""
+        parts = [
+            f"{STAGE_LABELS.get(stats.stage, stats.stage)} 峰值 {_format_bytes(stats.peak)} / 留存 {_format_bytes(stats.retained)}"
+            for stats in self.report()
+        ]
+        if self.budget is not None:
+            parts.append(f"当前 {_format_bytes(self.current())} / 预算 {_format_bytes(self.budget)}")
+        return "；".join(parts)
+
+    def reset(self):
+        """清空统计"""
+        self.stages.clear()
+
+
+# 全局内存监视器（默认未启用）
+memory_monitor = MemoryMonitor()
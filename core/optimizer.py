@@ -0,0 +1,113 @@
+"""
+最优分配求解器 - 以加权可制造数量最大为目标的整数规划
+"""
+from typing import Optional
+import numpy as np
+from core.scheduler import PriorityScheduler
+from core.kernels import buildable_units
+
+# 求解时间上限（秒），超时则采用当前最优解或贪心解
+DEFAULT_TIME_LIMIT = 10.0
+
+
+class OptimalAllocator:
+    """
+    最优分配求解器
+
+    变量为各机型的制造数量 x（整数，0 ≤ x ≤ 计划数量），目标为 Σ 权重 × x 最大，
+    约束为每种物料 Σ 单台用量 × x ≤ 库存。先用齐套贪心分配得到可行解作为下界，
+    再调用 HiGHS（scipy.optimize.milp）求解；缺少 scipy 或求解失败时返回贪心解。
+    """
+
+    def __init__(
+        self,
+        scheduler: PriorityScheduler,
+        weights: Optional[np.ndarray] = None,
+        time_limit: float = DEFAULT_TIME_LIMIT
+    ):
+        """
+        Args:
+            scheduler: 已构建的优先级调度器
+            weights: 各机型权重；默认由优先级换算（优先级数字越小权重越大）
+            time_limit: 求解时间上限（秒）
+        """
+        self.scheduler = scheduler
+        self.time_limit = time_limit
+        if weights is None:
+            priorities = np.array([config.priority for config in scheduler.configs], dtype=np.float64)
+            weights = priorities.max() + 1 - priorities if len(priorities) else priorities
+        self.weights = np.asarray(weights, dtype=np.float64)
+
+    def solve(self, inventory: np.ndarray) -> np.ndarray:
+        """
+        求解各机型的制造数量
+
+        Args:
+            inventory: 与调度器物料索引对齐的库存向量
+
+        Returns:
+            各机型制造数量
+        """
+        scheduler = self.scheduler
+        plans = scheduler.plan_quantities
+        stock = np.maximum(inventory, 0)
+
+        # 贪心可行解：作为下界和兜底
+        greedy_allocation = scheduler.allocate(stock, kit_aware=True)
+        greedy_units = buildable_units(greedy_allocation, scheduler.per_unit, plans)
+        greedy_value = float(self.weights @ greedy_units)
+        if np.array_equal(greedy_units, plans):
+            return greedy_units
+
+        try:
+            from scipy.optimize import milp, LinearConstraint, Bounds
+            from scipy.sparse import csr_matrix
+        except ImportError:
+            print("未安装 scipy，最优分配改用齐套贪心分配结果")
+            return greedy_units
+
+        # 计划数量全部满足也不超过库存的物料不构成约束
+        binding = scheduler.per_unit.T @ plans > stock + 1e-9
+        # 使用了零库存物料的机型只能制造 0 台，直接固定上界并去掉这些约束
+        upper = plans.copy()
+        empty = binding & (stock <= 0)
+        upper[(scheduler.per_unit[:, empty] > 0).any(axis=1)] = 0
+        binding &= ~empty
+        constraint_matrix = csr_matrix(scheduler.per_unit.T[binding])
+        constraints = [LinearConstraint(constraint_matrix, -np.inf, stock[binding])]
+
+        result = None
+        for presolve in (True, False):
+            result = milp(
+                c=-self.weights,
+                constraints=constraints,
+                integrality=np.ones(len(plans)),
+                bounds=Bounds(np.zeros(len(plans)), upper),
+                options={"time_limit": self.time_limit, "presolve": presolve}
+            )
+            # 全 0 解总是可行，预求解误判为不可行时关闭预求解重试
+            if result.status != 2:
+                break
+        if result.x is None:
+            print(f"最优分配求解失败（{result.message}），改用齐套贪心分配结果")
+            return greedy_units
+
+        units = np.floor(result.x + 1e-6)
+        # 取整后复核可行性，不可行或不优于贪心解时采用贪心解
+        feasible = (scheduler.per_unit.T @ units <= stock + 1e-6).all()
+        if not feasible or float(self.weights @ units) < greedy_value:
+            return greedy_units
+        return units
+
+    def allocate(self, inventory: np.ndarray) -> np.ndarray:
+        """
+        求解并返回分配矩阵（各机型按制造数量领用物料）
+
+        Args:
+            inventory: 与调度器物料索引对齐的库存向量
+
+        Returns:
+            分配矩阵，形状 (机型数, 物料数)
+        """
+        units = self.solve(inventory)
+        return self.scheduler.per_unit * units[:, None]
@@ -0,0 +1,232 @@
+"""
+分区库存分配 - 库存按物料+分区（工厂/库存地点）保存，各分区独立并行分配，可选跨分区调拨
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import numpy as np
+from database.models import ModelConfig
+from core.scheduler import PriorityScheduler
+from core.optimizer import OptimalAllocator
+from core.kernels import allocate_by_tiers, buildable_units
+from core.memory import memory_monitor
+
+# 并行分配的最小计算量（各分区 机型数×物料数 之和），低于此值时在当前进程内逐个分区计算
+PARALLEL_MIN_CELLS = 500_000
+
+# 分配过程中同时存在的 机型×物料 矩阵个数（含调拨计算），用于预估内存
+ALLOCATION_MATRIX_COPIES = 10
+
+# 剩余库存/未满足需求的舍入容差（浮点等比例分配产生的残量不参与调拨）
+TRANSFER_TOLERANCE = 1e-9
+
+
+@dataclass
+class PartitionSummary:
+    """分区分配汇总"""
+    partition: str  # 分区
+    line_count: int  # 计划行数
+    plan_quantity: float  # 计划数量合计
+    buildable_quantity: float  # 可制造数量合计
+    transfer_in: float  # 从其他分区调入的物料数量合计
+    transfer_out: float  # 调出给其他分区的物料数量合计
+
+    @property
+    def satisfaction_rate(self) -> float:
+        """分区满足率（%）"""
+        return self.buildable_quantity / self.plan_quantity * 100 if self.plan_quantity > 0 else 0.0
+
+
+@dataclass
+class PartitionAllocation:
+    """分区分配结果（分配矩阵与调度器的 机型×物料 对齐，每行属于一个分区）"""
+    scheduler: PriorityScheduler  # 全部计划行的调度器
+    partitions: List[str]  # 各行所属分区
+    allocation: np.ndarray  # 分配矩阵（含调入部分）
+    transfers: np.ndarray  # 跨分区调入部分
+    summaries: List[PartitionSummary]  # 各分区汇总
+
+    def to_material_dicts(self) -> List[Dict[str, float]]:
+        """各行 {物料编码: 分配数量}"""
+        return self.scheduler.to_material_dicts(self.allocation)
+
+    def transfer_totals(self) -> np.ndarray:
+        """各行调入物料数量合计"""
+        return self.transfers.sum(axis=1)
+
+
+def _allocate_partition(
+    configs: List[ModelConfig],
+    inventory_data: Dict[str, float],
+    kit_aware: bool,
+    optimal: bool,
+    fixed_point: bool = False
+):
+    """
+    在单个分区的库存内分配（可在子进程中执行）
+
+    Returns:
+        (物料编码列表, 分配矩阵)
+    """
+    scheduler = PriorityScheduler(configs, fixed_point)
+    inventory = scheduler.inventory_vector(inventory_data)
+    if optimal:
+        allocation = OptimalAllocator(scheduler).allocate(inventory)
+    else:
+        allocation = scheduler.allocate(inventory, kit_aware=kit_aware)
+    return scheduler.material_codes, allocation
+
+
+class PartitionedAllocator:
+    """分区库存分配器"""
+
+    def __init__(self, db_manager, material_codes=None, inventory_data=None):
+        """
+        初始化分配器
+
+        Args:
+            db_manager: 数据库管理器实例
+            material_codes: 需要加载库存的物料编码；为 None 时加载全部库存
+            inventory_data: 已有的分区库存 {分区: {物料编码: 库存}}，提供时不访问数据库
+        """
+        self.db_manager = db_manager
+        self.inventory_data: Dict[str, Dict[str, float]] = {}
+        if inventory_data is not None:
+            self.inventory_data = inventory_data
+        else:
+            self.load_inventory_data(material_codes)
+
+    def load_inventory_data(self, material_codes=None):
+        """
+        加载分区库存（同一分区同一物料的多行已在查询中汇总）
+
+        Args:
+            material_codes: 需要加载库存的物料编码；为 None 时加载全部库存
+        """
+        self.inventory_data = {}
+        try:
+            with memory_monitor.stage("load"):
+                for partition, matnr, clabs in self.db_manager.get_partitioned_inventory_data(material_codes):
+                    stock = self.inventory_data.setdefault(partition, {})
+                    stock[matnr] = stock.get(matnr, 0.0) + (clabs if clabs else 0.0)
+        except Exception as e:
+            print(f"加载分区库存数据失败: {e}")
+            self.inventory_data = {}
+
+    def allocate(
+        self,
+        configs: List[ModelConfig],
+        partitions: List[str],
+        kit_aware: bool = False,
+        optimal: bool = False,
+        fallback: bool = False,
+        max_workers: Optional[int] = None,
+        fixed_point: bool = False
+    ) -> PartitionAllocation:
+        """
+        各分区只用本分区库存独立分配（分区间并行），可选再用各分区剩余库存补足缺口
+
+        跨分区调拨时，各分区的剩余库存合并为调拨池，全部分区的未满足需求按优先级层级
+        逐层分配（同一层级按需求量等比例），各分区按剩余库存占比调出。齐套/最优分配
+        模式下只保留能凑成整台的调入量。
+
+        Args:
+            configs: 机型配置列表（每个计划行一个）
+            partitions: 与 configs 一一对应的领料分区
+            kit_aware: 是否齐套分配
+            optimal: 是否求最优分配（优先于 kit_aware）
+            fallback: 是否允许跨分区调拨
+            max_workers: 并行进程数；默认为 CPU 核数
+            fixed_point: 各分区是否以定点整数计算分配（跨分区调拨仍按浮点计算）
+
+        Returns:
+            分区分配结果
+        """
+        scheduler = PriorityScheduler(configs)
+        memory_monitor.check("allocate", scheduler.per_unit.nbytes * ALLOCATION_MATRIX_COPIES)
+        allocation = np.zeros_like(scheduler.per_unit)
+
+        rows_by_partition: Dict[str, List[int]] = {}
+        for row, partition in enumerate(partitions):
+            rows_by_partition.setdefault(partition, []).append(row)
+
+        tasks = []
+        cells = 0
+        for partition, rows in rows_by_partition.items():
+            partition_configs = [configs[row] for row in rows]
+            codes = {item.component_item_number for config in partition_configs for item in config.bom_items}
+            stock = self.inventory_data.get(partition, {})
+            # 只向子进程传递本分区用到的物料库存
+            tasks.append((partition_configs, {code: stock[code] for code in codes if code in stock}))
+            cells += len(rows) * len(codes)
+
+        workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+        if workers > 1 and (optimal or cells >= PARALLEL_MIN_CELLS):
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(_allocate_partition, partition_configs, stock, kit_aware, optimal, fixed_point)
+                    for partition_configs, stock in tasks
+                ]
+                outcomes = [future.result() for future in futures]
+        else:
+            outcomes = [
+                _allocate_partition(partition_configs, stock, kit_aware, optimal, fixed_point)
+                for partition_configs, stock in tasks
+            ]
+
+        for rows, (material_codes, partition_allocation) in zip(rows_by_partition.values(), outcomes):
+            columns = [scheduler.material_index[code] for code in material_codes]
+            allocation[np.ix_(rows, columns)] = partition_allocation
+
+        # 各分区剩余库存（没有计划行的分区全部库存都可调出）
+        all_partitions = sorted(set(rows_by_partition) | set(self.inventory_data))
+        leftover = np.zeros((len(all_partitions), len(scheduler.material_codes)))
+        for position, partition in enumerate(all_partitions):
+            leftover[position] = np.maximum(scheduler.inventory_vector(self.inventory_data.get(partition, {})), 0)
+            rows = rows_by_partition.get(partition)
+            if rows:
+                leftover[position] -= allocation[rows].sum(axis=0)
+        leftover[leftover < TRANSFER_TOLERANCE] = 0
+
+        transfers = np.zeros_like(allocation)
+        transfer_out = np.zeros(len(all_partitions))
+        if fallback and len(all_partitions) > 1:
+            pool = leftover.sum(axis=0)
+            unmet = scheduler.requirements() - allocation
+            unmet[unmet < TRANSFER_TOLERANCE] = 0
+            transfers = allocate_by_tiers(pool, unmet, scheduler.tier_index, len(scheduler.tiers))
+            transfers[transfers < TRANSFER_TOLERANCE] = 0
+            if kit_aware or optimal:
+                units = buildable_units(allocation + transfers, scheduler.per_unit, scheduler.plan_quantities)
+                transfers = np.minimum(
+                    transfers, np.maximum(scheduler.per_unit * units[:, None] - allocation, 0)
+                )
+            allocation = allocation + transfers
+
+            # 各分区按剩余库存占比供料；分区自己的剩余库存补给自己的部分不计为调拨
+            share = np.divide(leftover, pool, out=np.zeros_like(leftover), where=pool > 0)
+            supplied = share * transfers.sum(axis=0)
+            for position, partition in enumerate(all_partitions):
+                rows = rows_by_partition.get(partition)
+                if rows:
+                    received = transfers[rows].sum(axis=0)
+                    local = np.minimum(received, supplied[position])
+                    supplied[position] -= local
+                    external = np.divide(received - local, received, out=np.zeros_like(received), where=received > 0)
+                    transfers[rows] *= external
+            transfer_out = supplied.sum(axis=1)
+
+        units = buildable_units(allocation, scheduler.per_unit, scheduler.plan_quantities)
+        summaries = []
+        for position, partition in enumerate(all_partitions):
+            rows = rows_by_partition.get(partition, [])
+            summaries.append(PartitionSummary(
+                partition=partition,
+                line_count=len(rows),
+                plan_quantity=float(scheduler.plan_quantities[rows].sum()),
+                buildable_quantity=float(units[rows].sum()),
+                transfer_in=float(transfers[rows].sum()),
+                transfer_out=float(transfer_out[position])
+            ))
+        return PartitionAllocation(scheduler, list(partitions), allocation, transfers, summaries)
@@ -0,0 +1,327 @@
+"""
+计划导入 - 从CSV/Excel批量导入机型计划并一次完成多机型分配
+"""
+import csv
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List
+from database.models import PlanLine, ModelConfig, BOMItem, AllocationResult
+from core.allocation import InventoryAllocator
+from core.calculator import SatisfactionCalculator
+from core.scheduler import PriorityScheduler
+from core.partition import PartitionedAllocator, PartitionSummary
+from core.memory import memory_monitor
+from core.history import inventory_history
+
+# 计划文件列名（不区分大小写） -> PlanLine 字段
+PLAN_COLUMN_ALIASES = {
+    "model_code": ("机型编码", "机型", "model_code", "model"),
+    "plan_quantity": ("计划数量", "计划制造数量", "数量", "plan_quantity", "quantity"),
+    "priority": ("优先级", "priority"),
+    "partition": ("库区", "工厂", "分区", "partition", "plant"),
+}
+
+
+@dataclass
+class PlanRunResult:
+    """计划导入分配结果（与导入的计划行一一对应）"""
+    lines: List[PlanLine]  # 成功导入的计划行
+    results: List[AllocationResult]  # 各计划行的分配结果
+    errors: List[str] = field(default_factory=list)  # 被跳过的行及原因
+    timings: Dict[str, float] = field(default_factory=dict)  # 各阶段耗时（秒）
+    transfers: List[float] = field(default_factory=list)  # 按分区分配时各计划行的调入物料数量
+    partitions: List[PartitionSummary] = field(default_factory=list)  # 按分区分配时的分区汇总
+
+    def __len__(self):
+        return len(self.results)
+
+    def rows(self):
+        """按行遍历 (机型编码, 计划数量, 优先级, 可制造数量, 满足率, 瓶颈物料, 分区, 调入数量)"""
+        transfers = self.transfers or [0.0] * len(self.results)
+        for line, result, transfer in zip(self.lines, self.results, transfers):
+            yield (
+                line.model_code,
+                line.plan_quantity,
+                line.priority,
+                result.allocated_quantity,
+                result.satisfaction_rate,
+                result.material_metrics.bottleneck_material,
+                line.partition,
+                transfer
+            )
+
+    def to_csv(self, filename: str):
+        """导出为CSV文件"""
+        with open(filename, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(["机型编码", "计划数量", "优先级", "可制造数量", "满足率(%)", "瓶颈物料", "分区", "调入数量"])
+            for code, quantity, priority, units, rate, bottleneck, partition, transfer in self.rows():
+                writer.writerow([code, quantity, priority, units, f"{rate:.2f}", bottleneck or "", partition, transfer])
+            if self.partitions:
+                writer.writerow([])
+                writer.writerow(["分区", "计划行数", "计划数量", "可制造数量", "满足率(%)", "调入数量", "调出数量"])
+                for summary in self.partitions:
+                    writer.writerow([
+                        summary.partition, summary.line_count, summary.plan_quantity,
+                        summary.buildable_quantity, f"{summary.satisfaction_rate:.2f}",
+                        summary.transfer_in, summary.transfer_out
+                    ])
+
+
+def _iter_file_rows(filename: str) -> Iterator[list]:
+    """流式逐行读取CSV或Excel（xlsx 使用 openpyxl 只读模式）"""
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+        workbook = load_workbook(filename, read_only=True, data_only=True)
+        try:
+            for row in workbook.worksheets[0].iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            workbook.close()
+        return
+    with open(filename, newline="", encoding="utf-8-sig") as f:
+        yield from csv.reader(f)
+
+
+def read_plan_lines(filename: str, errors: List[str] = None) -> Iterator[PlanLine]:
+    """
+    流式读取计划文件（首行为表头：机型编码、计划数量，可选优先级）
+
+    Args:
+        filename: CSV 或 xlsx 文件路径
+        errors: 可选列表，收集被跳过的行及原因
+
+    Yields:
+        计划行
+    """
+    rows = _iter_file_rows(filename)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("计划文件为空")
+
+    names = [str(name).strip().lower() if name is not None else "" for name in header]
+    positions = {}
+    for field_name, aliases in PLAN_COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias.lower() in names:
+                positions[field_name] = names.index(alias.lower())
+                break
+    missing = [PLAN_COLUMN_ALIASES[name][0] for name in ("model_code", "plan_quantity") if name not in positions]
+    if missing:
+        raise ValueError(f"计划文件缺少列: {', '.join(missing)}")
+
+    for line_number, row in enumerate(rows, start=2):
+        values = {
+            name: row[position] if position < len(row) else None
+            for name, position in positions.items()
+        }
+        model_code = str(values["model_code"]).strip() if values["model_code"] is not None else ""
+        if not model_code:
+            continue
+        try:
+            plan_quantity = float(values["plan_quantity"])
+            priority = float(values["priority"]) if values.get("priority") not in (None, "") else 1.0
+        except (TypeError, ValueError):
+            if errors is not None:
+                errors.append(f"第 {line_number} 行 {model_code}: 计划数量或优先级不是数字")
+            continue
+        if not plan_quantity.is_integer() or not priority.is_integer():
+            # 小数不截断（12.7 不能当作 12 台），整数值的小数形式（Excel 的 12.0）照常读取
+            if errors is not None:
+                errors.append(f"第 {line_number} 行 {model_code}: 计划数量或优先级不是整数")
+            continue
+        plan_quantity = int(plan_quantity)
+        priority = int(priority)
+        if plan_quantity <= 0:
+            if errors is not None:
+                errors.append(f"第 {line_number} 行 {model_code}: 计划数量必须大于 0")
+            continue
+        partition = values.get("partition")
+        partition = str(partition).strip() if partition is not None else ""
+        yield PlanLine(model_code, plan_quantity, priority, line_number, partition)
+
+
+class PlanImporter:
+    """计划导入器"""
+
+    def __init__(self, db_manager):
+        """
+        初始化导入器
+
+        Args:
+            db_manager: 数据库管理器实例
+        """
+        self.db_manager = db_manager
+
+    def load_bom_items(self, model_codes) -> Dict[str, List[BOMItem]]:
+        """
+        批量查询多个机型的BOM
+
+        Args:
+            model_codes: 机型编码集合
+
+        Returns:
+            {机型编码: BOM子项列表}
+        """
+        bom_items: Dict[str, List[BOMItem]] = {}
+        for parent, component, description, quantity in self.db_manager.iter_bom_data(model_codes):
+            bom_items.setdefault(parent, []).append(BOMItem(
+                parent_item_number=parent,
+                component_item_number=component,
+                component_description=description if description else "",
+                component_num=quantity if quantity else 0
+            ))
+        return bom_items
+
+    def run(
+        self,
+        filename: str,
+        kit_aware: bool = False,
+        optimal: bool = False,
+        by_partition: bool = False,
+        cross_partition: bool = False,
+        as_of: str = None,
+        fixed_point: bool = False
+    ) -> PlanRunResult:
+        """
+        导入计划文件并执行一次多机型分配
+
+        Args:
+            filename: 计划文件（CSV 或 xlsx）
+            kit_aware: 是否齐套分配
+            optimal: 是否求最优分配
+            by_partition: 是否按计划行的分区（库区列）只用本分区库存分配
+            cross_partition: 按分区分配时是否允许用其他分区的剩余库存补足
+            as_of: 历史库存版本号或日期；为空时使用数据库中的当前库存
+            fixed_point: 是否以定点整数计算分配
+
+        Returns:
+            计划导入分配结果
+        """
+        if as_of and by_partition:
+            raise ValueError("历史库存不区分分区，不能与按分区分配同时使用")
+
+        timings = {}
+        errors = []
+        started = time.perf_counter()
+        lines = list(read_plan_lines(filename, errors))
+        timings["read"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with memory_monitor.stage("load"):
+            bom_items = self.load_bom_items({line.model_code for line in lines})
+        timings["bom"] = time.perf_counter() - started
+
+        valid_lines, configs = self.build_configs(lines, bom_items, errors, by_partition)
+        if not configs:
+            return PlanRunResult(valid_lines, [], errors, timings)
+
+        material_codes = InventoryAllocator.collect_material_codes(*configs)
+        if by_partition:
+            started = time.perf_counter()
+            allocator = PartitionedAllocator(self.db_manager, material_codes)
+            timings["inventory"] = time.perf_counter() - started
+            return self.allocate_partitioned(
+                valid_lines, configs, allocator, kit_aware, optimal, cross_partition, errors, timings,
+                fixed_point
+            )
+
+        started = time.perf_counter()
+        if as_of:
+            # 按历史库存重放：库存版本与当时一致，分配结果可复现
+            version = inventory_history.resolve(as_of)
+            allocator = InventoryAllocator(
+                self.db_manager,
+                inventory_data=inventory_history.load(version.version),
+                inventory_version=version.fingerprint
+            )
+        else:
+            allocator = InventoryAllocator(self.db_manager, material_codes)
+        timings["inventory"] = time.perf_counter() - started
+
+        return self.allocate(valid_lines, configs, allocator, kit_aware, optimal, errors, timings, fixed_point)
+
+    @staticmethod
+    def build_configs(
+        lines: List[PlanLine],
+        bom_items: Dict[str, List[BOMItem]],
+        errors: List[str],
+        by_partition: bool = False
+    ):
+        """
+        为计划行生成机型配置，跳过找不到BOM（或按分区分配时未指定分区）的行
+
+        Args:
+            lines: 计划行
+            bom_items: {机型编码: BOM子项列表}
+            errors: 收集被跳过的行及原因
+            by_partition: 是否按分区分配
+
+        Returns:
+            (有效计划行, 机型配置列表)
+        """
+        valid_lines = []
+        configs = []
+        for line in lines:
+            items = bom_items.get(line.model_code)
+            if not items:
+                errors.append(f"第 {line.line_number} 行 {line.model_code}: 未找到BOM数据")
+                continue
+            if by_partition and not line.partition:
+                errors.append(f"第 {line.line_number} 行 {line.model_code}: 未指定分区")
+                continue
+            valid_lines.append(line)
+            configs.append(ModelConfig(
+                model_code=line.model_code,
+                model_name=line.model_code,
+                plan_quantity=line.plan_quantity,
+                priority=line.priority,
+                bom_items=items
+            ))
+        return valid_lines, configs
+
+    @staticmethod
+    def allocate(lines, configs, allocator, kit_aware, optimal, errors, timings, fixed_point=False) -> PlanRunResult:
+        """
+        用已加载库存的分配器执行一次多机型分配
+
+        Args:
+            lines: 有效计划行
+            configs: 与计划行一一对应的机型配置
+            allocator: InventoryAllocator（可在多次计划之间共享）
+            kit_aware: 是否齐套分配
+            optimal: 是否求最优分配
+            errors: 被跳过的行及原因
+            timings: 各阶段耗时，追加分配耗时
+            fixed_point: 是否以定点整数计算分配
+
+        Returns:
+            计划导入分配结果
+        """
+        started = time.perf_counter()
+        with memory_monitor.stage("allocate"):
+            scheduler = PriorityScheduler(configs, fixed_point)
+            allocation = allocator.allocation_matrix(scheduler, kit_aware=kit_aware, optimal=optimal)
+        results = SatisfactionCalculator(fixed_point).calculate_models(configs, scheduler.to_material_dicts(allocation))
+        timings["allocation"] = time.perf_counter() - started
+
+        return PlanRunResult(lines, results, errors, timings)
+
+    @staticmethod
+    def allocate_partitioned(lines, configs, allocator, kit_aware, optimal, fallback, errors, timings,
+                             fixed_point=False) -> PlanRunResult:
+        """按分区库存分配（各分区并行），参数同 allocate，allocator 为 PartitionedAllocator"""
+        started = time.perf_counter()
+        with memory_monitor.stage("allocate"):
+            outcome = allocator.allocate(
+                configs, [line.partition for line in lines],
+                kit_aware=kit_aware, optimal=optimal, fallback=fallback, fixed_point=fixed_point
+            )
+        results = SatisfactionCalculator(fixed_point).calculate_models(configs, outcome.to_material_dicts())
+        timings["allocation"] = time.perf_counter() - started
+
+        return PlanRunResult(
+            lines, results, errors, timings,
+            transfers=outcome.transfer_totals().tolist(),
+            partitions=outcome.summaries
+        )
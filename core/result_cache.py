@@ -0,0 +1,125 @@
+"""
+分配结果缓存 - 按库存版本和机型配置指纹缓存分配结果（LRU）
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional
+from database.models import ModelConfig
+
+# 默认最多缓存的结果数
+DEFAULT_CACHE_SIZE = 64
+
+
+def config_fingerprint(configs: List[ModelConfig], options: Optional[Dict] = None) -> str:
+    """
+    计算机型配置指纹（机型编码和名称、计划数量、优先级、物料级优先级、BOM内容含描述和分配参数）
+
+    结果中带有机型名称和BOM子项，名称或描述变化后不能再命中旧结果。
+
+    Args:
+        configs: 机型配置列表（顺序有意义）
+        options: 分配参数
+
+    Returns:
+        十六进制指纹
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for config in configs:
+        digest.update(
+            f"{config.model_code}\0{config.model_name}\0{config.plan_quantity}\0{config.priority}\0"
+            f"{sorted(config.material_priorities.items())}\n".encode("utf-8")
+        )
+        for item in config.bom_items:
+            digest.update(
+                f"{item.parent_item_number}\0{item.component_item_number}\0"
+                f"{item.component_description}\0{item.component_num!r}\n".encode("utf-8")
+            )
+        digest.update(b"\x1e")
+    digest.update(repr(sorted((options or {}).items())).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def inventory_fingerprint(inventory_data: Dict[str, float]) -> str:
+    """
+    计算库存数据的内容版本（与加载顺序无关）
+
+    Args:
+        inventory_data: {物料编码: 库存数量}
+
+    Returns:
+        十六进制版本号
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for material_code in sorted(inventory_data):
+        digest.update(f"{material_code}\0{inventory_data[material_code]!r}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """分配结果LRU缓存（库存版本变化时自动清空）"""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        """
+        初始化缓存
+
+        Args:
+            maxsize: 最多缓存的结果数
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.inventory_version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, inventory_version: Hashable, fingerprint: str, compute: Callable):
+        """
+        命中时直接返回缓存结果，否则计算并缓存
+
+        Args:
+            inventory_version: 库存版本
+            fingerprint: 机型配置指纹
+            compute: 无参计算函数
+
+        Returns:
+            分配结果（缓存的结果为共享对象，调用方不应修改）
+        """
+        with self._lock:
+            if inventory_version != self.inventory_version:
+                # 库存已变化，旧版本的结果全部失效
+                self._entries.clear()
+                self.inventory_version = inventory_version
+            result = self._entries.get(fingerprint)
+            if result is not None:
+                self._entries.move_to_end(fingerprint)
+                self.hits += 1
+                return result
+            self.misses += 1
+
+        result = compute()
+        with self._lock:
+            if inventory_version == self.inventory_version:
+                self._entries[fingerprint] = result
+                self._entries.move_to_end(fingerprint)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self.inventory_version = None
+
+    def stats(self) -> Dict:
+        """缓存统计"""
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# 全局分配结果缓存（界面各次分配共享）
+result_cache = ResultCache()
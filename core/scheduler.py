@@ -0,0 +1,265 @@
+"""
+优先级调度器 - 支持任意机型数、任意整数优先级和物料级优先级覆盖
+"""
+import heapq
+from typing import Dict, List
+import numpy as np
+from database.models import ModelConfig
+from core.kernels import (
+    allocate_by_tiers, allocate_by_tiers_fixed, allocate_kit_aware,
+    fixed_point_scale, to_fixed, INT64_LIMIT
+)
+from core.trace import decision_layout
+
+
+class PriorityScheduler:
+    """多机型优先级调度器"""
+
+    def __init__(self, configs: List[ModelConfig], fixed_point: bool = False):
+        """
+        根据机型配置构建物料索引、单台用量矩阵和优先级层级
+
+        Args:
+            configs: 参与分配的机型配置列表
+            fixed_point: 是否以定点整数计算分配（数量按物料精度缩放为 int64，结果精确）
+        """
+        self.configs = configs
+        self.fixed_point = fixed_point
+        self.material_index: Dict[str, int] = {}
+        for config in configs:
+            for item in config.bom_items:
+                self.material_index.setdefault(item.component_item_number, len(self.material_index))
+        self.material_codes = list(self.material_index)
+        self.model_codes = [config.model_code for config in configs]
+
+        model_count = len(configs)
+        material_count = len(self.material_codes)
+        self.per_unit = np.zeros((model_count, material_count))
+        self.bom_mask = np.zeros((model_count, material_count), dtype=bool)
+        self.priorities = np.zeros((model_count, material_count), dtype=np.int64)
+
+        for row, config in enumerate(configs):
+            # 同一物料多行时以最后一行为准
+            for item in config.bom_items:
+                column = self.material_index[item.component_item_number]
+                self.per_unit[row, column] = item.component_num
+                self.bom_mask[row, column] = True
+            self.priorities[row] = config.priority
+            for material_code, priority in config.material_priorities.items():
+                column = self.material_index.get(material_code)
+                if column is not None:
+                    self.priorities[row, column] = priority
+
+        self.plan_quantities = np.array(
+            [config.plan_quantity for config in configs], dtype=np.float64
+        )
+        # 预先计算层级分组：每个(机型, 物料)对应的层级序号，-1 表示不使用该物料
+        self.tiers = self._collect_tiers()
+        tier_positions = {tier: position for position, tier in enumerate(self.tiers)}
+        self.tier_index = np.full((model_count, material_count), -1, dtype=np.int64)
+        for tier, position in tier_positions.items():
+            self.tier_index[self.bom_mask & (self.priorities == tier)] = position
+        self._trace_layout = None
+
+    def _collect_tiers(self) -> List[int]:
+        """按优先级从高到低（数字从小到大）取出所有层级"""
+        heap = list(np.unique(self.priorities[self.bom_mask]).tolist())
+        heapq.heapify(heap)
+        return [heapq.heappop(heap) for _ in range(len(heap))]
+
+    def inventory_vector(self, inventory_data: Dict[str, float]) -> np.ndarray:
+        """将库存字典（或共享内存快照的库存视图）转换为与物料索引对齐的库存向量"""
+        vector = getattr(inventory_data, "vector", None)
+        if vector is not None:
+            return vector(self.material_codes)
+        return np.array(
+            [inventory_data.get(code, 0.0) for code in self.material_codes],
+            dtype=np.float64
+        )
+
+    def trace_layout(self, plan_quantities: np.ndarray = None):
+        """
+        追溯记录的按层级分组决策位置（见 decision_layout）
+
+        计划数量全部大于 0 时需求大于 0 的位置只取决于单台用量，首次计算后缓存复用。
+
+        Args:
+            plan_quantities: 计划数量（机型数,）；默认使用配置中的计划数量
+
+        Returns:
+            决策位置；有计划数量不大于 0 时返回 None（由追溯记录按需求矩阵计算）
+        """
+        if plan_quantities is None:
+            plan_quantities = self.plan_quantities
+        if not np.all(np.asarray(plan_quantities) > 0):
+            return None
+        if self._trace_layout is None:
+            self._trace_layout = decision_layout(self.tier_index, self.per_unit > 0)
+        return self._trace_layout
+
+    def requirements(self, plan_quantities: np.ndarray = None) -> np.ndarray:
+        """
+        计算需求矩阵
+
+        Args:
+            plan_quantities: 计划数量，形状 (..., 机型数)；默认使用配置中的计划数量
+
+        Returns:
+            需求矩阵，形状 (..., 机型数, 物料数)
+        """
+        if plan_quantities is None:
+            plan_quantities = self.plan_quantities
+        return self.per_unit * np.asarray(plan_quantities, dtype=np.float64)[..., None]
+
+    def allocate(
+        self,
+        inventory: np.ndarray,
+        plan_quantities: np.ndarray = None,
+        kit_aware: bool = False,
+        trace=None
+    ) -> np.ndarray:
+        """
+        按优先级层级逐层分配
+
+        Args:
+            inventory: 库存向量，形状 (..., 物料数)
+            plan_quantities: 计划数量，形状 (..., 机型数)；默认使用配置中的计划数量
+            kit_aware: 是否齐套分配（只分配可制造数量能消耗的物料，剩余让给低层级）
+            trace: 可选的 TraceRecorder，记录每个分配决策（仅单组库存时记录）
+
+        Returns:
+            分配矩阵，形状 (..., 机型数, 物料数)
+        """
+        if plan_quantities is None:
+            plan_quantities = self.plan_quantities
+        requirements = self.requirements(plan_quantities)
+        tracing = trace is not None and requirements.ndim == 2 and np.ndim(inventory) == 1
+        if self.fixed_point:
+            allocation = self._allocate_fixed(inventory, plan_quantities, kit_aware, trace if tracing else None)
+            if allocation is not None:
+                return allocation
+        if kit_aware:
+            allocation = allocate_kit_aware(
+                inventory, requirements, self.per_unit, plan_quantities,
+                self.tier_index, len(self.tiers)
+            )
+            if tracing:
+                self.record_trace(trace, inventory, allocation, requirements, plan_quantities)
+        else:
+            # 逐层分配时由内核直接记录各层级前后的库存，追溯不需要额外计算
+            stock_levels = np.empty((len(self.tiers) + 1, len(self.material_codes))) if tracing else None
+            allocation = allocate_by_tiers(
+                inventory, requirements, self.tier_index, len(self.tiers), stock_levels
+            )
+            if tracing:
+                trace.record_allocation(
+                    self.model_codes, self.material_codes,
+                    requirements, allocation, self.tier_index, stock_levels,
+                    self.trace_layout(plan_quantities)
+                )
+        return allocation
+
+    def _allocate_fixed(self, inventory: np.ndarray, plan_quantities, kit_aware: bool, trace=None):
+        """
+        定点整数分配：按物料精度把单台用量和库存缩放为 int64，用整数内核分配后换算回数量
+
+        Returns:
+            分配矩阵；计划数量不是整数或定点乘积可能超出 int64 时返回 None（改用浮点计算）
+
+        Raises:
+            ValueError: 非零单台用量小于定点精度（缩放后为 0）
+        """
+        plans = np.asarray(plan_quantities, dtype=np.float64)
+        if not np.array_equal(plans, np.rint(plans)):
+            return None
+        inventory = np.maximum(inventory, 0)
+        scale = fixed_point_scale(self.per_unit, inventory)
+        per_unit = to_fixed(self.per_unit, scale)
+        underflow = np.argwhere(self.bom_mask & (self.per_unit != 0) & (per_unit == 0))
+        if len(underflow):
+            row, column = underflow[0]
+            raise ValueError(
+                f"机型 {self.model_codes[row]} 的物料 {self.material_codes[column]} 单台用量 "
+                f"{self.per_unit[row, column]} 小于定点精度，不能按定点计算"
+            )
+        stock = to_fixed(inventory, scale)
+        plans = plans.astype(np.int64)
+        # 等比例分配需要 需求 × 库存 不超出 int64
+        largest_requirement = int(per_unit.max(initial=0)) * int(plans.max(initial=0))
+        if largest_requirement * max(int(stock.max(initial=0)), 1) > INT64_LIMIT:
+            return None
+
+        requirements = per_unit * plans[..., None]
+        if kit_aware:
+            allocation = allocate_kit_aware(
+                stock, requirements, per_unit, plans,
+                self.tier_index, len(self.tiers), fixed_point=True
+            ) / scale
+            if trace is not None:
+                self.record_trace(trace, inventory, allocation, requirements / scale, plans)
+            return allocation
+
+        stock_levels = np.empty((len(self.tiers) + 1, len(self.material_codes)), dtype=np.int64) if trace is not None else None
+        allocation = allocate_by_tiers_fixed(
+            stock, requirements, self.tier_index, len(self.tiers), stock_levels
+        ) / scale
+        if trace is not None:
+            trace.record_allocation(
+                self.model_codes, self.material_codes,
+                requirements / scale, allocation, self.tier_index, stock_levels / scale,
+                self.trace_layout(plans)
+            )
+        return allocation
+
+    def record_trace(
+        self,
+        trace,
+        inventory: np.ndarray,
+        allocation: np.ndarray,
+        requirements: np.ndarray = None,
+        plan_quantities: np.ndarray = None
+    ):
+        """
+        将一次分配结果逐层写入追溯记录（分配前后库存按最终分配量逐层扣减）
+
+        Args:
+            trace: TraceRecorder
+            inventory: 库存向量（物料数,）
+            allocation: 分配矩阵（机型数, 物料数）
+            requirements: 需求矩阵；默认按计划数量计算
+            plan_quantities: 计划数量；默认使用配置中的计划数量
+        """
+        if requirements is None:
+            requirements = self.requirements(plan_quantities)
+        layout = self.trace_layout(plan_quantities)
+        material_count = allocation.shape[1]
+        tier_allocated = np.zeros((len(self.tiers) + 1, material_count))
+        if layout is not None:
+            # 按缓存的决策位置逐层汇总，只访问有需求的 机型×物料
+            flat_allocation = allocation.ravel()
+            for tier, (positions, _, materials) in enumerate(layout):
+                tier_allocated[tier] = np.bincount(
+                    materials, weights=flat_allocation[positions], minlength=material_count
+                )
+        else:
+            columns = np.arange(material_count)
+            for row in range(allocation.shape[0]):
+                tier_allocated[self.tier_index[row], columns] += allocation[row]
+        stock_levels = np.empty_like(tier_allocated)
+        stock_levels[0] = np.maximum(inventory, 0)
+        stock_levels[1:] = stock_levels[0] - np.cumsum(tier_allocated[:-1], axis=0)
+        trace.record_allocation(
+            self.model_codes, self.material_codes,
+            requirements, allocation, self.tier_index, stock_levels, layout
+        )
+
+    def to_material_dicts(self, allocation: np.ndarray) -> List[Dict[str, float]]:
+        """将分配矩阵转换为各机型的 {物料编码: 分配数量} 字典"""
+        results = []
+        for row in range(len(self.configs)):
+            columns = np.flatnonzero(self.bom_mask[row])
+            results.append(dict(zip(
+                [self.material_codes[column] for column in columns],
+                allocation[row, columns].tolist()
+            )))
+        return results
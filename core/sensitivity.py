@@ -0,0 +1,140 @@
+"""
+敏感性分析 - 瓶颈物料排序及补料可释放的可制造数量
+"""
+import math
+from dataclasses import dataclass, field
+from typing import List, Sequence
+import numpy as np
+from database.models import AllocationResult
+
+# 默认补料目标步长（计划数量的比例）
+DEFAULT_STEP_RATIO = 0.1
+
+
+@dataclass
+class BottleneckEntry:
+    """瓶颈物料（按紧缺程度排序）"""
+    material_code: str  # 物料编码
+    supported_units: float  # 当前分配量可支撑的台数
+    extra_quantity: float  # 补到下一级所需的补充数量
+    units_after: int  # 连同排在前面的物料一起补足后的可制造数量
+    units_unlocked: int  # 相比上一级多释放的可制造数量
+
+
+@dataclass
+class SensitivityStep:
+    """补料目标（达到指定可制造数量所需的补料）"""
+    target_units: int  # 目标可制造数量
+    materials: List[str]  # 需要补充的物料（按紧缺程度排序）
+    extra_quantities: List[float]  # 各物料需要补充的数量
+    total_extra: float  # 补充数量合计
+
+
+@dataclass
+class ModelSensitivity:
+    """单机型敏感性分析结果"""
+    model_code: str  # 机型编码
+    plan_quantity: int  # 计划制造数量
+    buildable: int  # 当前可制造数量
+    bottlenecks: List[BottleneckEntry] = field(default_factory=list)  # 瓶颈物料排序
+    steps: List[SensitivityStep] = field(default_factory=list)  # 各补料目标
+
+
+class SensitivityAnalyzer:
+    """敏感性分析器（基于物料指标表，不重新执行分配）"""
+
+    def __init__(self, step_ratio: float = DEFAULT_STEP_RATIO):
+        """
+        Args:
+            step_ratio: 补料目标步长，占计划数量的比例（如 0.1 表示每次多造 10%）
+        """
+        self.step_ratio = step_ratio
+
+    def analyze(self, result: AllocationResult, targets: Sequence[int] = None) -> ModelSensitivity:
+        """
+        分析单个机型的瓶颈物料和补料需求
+
+        先按"当前可支撑台数"对物料排序一次；之后任一目标数量所需补充的物料
+        都是排序数组的一个前缀，用二分查找和前缀和即可得到补料数量。
+        补料数量假设补充的库存全部分配给该机型。
+
+        Args:
+            result: 机型分配结果（需包含物料指标表）
+            targets: 目标可制造数量；默认为当前可制造数量之上按步长递增直到计划数量
+
+        Returns:
+            敏感性分析结果
+        """
+        metrics = result.material_metrics
+        plan = result.plan_quantity
+        analysis = ModelSensitivity(
+            model_code=result.model_code,
+            plan_quantity=plan,
+            buildable=result.allocated_quantity
+        )
+        if plan <= 0 or not len(metrics):
+            return analysis
+
+        required = np.asarray(metrics.required, dtype=np.float64)
+        allocated = np.asarray(metrics.allocated, dtype=np.float64)
+        per_unit = required / plan
+        short = (per_unit > 0) & (allocated < required)
+        if not short.any():
+            return analysis
+
+        codes = [code for code, flag in zip(metrics.material_codes, short.tolist()) if flag]
+        per_unit = per_unit[short]
+        allocated = allocated[short]
+        supported = allocated / per_unit
+
+        order = np.argsort(supported, kind="stable")
+        supported = supported[order]
+        per_unit = per_unit[order]
+        allocated = allocated[order]
+        codes = [codes[i] for i in order.tolist()]
+
+        # 瓶颈排序：补足前 j+1 个物料后，可制造数量提升到第 j+2 个物料的可支撑台数（不超过计划）
+        next_level = np.minimum(np.append(supported[1:], plan), plan)
+        units_after = np.floor(next_level)
+        previous_units = np.append(result.allocated_quantity, units_after[:-1])
+        extra = np.maximum(next_level * per_unit - allocated, 0)
+        analysis.bottlenecks = [
+            BottleneckEntry(
+                material_code=code,
+                supported_units=units,
+                extra_quantity=quantity,
+                units_after=int(after),
+                units_unlocked=int(max(after - before, 0))
+            )
+            for code, units, quantity, after, before in zip(
+                codes, supported.tolist(), extra.tolist(),
+                units_after.tolist(), previous_units.tolist()
+            )
+        ]
+
+        # 补料目标：每个目标对应排序数组的一个前缀
+        if targets is None:
+            targets = self.default_targets(result.allocated_quantity, plan)
+        cumulative_per_unit = np.cumsum(per_unit)
+        cumulative_allocated = np.cumsum(allocated)
+        for target in targets:
+            count = int(np.searchsorted(supported, target, side="left"))
+            if count == 0:
+                continue
+            needed = target * per_unit[:count] - allocated[:count]
+            analysis.steps.append(SensitivityStep(
+                target_units=int(target),
+                materials=codes[:count],
+                extra_quantities=needed.tolist(),
+                total_extra=float(
+                    target * cumulative_per_unit[count - 1] - cumulative_allocated[count - 1]
+                )
+            ))
+        return analysis
+
+    def default_targets(self, buildable: int, plan: int) -> List[int]:
+        """当前可制造数量之上按步长递增直到计划数量"""
+        step = max(1, math.ceil(plan * self.step_ratio))
+        targets = list(range(buildable + step, plan, step))
+        targets.append(plan)
+        return targets
@@ -0,0 +1,274 @@
+"""
+共享内存快照 - 库存与BOM数组只发布一次，多个进程只读挂载、零拷贝共享
+"""
+import hashlib
+import json
+import os
+import tempfile
+from collections.abc import Mapping
+from functools import cached_property
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional
+import numpy as np
+from core.bom_matrix import BOMMatrix
+from database.models import BOMItem
+
+# 快照清单目录（记录共享内存名称和数组布局）
+SNAPSHOT_DIR = os.path.join(tempfile.gettempdir(), "jtbd_snapshots")
+
+# 共享内存名称前缀
+SHM_PREFIX = "jtbd_"
+
+# 指向最新快照版本的清单文件名
+LATEST_FILE = "latest"
+
+# 本进程发布的共享内存名称
+_published = set()
+
+
+class SnapshotInventory(Mapping):
+    """快照库存的只读字典视图 {物料编码: 库存}（数值直接读取共享内存）"""
+
+    def __init__(self, material_index: Dict[str, int], values: np.ndarray):
+        self._index = material_index
+        self._values = values
+
+    def __getitem__(self, material_code):
+        return float(self._values[self._index[material_code]])
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def vector(self, material_codes: List[str]) -> np.ndarray:
+        """按给定物料顺序取库存向量（不存在的物料为 0）"""
+        positions = np.array([self._index.get(code, -1) for code in material_codes], dtype=np.int64)
+        return np.where(positions >= 0, self._values[positions], 0.0)
+
+
+class InventorySnapshot:
+    """
+    库存/BOM共享内存快照
+
+    数值数组直接映射共享内存；物料/机型编码表在共享内存中为 \\0 分隔的字节串，各进程在首次访问
+    编码表、bom 或 inventory 时才解码并建立编码索引（每个进程一次，耗时和内存与编码数成正比，
+    物料索引由 BOM 矩阵和库存视图共用）。
+    """
+
+    def __init__(
+        self,
+        shm: shared_memory.SharedMemory,
+        manifest: Dict,
+        owner: bool,
+        snapshot_dir: str = SNAPSHOT_DIR
+    ):
+        self._shm = shm
+        self.manifest = manifest
+        self.owner = owner
+        self.snapshot_dir = snapshot_dir
+        self.version = manifest["version"]
+
+        self._arrays = {
+            name: self._view(layout)
+            for name, layout in manifest["arrays"].items()
+        }
+        self.inventory_values = self._arrays["inventory"]
+
+    @cached_property
+    def material_codes(self) -> List[str]:
+        """物料编码表（首次访问时解码）"""
+        return self._decode(self._arrays["material_codes"])
+
+    @cached_property
+    def parent_codes(self) -> List[str]:
+        """机型编码表（首次访问时解码）"""
+        return self._decode(self._arrays["parent_codes"])
+
+    @cached_property
+    def bom(self) -> BOMMatrix:
+        """BOM稀疏矩阵（数值数组为共享内存视图）"""
+        return BOMMatrix(
+            self.parent_codes,
+            self.material_codes,
+            self._arrays["indptr"],
+            self._arrays["indices"],
+            self._arrays["data"]
+        )
+
+    @property
+    def material_index(self) -> Dict[str, int]:
+        """{物料编码: 列号}"""
+        return self.bom.material_index
+
+    @cached_property
+    def inventory(self) -> SnapshotInventory:
+        """库存的只读字典视图"""
+        return SnapshotInventory(self.material_index, self.inventory_values)
+
+    def _view(self, layout: Dict) -> np.ndarray:
+        """在共享内存上构建只读数组视图（不复制数据）"""
+        array = np.ndarray(
+            tuple(layout["shape"]),
+            dtype=np.dtype(layout["dtype"]),
+            buffer=self._shm.buf,
+            offset=layout["offset"]
+        )
+        array.flags.writeable = False
+        return array
+
+    @staticmethod
+    def _decode(array: np.ndarray) -> List[str]:
+        """解码以 \\0 分隔的编码表"""
+        text = array.tobytes().decode("utf-8")
+        return text.split("\0") if text else []
+
+    @classmethod
+    def publish(
+        cls,
+        inventory_data: Dict[str, float],
+        bom: BOMMatrix,
+        snapshot_dir: str = SNAPSHOT_DIR
+    ) -> "InventorySnapshot":
+        """
+        发布快照：把库存向量和BOM稀疏矩阵写入一块共享内存，并写出清单文件
+
+        Args:
+            inventory_data: 库存字典 {物料编码: 库存}
+            bom: BOM稀疏矩阵
+            snapshot_dir: 清单目录
+
+        Returns:
+            发布方持有的快照（发布方退出前需保持打开，调用 unlink() 释放）
+        """
+        # 物料列：BOM物料在前（与BOM列号一致），其后为仅存在于库存中的物料
+        bom_materials = set(bom.material_codes)
+        material_codes = list(bom.material_codes) + [
+            code for code in inventory_data if code not in bom_materials
+        ]
+        inventory = np.array(
+            [inventory_data.get(code, 0.0) or 0.0 for code in material_codes],
+            dtype=np.float64
+        )
+        payload = {
+            "inventory": inventory,
+            "indptr": bom.indptr.astype(np.int64),
+            "indices": bom.indices.astype(np.int64),
+            "data": bom.data.astype(np.float64),
+            "material_codes": np.frombuffer("\0".join(material_codes).encode("utf-8"), dtype=np.uint8),
+            "parent_codes": np.frombuffer("\0".join(bom.parent_codes).encode("utf-8"), dtype=np.uint8)
+        }
+
+        digest = hashlib.blake2b(digest_size=8)
+        layouts = {}
+        offset = 0
+        for name, array in payload.items():
+            digest.update(name.encode("utf-8"))
+            digest.update(array.tobytes())
+            offset = (offset + 7) // 8 * 8  # 8字节对齐
+            layouts[name] = {"offset": offset, "shape": list(array.shape), "dtype": array.dtype.str}
+            offset += array.nbytes
+        version = digest.hexdigest()
+
+        manifest = {
+            "version": version,
+            "shm_name": SHM_PREFIX + version,
+            "size": max(offset, 1),
+            "arrays": layouts
+        }
+        try:
+            shm = shared_memory.SharedMemory(name=manifest["shm_name"], create=True, size=manifest["size"])
+        except FileExistsError:
+            # 相同内容的快照已经发布，直接挂载
+            return cls.attach(version, snapshot_dir)
+
+        for name, array in payload.items():
+            layout = layouts[name]
+            target = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf, offset=layout["offset"])
+            target[...] = array
+
+        _published.add(shm.name)
+        os.makedirs(snapshot_dir, exist_ok=True)
+        with open(os.path.join(snapshot_dir, f"{version}.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        with open(os.path.join(snapshot_dir, LATEST_FILE), "w", encoding="utf-8") as f:
+            f.write(version)
+        return cls(shm, manifest, owner=True, snapshot_dir=snapshot_dir)
+
+    @classmethod
+    def load_and_publish(cls, db_manager, snapshot_dir: str = SNAPSHOT_DIR) -> "InventorySnapshot":
+        """从数据库读取全部库存和整张BOM表并发布快照"""
+        bom = BOMMatrix.load(db_manager)
+        inventory_data = {
+            matnr: clabs if clabs else 0.0
+            for matnr, clabs in db_manager.get_inventory_data()
+        }
+        return cls.publish(inventory_data, bom, snapshot_dir)
+
+    @classmethod
+    def attach(cls, version: Optional[str] = None, snapshot_dir: str = SNAPSHOT_DIR) -> "InventorySnapshot":
+        """
+        只读挂载已发布的快照（不访问数据库）
+
+        Args:
+            version: 快照版本；为空时挂载最新版本
+            snapshot_dir: 清单目录
+
+        Returns:
+            快照
+        """
+        if version is None:
+            version = cls.latest_version(snapshot_dir)
+            if version is None:
+                raise FileNotFoundError("没有已发布的库存快照")
+        with open(os.path.join(snapshot_dir, f"{version}.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        shm = shared_memory.SharedMemory(name=manifest["shm_name"])
+        if shm.name not in _published:
+            _untrack(shm)
+        return cls(shm, manifest, owner=False, snapshot_dir=snapshot_dir)
+
+    @staticmethod
+    def latest_version(snapshot_dir: str = SNAPSHOT_DIR) -> Optional[str]:
+        """最新发布的快照版本"""
+        try:
+            with open(os.path.join(snapshot_dir, LATEST_FILE), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def bom_items(self, parent_code: str) -> List[BOMItem]:
+        """取出机型的BOM子项（快照不保存物料描述）"""
+        return self.bom.bom_items(parent_code)
+
+    def close(self):
+        """释放本进程对快照的映射（调用前需释放对快照数组的其他引用）"""
+        # 先释放数组视图，否则共享内存缓冲区无法关闭
+        self.inventory = self.inventory_values = self.bom = self._arrays = None
+        self._shm.close()
+
+    def unlink(self):
+        """发布方：删除共享内存和清单文件；最新版本指向本快照时一并删除，之后 attach() 不再挂载本快照"""
+        self.close()
+        if self.owner:
+            self._shm.unlink()
+            _published.discard(self._shm.name)
+            if self.latest_version(self.snapshot_dir) == self.version:
+                try:
+                    os.remove(os.path.join(self.snapshot_dir, LATEST_FILE))
+                except FileNotFoundError:
+                    pass
+            try:
+                os.remove(os.path.join(self.snapshot_dir, f"{self.version}.json"))
+            except FileNotFoundError:
+                pass
+
+
+def _untrack(shm: shared_memory.SharedMemory):
+    """挂载方不应在退出时删除共享内存（Python 3.13 之前 resource_tracker 会误删）"""
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
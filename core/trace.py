@@ -0,0 +1,283 @@
+"""
+分配追溯 - 记录每个分配决策（物料、机型、优先级层级、分配前后库存）
+"""
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# 默认保留的决策条数
+DEFAULT_TRACE_CAPACITY = 1_000_000
+
+# 数值列及其类型
+TRACE_COLUMNS = {
+    "run": np.int64,  # 分配批次号
+    "tier": np.int32,  # 优先级层级序号（0 为最高层级）
+    "model": np.int32,  # 机型
+    "material": np.int32,  # 物料
+    "requested": np.float64,  # 需求数量
+    "allocated": np.float64,  # 分配数量
+    "stock_before": np.float64,  # 该层级分配前的剩余库存
+    "stock_after": np.float64,  # 该层级分配后的剩余库存
+}
+
+
+def decision_layout(tier_index: np.ndarray, mask: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    按层级分组的决策位置（层级内按 机型×物料 的先后顺序）
+
+    Args:
+        tier_index: 层级序号矩阵（机型数, 物料数），-1 表示不使用
+        mask: 需要记录的 机型×物料（如需求大于 0）
+
+    Returns:
+        各层级的 (平铺下标, 机型下标, 物料下标)
+    """
+    material_count = tier_index.shape[1]
+    tier_count = int(tier_index.max(initial=-1)) + 1
+    flat_tiers = tier_index.ravel()
+    positions = np.flatnonzero((flat_tiers >= 0) & mask.ravel())
+    tiers = flat_tiers[positions]
+    positions = positions[np.argsort(tiers, kind="stable")]
+    models, materials = np.divmod(positions, material_count)
+    bounds = np.cumsum(np.bincount(tiers, minlength=tier_count))[:-1]
+    return list(zip(
+        np.split(positions, bounds),
+        np.split(models.astype(np.int32), bounds),
+        np.split(materials.astype(np.int32), bounds)
+    ))
+
+
+@dataclass
+class TraceLog:
+    """追溯日志（列式存储；model/material 列为 model_codes/material_codes 的下标）"""
+    columns: Dict[str, np.ndarray]  # 数值列
+    model_codes: List[str]  # 机型编码表
+    material_codes: List[str]  # 物料编码表
+    run_times: Dict[int, float]  # {分配批次号: 时间戳}
+
+    def __len__(self):
+        return len(self.columns["run"])
+
+    def query(
+        self,
+        material: Optional[str] = None,
+        model: Optional[str] = None,
+        run: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        按物料、机型、批次筛选决策记录（按批次、层级先后排序）
+
+        Args:
+            material: 物料编码
+            model: 机型编码
+            run: 分配批次号
+
+        Returns:
+            决策记录列表
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for name, value, codes in (
+            ("material", material, self.material_codes),
+            ("model", model, self.model_codes),
+        ):
+            if value is not None:
+                if value not in codes:
+                    return []
+                mask &= self.columns[name] == codes.index(value)
+        if run is not None:
+            mask &= self.columns["run"] == run
+
+        positions = np.flatnonzero(mask)
+        order = np.lexsort((self.columns["tier"][positions], self.columns["run"][positions]))
+        selected = {name: column[positions[order]].tolist() for name, column in self.columns.items()}
+        return [
+            {
+                "run": run_id,
+                "time": self.run_times.get(run_id),
+                "tier": tier,
+                "model": self.model_codes[model_id],
+                "material": self.material_codes[material_id],
+                "requested": requested,
+                "allocated": allocated,
+                "stock_before": before,
+                "stock_after": after,
+            }
+            for run_id, tier, model_id, material_id, requested, allocated, before, after in zip(
+                *(selected[name] for name in TRACE_COLUMNS)
+            )
+        ]
+
+    def save(self, filename: str):
+        """
+        保存追溯日志：.parquet 文件需安装 pyarrow，其余保存为压缩的 .npz
+
+        Args:
+            filename: 文件路径
+        """
+        if filename.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            arrays = dict(self.columns)
+            arrays["model"] = pa.DictionaryArray.from_arrays(arrays["model"], pa.array(self.model_codes))
+            arrays["material"] = pa.DictionaryArray.from_arrays(arrays["material"], pa.array(self.material_codes))
+            arrays["time"] = np.array([self.run_times.get(run, np.nan) for run in self.columns["run"].tolist()])
+            pq.write_table(pa.table(arrays), filename)
+            return
+        run_ids = np.array(list(self.run_times), dtype=np.int64)
+        np.savez_compressed(
+            filename,
+            model_codes=np.array(self.model_codes, dtype=str),
+            material_codes=np.array(self.material_codes, dtype=str),
+            run_ids=run_ids,
+            run_times=np.array([self.run_times[run] for run in run_ids.tolist()], dtype=np.float64),
+            **self.columns
+        )
+
+    @classmethod
+    def load(cls, filename: str) -> "TraceLog":
+        """读取 save 保存的追溯日志"""
+        if filename.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            table = pq.read_table(filename)
+            model = table.column("model").combine_chunks()
+            material = table.column("material").combine_chunks()
+            columns = {
+                name: table.column(name).to_numpy().astype(dtype)
+                for name, dtype in TRACE_COLUMNS.items() if name not in ("model", "material")
+            }
+            columns["model"] = model.indices.to_numpy().astype(np.int32)
+            columns["material"] = material.indices.to_numpy().astype(np.int32)
+            run_times = dict(zip(columns["run"].tolist(), table.column("time").to_numpy().tolist()))
+            return cls(
+                {name: columns[name] for name in TRACE_COLUMNS},
+                model.dictionary.to_pylist(),
+                material.dictionary.to_pylist(),
+                run_times
+            )
+        with np.load(filename) as data:
+            return cls(
+                {name: data[name] for name in TRACE_COLUMNS},
+                data["model_codes"].tolist(),
+                data["material_codes"].tolist(),
+                dict(zip(data["run_ids"].tolist(), data["run_times"].tolist()))
+            )
+
+
+class TraceRecorder:
+    """
+    分配追溯记录器（保留最近 capacity 条决策，超出后丢弃最早的记录）
+
+    记录时只复制需求、分配矩阵和各层级剩余库存，逐条决策的各列在导出（to_log）时才按
+    决策位置展开，分配过程中不逐层写入记录。
+    """
+
+    def __init__(self, capacity: int = DEFAULT_TRACE_CAPACITY):
+        """
+        Args:
+            capacity: 最多保留的决策条数
+        """
+        self.capacity = capacity
+        self.written = 0  # 累计写入条数（含已丢弃的）
+        # {批次号: (机型编码表, 物料编码表, 时间戳, 决策位置, 需求, 分配, 各层级剩余库存)}，
+        # 编码表和决策位置引用调度器的对象，不复制
+        self._runs = {}
+        self._retained = 0  # _runs 中的决策条数
+        self._next_run = 0
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    def record_allocation(
+        self,
+        model_codes: List[str],
+        material_codes: List[str],
+        requirements: np.ndarray,
+        allocation: np.ndarray,
+        tier_index: np.ndarray,
+        stock_levels: np.ndarray,
+        layout: Optional[List[Tuple[np.ndarray, np.ndarray, np.ndarray]]] = None
+    ) -> int:
+        """
+        记录一次分配的全部决策（每个有需求的 机型×物料 一条）
+
+        Args:
+            model_codes: 机型编码（行）
+            material_codes: 物料编码（列）
+            requirements: 需求矩阵（机型数, 物料数）
+            allocation: 分配矩阵（机型数, 物料数）
+            tier_index: 层级序号矩阵（机型数, 物料数），-1 表示不使用
+            stock_levels: 各层级分配前的剩余库存（层级数 + 1, 物料数）
+            layout: 可选的按层级分组的决策位置（见 decision_layout）；调度器可缓存复用，
+                省去每次扫描 机型×物料 矩阵
+
+        Returns:
+            分配批次号
+        """
+        run = self._next_run
+        self._next_run += 1
+
+        if layout is None:
+            layout = decision_layout(tier_index, requirements > 0)
+        count = sum(len(positions) for positions, _, _ in layout)
+        self._runs[run] = (
+            model_codes, material_codes, time.time(), layout,
+            requirements.ravel().copy(), allocation.ravel().copy(), stock_levels.copy()
+        )
+        self.written += count
+        self._retained += count
+        self._prune_runs()
+        return run
+
+    def _prune_runs(self):
+        """丢弃最近 capacity 条决策之外的批次"""
+        for run in list(self._runs):
+            count = sum(len(positions) for positions, _, _ in self._runs[run][3])
+            if self._retained - count < self.capacity:
+                break
+            del self._runs[run]
+            self._retained -= count
+
+    def to_log(self) -> TraceLog:
+        """按时间顺序导出最近 capacity 条记录，编码表合并为全局编码表"""
+        model_ids, material_ids = {}, {}
+        run_times = {}
+        parts = {name: [] for name in TRACE_COLUMNS}
+        for run, (run_models, run_materials, run_time, layout, requested, allocated, stock_levels) in self._runs.items():
+            run_times[run] = run_time
+            model_map = np.array(
+                [model_ids.setdefault(code, len(model_ids)) for code in run_models], dtype=np.int32
+            )
+            material_map = np.array(
+                [material_ids.setdefault(code, len(material_ids)) for code in run_materials], dtype=np.int32
+            )
+            for tier, (positions, models, materials) in enumerate(layout):
+                parts["run"].append(np.full(len(positions), run, dtype=np.int64))
+                parts["tier"].append(np.full(len(positions), tier, dtype=np.int32))
+                parts["model"].append(model_map[models])
+                parts["material"].append(material_map[materials])
+                parts["requested"].append(requested[positions])
+                parts["allocated"].append(allocated[positions])
+                parts["stock_before"].append(stock_levels[tier][materials])
+                parts["stock_after"].append(stock_levels[tier + 1][materials])
+
+        count = len(self)
+        columns = {
+            name: np.concatenate(parts[name]).astype(dtype, copy=False)[self._retained - count:]
+            if parts[name] else np.zeros(0, dtype=dtype)
+            for name, dtype in TRACE_COLUMNS.items()
+        }
+        first_run = int(columns["run"][0]) if count else None
+        if first_run is not None:
+            run_times = {run: run_time for run, run_time in run_times.items() if run >= first_run}
+        return TraceLog(columns, list(model_ids), list(material_ids), run_times)
+
+    def save(self, filename: str):
+        """保存当前保留的记录（见 TraceLog.save）"""
+        self.to_log().save(filename)
+
+    def clear(self):
+        """清空记录"""
+        self.written = 0
+        self._retained = 0
+        self._runs.clear()
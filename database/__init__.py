@@ -2,23 +2,36 @@
 数据库模块
 """
 from .connection import db_manager, DatabaseManager
+from .catalog import model_catalog, ModelCatalog
+from .bom_cache import bom_cache, BOMCache
+from .query_stats import query_stats, QueryStats
 from .models import (
     InventoryItem,
     BOMItem,
     ModelConfig,
+    PlanLine,
     AllocationResult,
-    MaterialAllocation
+    MaterialAllocation,
+    MaterialMetrics
 )
 from .config import CONNECTION_STRING, TABLE_INVENTORY, TABLE_BOM
 
 __all__ = [
     'db_manager',
     'DatabaseManager',
+    'model_catalog',
+    'ModelCatalog',
+    'bom_cache',
+    'BOMCache',
+    'query_stats',
+    'QueryStats',
     'InventoryItem',
     'BOMItem',
     'ModelConfig',
+    'PlanLine',
     'AllocationResult',
     'MaterialAllocation',
+    'MaterialMetrics',
     'CONNECTION_STRING',
     'TABLE_INVENTORY',
     'TABLE_BOM'
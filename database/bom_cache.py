@@ -0,0 +1,206 @@
+"""
+BOM缓存 - 选择机型时后台预取BOM，启动时预热最近使用的机型
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+from database.connection import db_manager
+from database.config import CACHE_DIR
+
+# 最近使用机型的本地记录文件
+BOM_USAGE_FILE = os.path.join(CACHE_DIR, "bom_usage.json")
+
+# 内存中最多缓存的机型BOM数
+BOM_CACHE_SIZE = 50
+
+# 最近使用记录保留的机型数
+USAGE_HISTORY_SIZE = 20
+
+# 启动时预热的最近使用机型数
+WARM_RECENT_MODELS = 6
+
+
+class BOMCache:
+    """
+    机型BOM缓存（LRU），并发的同一机型请求共享同一次查询
+
+    clear() 递增缓存代数；查询开始于上一代的结果不写入缓存（避免清空后写回旧的BOM）。
+    """
+
+    def __init__(self, db_manager, usage_file: str = BOM_USAGE_FILE, size: int = BOM_CACHE_SIZE):
+        """
+        初始化BOM缓存
+
+        Args:
+            db_manager: 数据库管理器实例
+            usage_file: 最近使用机型的记录文件
+            size: 最多缓存的机型数
+        """
+        self.db_manager = db_manager
+        self.usage_file = usage_file
+        self.size = size
+        self._lock = threading.Lock()
+        self._rows: "OrderedDict[str, list]" = OrderedDict()  # {机型编码: BOM行}，最近使用的在末尾
+        self._loading = {}  # {机型编码: threading.Event} 正在进行的查询（每个机型一个事件）
+        self._generation = 0  # 缓存代数，clear() 时递增
+        self._usage: Optional[List[str]] = None
+
+    def __contains__(self, model_code: str) -> bool:
+        return model_code in self._rows
+
+    def get(self, model_code: str) -> Optional[list]:
+        """
+        获取机型BOM（已缓存或正在预取时不重复查询）
+
+        Args:
+            model_code: 机型编码
+
+        Returns:
+            BOM行 (Parent_ItemNumber, Component_ItemNumber, 描述, 数量)；查询失败时返回 None
+        """
+        with self._lock:
+            rows = self._rows.get(model_code)
+            if rows is not None:
+                self._rows.move_to_end(model_code)
+                return rows
+            done = self._loading.get(model_code)
+            if done is None:
+                # 由本线程查询，其他线程的同一机型请求等待本次结果
+                done = self._loading[model_code] = threading.Event()
+                generation = self._generation
+            else:
+                generation = None
+        if generation is None:
+            done.wait()
+            with self._lock:
+                rows = self._rows.get(model_code)
+                if rows is not None:
+                    self._rows.move_to_end(model_code)
+                    return rows
+            # 等待的查询失败或期间缓存被清空：重新查询
+            return self.get(model_code)
+        try:
+            return self._fetch(model_code, generation)
+        finally:
+            self._finish(model_code, done)
+
+    def _fetch(self, model_code: str, generation: int) -> Optional[list]:
+        """
+        查询机型BOM并写入缓存；查询失败或查询期间缓存被清空时不缓存
+
+        Args:
+            model_code: 机型编码
+            generation: 查询开始时的缓存代数
+        """
+        bom_data = self.db_manager.get_bom_data(model_code)
+        if bom_data is None:
+            return None
+        rows = [tuple(row) for row in bom_data]
+        with self._lock:
+            if generation == self._generation:
+                self._rows[model_code] = rows
+                self._rows.move_to_end(model_code)
+                while len(self._rows) > self.size:
+                    self._rows.popitem(last=False)
+        return rows
+
+    def _finish(self, model_code: str, done: threading.Event):
+        """结束一次查询：移除进行中的记录（clear 之后可能已被新的查询替换）并唤醒等待的请求"""
+        with self._lock:
+            if self._loading.get(model_code) is done:
+                del self._loading[model_code]
+        done.set()
+
+    def prefetch(self, model_codes: Iterable[str]) -> Optional[threading.Event]:
+        """
+        后台预取机型BOM（已缓存或正在预取的机型跳过）
+
+        Args:
+            model_codes: 机型编码
+
+        Returns:
+            预取完成事件；没有需要预取的机型或数据库未连接时返回 None
+        """
+        if not self.db_manager.engine:
+            return None
+        with self._lock:
+            pending = {
+                code: threading.Event() for code in dict.fromkeys(model_codes)
+                if code and code not in self._rows and code not in self._loading
+            }
+            self._loading.update(pending)
+            generation = self._generation
+        if not pending:
+            return None
+        done = threading.Event()
+        threading.Thread(
+            target=self._background_fetch, args=(pending, generation, done), daemon=True
+        ).start()
+        return done
+
+    def _background_fetch(self, pending: Dict[str, threading.Event], generation: int, done: threading.Event):
+        """后台预取线程（每个机型查询完成后立即唤醒等待该机型的请求）"""
+        try:
+            for model_code, loaded in pending.items():
+                try:
+                    self._fetch(model_code, generation)
+                except Exception as e:
+                    print(f"预取BOM数据失败: {e}")
+                finally:
+                    self._finish(model_code, loaded)
+        finally:
+            done.set()
+
+    def recent_models(self) -> List[str]:
+        """最近使用的机型（最近的在前）"""
+        if self._usage is None:
+            try:
+                with open(self.usage_file, encoding="utf-8") as f:
+                    self._usage = json.load(f)
+            except FileNotFoundError:
+                self._usage = []
+            except Exception as e:
+                print(f"读取机型使用记录失败: {e}")
+                self._usage = []
+        return self._usage
+
+    def record_use(self, model_code: str):
+        """
+        记录机型使用（加载BOM时调用），用于下次启动预热
+
+        Args:
+            model_code: 机型编码
+        """
+        usage = [model_code] + [code for code in self.recent_models() if code != model_code]
+        self._usage = usage[:USAGE_HISTORY_SIZE]
+        try:
+            os.makedirs(os.path.dirname(self.usage_file), exist_ok=True)
+            temp_file = f"{self.usage_file}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(self._usage, f, ensure_ascii=False)
+            os.replace(temp_file, self.usage_file)
+        except Exception as e:
+            print(f"写入机型使用记录失败: {e}")
+
+    def warm(self, limit: int = WARM_RECENT_MODELS) -> Optional[threading.Event]:
+        """
+        后台预热最近使用机型的BOM
+
+        Args:
+            limit: 预热的机型数
+        """
+        return self.prefetch(self.recent_models()[:limit])
+
+    def clear(self):
+        """清空缓存的BOM（数据库BOM更新后调用；进行中的查询结果不再写入缓存）"""
+        with self._lock:
+            self._generation += 1
+            self._rows.clear()
+            # 之后的请求重新查询，不等待清空前开始的查询
+            self._loading.clear()
+
+
+# 全局BOM缓存实例（A/B 两个配置页共享）
+bom_cache = BOMCache(db_manager)
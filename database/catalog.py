@@ -0,0 +1,212 @@
+"""
+机型目录缓存 - 共享的机型列表加载与检索
+"""
+import bisect
+import json
+import os
+import threading
+from typing import Callable, List
+from database.connection import db_manager
+from database.config import CACHE_DIR
+
+# 机型列表的本地缓存文件
+CATALOG_CACHE_FILE = os.path.join(CACHE_DIR, "model_catalog.json")
+
+
+class ModelCatalog:
+    """机型目录（缓存 + 前缀/子串索引）"""
+
+    def __init__(self, db_manager, cache_file: str = CATALOG_CACHE_FILE):
+        """
+        初始化机型目录
+
+        Args:
+            db_manager: 数据库管理器实例
+            cache_file: 机型列表的本地缓存文件
+        """
+        self.db_manager = db_manager
+        self.cache_file = cache_file
+        self.version = 0  # 每次目录内容更新后递增，供界面判断是否需要刷新
+        self._lock = threading.Lock()
+        self._loading = None  # 正在进行的后台加载（threading.Event）
+        self._models = []
+        self._keys = []  # 排序后的小写编码，与 _sorted_models 一一对应
+        self._sorted_models = []
+        self._last_query = None
+        self._last_hits = []
+        self._listeners: List[Callable[[], None]] = []
+
+    def add_listener(self, callback: Callable[[], None]):
+        """
+        注册目录更新回调（每次目录内容更新后调用）
+
+        回调可能在后台加载线程中执行，不得直接调用 Tk 方法；界面应只记录通知（如写入 queue.Queue），由主线程取出后更新。
+
+        Args:
+            callback: 无参回调
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[], None]):
+        """取消注册目录更新回调"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    @property
+    def models(self) -> List[str]:
+        """当前缓存的全部机型编码"""
+        return self._models
+
+    @property
+    def is_loading(self) -> bool:
+        """是否正在后台加载"""
+        return self._loading is not None
+
+    def set_models(self, models: List[str]):
+        """
+        设置机型列表并重建索引
+
+        Args:
+            models: 机型编码列表
+        """
+        unique_models = sorted({model for model in models if model})
+        pairs = sorted((model.lower(), model) for model in unique_models)
+        with self._lock:
+            self._models = unique_models
+            self._keys = [key for key, _ in pairs]
+            self._sorted_models = [model for _, model in pairs]
+            self._last_query = None
+            self._last_hits = []
+            self.version += 1
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception as e:
+                print(f"机型目录更新回调失败: {e}")
+
+    def load(self) -> bool:
+        """
+        从数据库同步加载机型列表
+
+        Returns:
+            是否加载成功
+        """
+        try:
+            parent_items = self.db_manager.get_all_parent_items()
+            if parent_items is None:
+                return False
+            self.set_models([item[0] for item in parent_items])
+            self.save_cache()
+            return True
+        except Exception as e:
+            print(f"加载机型列表失败: {e}")
+            return False
+
+    def load_cache(self) -> bool:
+        """
+        从本地缓存文件加载上次的机型列表（启动时无需等待数据库）
+
+        Returns:
+            是否加载成功
+        """
+        try:
+            with open(self.cache_file, encoding="utf-8") as f:
+                models = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"读取机型列表缓存失败: {e}")
+            return False
+        self.set_models(models)
+        return True
+
+    def save_cache(self):
+        """将当前机型列表写入本地缓存文件"""
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            temp_file = f"{self.cache_file}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(self._models, f, ensure_ascii=False)
+            os.replace(temp_file, self.cache_file)
+        except Exception as e:
+            print(f"写入机型列表缓存失败: {e}")
+
+    def refresh(self, wait: bool = False) -> threading.Event:
+        """
+        后台刷新机型列表，并发的刷新请求共享同一次加载
+
+        Args:
+            wait: 是否等待加载完成
+
+        Returns:
+            加载完成事件
+        """
+        with self._lock:
+            done = self._loading
+            if done is None:
+                done = threading.Event()
+                self._loading = done
+                threading.Thread(
+                    target=self._background_load, args=(done,), daemon=True
+                ).start()
+        if wait:
+            done.wait()
+        return done
+
+    def _background_load(self, done: threading.Event):
+        """后台加载线程"""
+        try:
+            self.load()
+        finally:
+            with self._lock:
+                self._loading = None
+            done.set()
+
+    def search(self, text: str, limit: int = 500) -> List[str]:
+        """
+        检索机型编码，前缀匹配优先，其次为子串匹配
+
+        Args:
+            text: 输入的检索文本（不区分大小写）
+            limit: 最多返回的条数
+
+        Returns:
+            匹配的机型编码列表
+        """
+        query = (text or "").strip().lower()
+        with self._lock:
+            keys = self._keys
+            sorted_models = self._sorted_models
+            if not query:
+                return sorted_models[:limit]
+
+            # 前缀匹配：在有序键上二分查找区间
+            start = bisect.bisect_left(keys, query)
+            end = bisect.bisect_left(keys, query + "\uffff", lo=start)
+            prefix_hits = sorted_models[start:end]
+
+            # 子串匹配：输入是上次检索的延续时，只在上次结果中继续过滤
+            if self._last_query and query.startswith(self._last_query):
+                candidates = self._last_hits
+            else:
+                candidates = range(len(keys))
+            substring_hits = [i for i in candidates if query in keys[i]]
+            self._last_query = query
+            self._last_hits = substring_hits
+
+        results = prefix_hits[:limit]
+        if len(results) < limit:
+            results.extend(
+                sorted_models[i] for i in substring_hits
+                if not keys[i].startswith(query)
+            )
+        return results[:limit]
+
+    def __contains__(self, model_code: str) -> bool:
+        models = self._models
+        index = bisect.bisect_left(models, model_code or "")
+        return index < len(models) and models[index] == model_code
+
+
+# 全局机型目录实例（A/B 两个配置页共享）
+model_catalog = ModelCatalog(db_manager)
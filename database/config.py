@@ -1,6 +1,7 @@
 """
 数据库连接配置
 """
+import os
 
 # 数据库连接字符串
 CONNECTION_STRING = 'mssql+pyodbc://dw:dw@172.16.31.42:1433/BI_TEMP?driver=ODBC+Driver+17+for+SQL+Server'
@@ -8,3 +9,19 @@ CONNECTION_STRING = 'mssql+pyodbc://dw:dw@172.16.31.42:1433/BI_TEMP?driver=ODBC+
 # 表名
 TABLE_INVENTORY = 'XZB_InvNum'
 TABLE_BOM = 'XZB_Forcast_BOM'
+TABLE_ALLOCATION_RESULT = 'XZB_AllocationResult'  # 批量分配结果（可选输出目标）
+
+# 库存分区列（工厂）；需要按库存地点细分时改为 ("WERKS", "LGORT")
+INVENTORY_PARTITION_COLUMNS = ("WERKS",)
+
+# 按物料编码批量查询时每批的参数个数（SQL Server 单条语句最多 2100 个参数）
+QUERY_BATCH_SIZE = 1000
+
+# 流式查询时每批从服务端读取的行数
+STREAM_BATCH_SIZE = 5000
+
+# 慢查询阈值（秒），超过时写入慢查询日志
+SLOW_QUERY_SECONDS = 1.0
+
+# 本地缓存目录（启动时先展示上次缓存的机型列表）
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".jtbd_inventory")
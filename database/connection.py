@@ -1,9 +1,9 @@
 """
 数据库连接管理
 """
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
-from database.config import CONNECTION_STRING
+import time
+from database.config import CONNECTION_STRING, QUERY_BATCH_SIZE, STREAM_BATCH_SIZE
+from database.query_stats import query_stats
 
 
 class DatabaseManager:
@@ -14,10 +14,18 @@ class DatabaseManager:
         self.Session = None
         self.session = None
     
-    def connect(self):
-        """建立数据库连接"""
+    def connect(self, connection_string=None):
+        """
+        建立数据库连接
+
+        Args:
+            connection_string: 连接字符串；为空时使用配置中的 CONNECTION_STRING
+        """
         try:
-            self.engine = create_engine(CONNECTION_STRING)
+            # SQLAlchemy 在首次连接时才导入（界面在后台线程中连接，不阻塞启动）
+            from sqlalchemy import create_engine
+            from sqlalchemy.orm import sessionmaker
+            self.engine = create_engine(connection_string or CONNECTION_STRING)
             self.Session = sessionmaker(bind=self.engine)
             self.session = self.Session()
             print("数据库连接成功")
@@ -35,21 +43,169 @@ class DatabaseManager:
     
     def execute_query(self, query):
         """执行查询"""
-        if not self.session:
+        if not self.engine:
             print("数据库未连接")
             return None
+        from sqlalchemy import text
+        rows = None
+        started = time.perf_counter()
         try:
-            result = self.session.execute(text(query))
-            return result.fetchall()
+            # 每次查询从连接池取独立连接，允许后台线程（如机型目录刷新）并发查询
+            with self.engine.connect() as connection:
+                result = connection.execute(text(query))
+                rows = result.fetchall()
+                return rows
         except Exception as e:
             print(f"查询执行失败: {e}")
             return None
+        finally:
+            query_stats.record(
+                query, None, time.perf_counter() - started,
+                len(rows) if rows is not None else 0, rows is None
+            )
     
-    def get_inventory_data(self):
-        """获取库存数据"""
+    def iter_query(self, query, params=None, batch_size=STREAM_BATCH_SIZE):
+        """
+        流式执行查询（服务端游标），逐行返回结果，不在内存中保留完整结果集
+
+        Args:
+            query: SQL语句（字符串或 text() 对象）
+            params: 绑定参数
+            batch_size: 每批从服务端读取的行数
+
+        Yields:
+            查询结果行
+
+        Raises:
+            RuntimeError: 数据库未连接或查询中途失败（已读取的部分结果不完整，调用方不应使用）
+        """
+        if not self.engine:
+            query_stats.record(query, params, 0.0, 0, True)
+            raise RuntimeError("数据库未连接")
+        from sqlalchemy import text
+        statement = text(query) if isinstance(query, str) else query
+        # 只统计取数耗时，不含调用方处理各批结果的时间
+        elapsed = 0.0
+        rows = 0
+        error = False
+        try:
+            with self.engine.connect() as connection:
+                started = time.perf_counter()
+                result = connection.execution_options(
+                    stream_results=True, yield_per=batch_size
+                ).execute(statement, params or {})
+                partitions = result.partitions()
+                elapsed += time.perf_counter() - started
+                while True:
+                    started = time.perf_counter()
+                    partition = next(partitions, None)
+                    elapsed += time.perf_counter() - started
+                    if partition is None:
+                        break
+                    rows += len(partition)
+                    yield from partition
+        except Exception as e:
+            error = True
+            raise RuntimeError(f"查询执行失败: {e}") from e
+        finally:
+            query_stats.record(statement, params, elapsed, rows, error)
+
+    def get_inventory_data(self, material_codes=None):
+        """
+        获取库存数据（流式，同一物料的多行库存按物料汇总）
+
+        Args:
+            material_codes: 需要的物料编码集合；为 None 时读取全部库存
+
+        Yields:
+            (MATNR, CLABS) 行
+        """
         from database.config import TABLE_INVENTORY
-        query = f"SELECT MATNR, CLABS FROM {TABLE_INVENTORY}"
-        return self.execute_query(query)
+        yield from self._iter_inventory_query(
+            f"SELECT MATNR, SUM(CLABS) FROM {TABLE_INVENTORY}",
+            "GROUP BY MATNR",
+            material_codes
+        )
+
+    def get_partitioned_inventory_data(self, material_codes=None):
+        """
+        按分区（工厂/库存地点）获取库存数据（流式）
+
+        Args:
+            material_codes: 需要的物料编码集合；为 None 时读取全部库存
+
+        Yields:
+            (分区, MATNR, CLABS) 行，分区为各分区列的值以 "/" 连接
+        """
+        from database.config import TABLE_INVENTORY, INVENTORY_PARTITION_COLUMNS
+        columns = ", ".join(INVENTORY_PARTITION_COLUMNS)
+        for row in self._iter_inventory_query(
+            f"SELECT {columns}, MATNR, SUM(CLABS) FROM {TABLE_INVENTORY}",
+            f"GROUP BY {columns}, MATNR",
+            material_codes
+        ):
+            partition = "/".join("" if value is None else str(value).strip() for value in row[:-2])
+            yield partition, row[-2], row[-1]
+
+    def _iter_inventory_query(self, select, group_by, material_codes=None):
+        """执行库存查询，提供物料编码时在服务端分批过滤"""
+        if material_codes is None:
+            yield from self.iter_query(f"{select} {group_by}")
+            return
+
+        from sqlalchemy import text, bindparam
+
+        # 在服务端按物料编码过滤，分批绑定参数（SQL Server 单条语句参数上限 2100）
+        query = text(
+            f"{select} WHERE MATNR IN :codes {group_by}"
+        ).bindparams(bindparam("codes", expanding=True))
+        codes = sorted(set(material_codes))
+        for start in range(0, len(codes), QUERY_BATCH_SIZE):
+            yield from self.iter_query(
+                query, {"codes": codes[start:start + QUERY_BATCH_SIZE]}
+            )
+    
+    def write_allocation_results(self, rows, replace_job=None):
+        """
+        在一个事务中写入批量分配结果
+
+        Args:
+            rows: 结果行字典列表，键为 TABLE_ALLOCATION_RESULT 的列名
+            replace_job: 任务ID；提供时在同一事务中先删除该任务已写入的行（任务重试时不重复写入）
+
+        Returns:
+            是否写入成功
+        """
+        if not self.engine:
+            print("数据库未连接")
+            return False
+        if not rows and replace_job is None:
+            return True
+        from sqlalchemy import text
+        from database.config import TABLE_ALLOCATION_RESULT
+        delete = text(f"DELETE FROM {TABLE_ALLOCATION_RESULT} WHERE JobId = :job_id")
+        statement = delete
+        if rows:
+            columns = list(rows[0])
+            statement = text(
+                f"INSERT INTO {TABLE_ALLOCATION_RESULT} ({', '.join(columns)}) "
+                f"VALUES ({', '.join(':' + column for column in columns)})"
+            )
+        started = time.perf_counter()
+        error = True
+        try:
+            with self.engine.begin() as connection:
+                if replace_job is not None:
+                    connection.execute(delete, {"job_id": replace_job})
+                if rows:
+                    connection.execute(statement, rows)
+            error = False
+            return True
+        except Exception as e:
+            print(f"写入分配结果失败: {e}")
+            return False
+        finally:
+            query_stats.record(statement, None, time.perf_counter() - started, len(rows), error)
     
     def get_bom_data(self, parent_item_number):
         """获取指定机型的BOM数据"""
@@ -62,6 +218,45 @@ class DatabaseManager:
         """
         return self.execute_query(query)
     
+    def iter_bom_data(self, parent_item_numbers):
+        """
+        批量读取多个机型的BOM数据（按父项编码分批绑定参数）
+
+        Args:
+            parent_item_numbers: 机型编码集合
+
+        Yields:
+            (Parent_ItemNumber, Component_ItemNumber, [Component_ItemNumber Description], [Component_ItemNumber Num]) 行
+        """
+        from sqlalchemy import text, bindparam
+        from database.config import TABLE_BOM
+        query = text(f"""
+        SELECT Parent_ItemNumber, Component_ItemNumber,
+               [Component_ItemNumber Description], [Component_ItemNumber Num]
+        FROM {TABLE_BOM}
+        WHERE Parent_ItemNumber IN :parents
+        """).bindparams(bindparam("parents", expanding=True))
+        parents = sorted(set(parent_item_numbers))
+        for start in range(0, len(parents), QUERY_BATCH_SIZE):
+            yield from self.iter_query(
+                query, {"parents": parents[start:start + QUERY_BATCH_SIZE]}
+            )
+    
+    def iter_all_bom_rows(self):
+        """
+        流式读取整张BOM表（按父项排序）
+
+        Yields:
+            (Parent_ItemNumber, Component_ItemNumber, [Component_ItemNumber Num]) 行
+        """
+        from database.config import TABLE_BOM
+        query = f"""
+        SELECT Parent_ItemNumber, Component_ItemNumber, [Component_ItemNumber Num]
+        FROM {TABLE_BOM}
+        ORDER BY Parent_ItemNumber
+        """
+        yield from self.iter_query(query)
+    
     def get_all_parent_items(self):
         """获取所有父项编码（机型）"""
         from database.config import TABLE_BOM
@@ -1,8 +1,8 @@
 """
 数据模型定义
 """
-from dataclasses import dataclass
-from typing import List, Dict
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional
 
 
 @dataclass
@@ -29,6 +29,37 @@ class ModelConfig:
     plan_quantity: int  # 计划制造数量
     priority: int  # 优先级（1=最高，2=次之，以此类推）
     bom_items: List[BOMItem]  # BOM子项列表
+    material_priorities: Dict[str, int] = field(default_factory=dict)  # 物料级优先级覆盖 {物料编码: 优先级}
+
+
+@dataclass
+class PlanLine:
+    """计划导入行"""
+    model_code: str  # 机型编码
+    plan_quantity: int  # 计划制造数量
+    priority: int = 1  # 优先级（1=最高）
+    line_number: int = 0  # 在导入文件中的行号
+    partition: str = ""  # 领料分区（工厂/库存地点），按分区分配时使用
+
+
+@dataclass
+class MaterialMetrics:
+    """机型物料指标表（列式存储，由满足率计算器一次性生成）"""
+    material_codes: List[str] = field(default_factory=list)  # 物料编码
+    required: List[float] = field(default_factory=list)  # 需求数量
+    allocated: List[float] = field(default_factory=list)  # 分配数量
+    shortage: List[float] = field(default_factory=list)  # 短缺数量
+    ratio: List[float] = field(default_factory=list)  # 物料满足比例（0~1）
+    avg_satisfaction: float = 0.0  # 子项物料平均满足率（百分比）
+    bottleneck_material: Optional[str] = None  # 瓶颈物料（满足比例最低的短缺物料）
+    bottleneck_ratio: float = 1.0  # 瓶颈物料满足比例
+
+    def rows(self):
+        """按行遍历 (物料编码, 需求数量, 分配数量, 短缺数量, 满足比例)"""
+        return zip(self.material_codes, self.required, self.allocated, self.shortage, self.ratio)
+
+    def __len__(self):
+        return len(self.material_codes)
 
 
 @dataclass
@@ -41,7 +72,8 @@ class AllocationResult:
     satisfaction_rate: float  # 满足率（百分比）
     allocated_materials: Dict[str, float]  # 分配到的物料清单 {物料编码: 数量}
     shortage_materials: Dict[str, float]  # 短缺物料清单 {物料编码: 短缺数量}
-    bom_items: List[BOMItem]  # BOM子项列表（用于计算物料平均满足率）
+    bom_items: List[BOMItem]  # BOM子项列表
+    material_metrics: MaterialMetrics = field(default_factory=MaterialMetrics)  # 物料指标表
 
 
 @dataclass
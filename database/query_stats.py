@@ -0,0 +1,215 @@
+"""
+查询统计 - 记录每次数据库往返的耗时和行数，按语句指纹汇总，记录慢查询，并按界面操作汇总查询次数
+"""
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List
+from database.config import CACHE_DIR, SLOW_QUERY_SECONDS
+
+# 慢查询日志文件
+SLOW_QUERY_LOG = os.path.join(CACHE_DIR, "slow_queries.log")
+
+# 保留最近多少次界面操作的汇总
+ACTION_HISTORY_SIZE = 50
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_EXPANDING_PARAM = re.compile(r"\(?__\[POSTCOMPILE_(\w+)\]\)?")
+
+
+@lru_cache(maxsize=1024)
+def statement_fingerprint(statement: str) -> str:
+    """
+    语句指纹：字面量替换为 ?，IN 列表合并，空白折叠（只差参数值的语句归为同一类）
+
+    Args:
+        statement: SQL语句
+
+    Returns:
+        指纹
+    """
+    fingerprint = _EXPANDING_PARAM.sub(r"(:\1)", statement)
+    fingerprint = _STRING_LITERAL.sub("?", fingerprint)
+    fingerprint = _NUMBER_LITERAL.sub("?", fingerprint)
+    fingerprint = _VALUE_LIST.sub("(?...)", fingerprint)
+    return _WHITESPACE.sub(" ", fingerprint).strip()
+
+
+def _format_rows(rows: int) -> str:
+    """格式化行数（41000 -> 41.0k）"""
+    return str(rows) if rows < 1000 else f"{rows / 1000:.1f}k"
+
+
+@dataclass
+class StatementStats:
+    """同一指纹语句的累计统计"""
+    fingerprint: str  # 语句指纹
+    calls: int = 0  # 执行次数
+    rows: int = 0  # 返回/写入的总行数
+    elapsed: float = 0.0  # 总耗时（秒）
+    slowest: float = 0.0  # 最慢一次耗时（秒）
+    errors: int = 0  # 失败次数
+
+
+@dataclass
+class ActionSummary:
+    """一次界面操作期间的查询汇总"""
+    name: str  # 操作名称
+    queries: int = 0  # 查询次数
+    rows: int = 0  # 行数
+    elapsed: float = 0.0  # 查询耗时合计（秒）
+    repeated: int = 0  # 完全相同的语句（含参数）重复执行的次数
+    wall: float = 0.0  # 操作总耗时（秒）
+    started: float = field(default_factory=time.perf_counter, repr=False)
+    _seen: set = field(default_factory=set, repr=False)
+    _owner: list = field(default=None, repr=False)  # 开始该操作的线程的进行中操作列表
+
+    def __str__(self):
+        text = f"{self.name} = {self.queries} 次查询，{self.elapsed:.2f} 秒，{_format_rows(self.rows)} 行"
+        if self.repeated:
+            text += f"（重复 {self.repeated} 次）"
+        return text
+
+
+class QueryStats:
+    """数据库查询统计（各线程共享，界面操作只统计开始该操作的线程的查询；开销为每次查询一次计时和字典更新）"""
+
+    def __init__(self, slow_threshold: float = SLOW_QUERY_SECONDS, slow_log: str = SLOW_QUERY_LOG):
+        """
+        Args:
+            slow_threshold: 慢查询阈值（秒）；为 None 时不记录慢查询
+            slow_log: 慢查询日志文件
+        """
+        self.slow_threshold = slow_threshold
+        self.slow_log = slow_log
+        self.statements: Dict[str, StatementStats] = {}
+        self.actions = deque(maxlen=ACTION_HISTORY_SIZE)  # 最近完成的界面操作
+        self._local = threading.local()  # 各线程正在进行的界面操作（_local.active）
+        self._lock = threading.Lock()
+
+    def _active(self) -> List[ActionSummary]:
+        """当前线程正在进行的界面操作"""
+        active = getattr(self._local, "active", None)
+        if active is None:
+            active = self._local.active = []
+        return active
+
+    def record(self, statement, params, elapsed: float, rows: int, error: bool = False):
+        """
+        记录一次查询
+
+        Args:
+            statement: SQL语句（字符串或 text() 对象）
+            params: 绑定参数（用于识别完全相同的重复查询）；批量写入时为 None
+            elapsed: 耗时（秒）
+            rows: 返回/写入的行数
+            error: 是否失败
+        """
+        sql = str(statement)
+        fingerprint = statement_fingerprint(sql)
+        key = hash((sql, repr(params)))
+        with self._lock:
+            stats = self.statements.get(fingerprint)
+            if stats is None:
+                stats = self.statements[fingerprint] = StatementStats(fingerprint)
+            stats.calls += 1
+            stats.rows += rows
+            stats.elapsed += elapsed
+            stats.slowest = max(stats.slowest, elapsed)
+            stats.errors += error
+            for action in self._active():
+                action.queries += 1
+                action.rows += rows
+                action.elapsed += elapsed
+                if key in action._seen:
+                    action.repeated += 1
+                action._seen.add(key)
+        if self.slow_threshold is not None and elapsed >= self.slow_threshold:
+            self._log_slow(fingerprint, elapsed, rows)
+
+    def _log_slow(self, fingerprint: str, elapsed: float, rows: int):
+        """追加一条慢查询日志"""
+        try:
+            os.makedirs(os.path.dirname(self.slow_log), exist_ok=True)
+            with self._lock, open(self.slow_log, "a", encoding="utf-8") as f:
+                f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')}\t{elapsed:.3f}s\t{rows} 行\t{fingerprint}\n")
+        except Exception as e:
+            print(f"写入慢查询日志失败: {e}")
+
+    def begin(self, name: str) -> ActionSummary:
+        """
+        开始统计一次界面操作（期间当前线程的查询计入该操作，其他线程的查询不计入）
+
+        Args:
+            name: 操作名称
+
+        Returns:
+            操作汇总（end 之后完整）
+        """
+        action = ActionSummary(name)
+        with self._lock:
+            action._owner = self._active()
+            action._owner.append(action)
+        return action
+
+    def end(self, action: ActionSummary) -> ActionSummary:
+        """结束统计一次界面操作（可以在其他线程调用）"""
+        action.wall = time.perf_counter() - action.started
+        with self._lock:
+            if action._owner is not None:
+                action._owner[:] = [active for active in action._owner if active is not action]
+            self.actions.append(action)
+        return action
+
+    @contextmanager
+    def action(self, name: str):
+        """
+        统计一次界面操作的查询
+
+        Args:
+            name: 操作名称
+        """
+        action = self.begin(name)
+        try:
+            yield action
+        finally:
+            self.end(action)
+
+    def report(self) -> List[StatementStats]:
+        """按总耗时从高到低返回各指纹的统计"""
+        with self._lock:
+            return sorted(self.statements.values(), key=lambda stats: stats.elapsed, reverse=True)
+
+    def summary(self, limit: int = 10) -> str:
+        """多行摘要：总体查询次数和耗时最高的语句"""
+        report = self.report()
+        lines = [
+            f"共 {sum(stats.calls for stats in report)} 次查询，"
+            f"{sum(stats.elapsed for stats in report):.2f} 秒，"
+            f"{_format_rows(sum(stats.rows for stats in report))} 行，{len(report)} 类语句"
+        ]
+        for stats in report[:limit]:
+            lines.append(
+                f"  {stats.calls} 次 / {stats.elapsed:.3f} 秒（最慢 {stats.slowest:.3f} 秒）/ "
+                f"{_format_rows(stats.rows)} 行{f' / 失败 {stats.errors} 次' if stats.errors else ''}："
+                f"{stats.fingerprint}"
+            )
+        return "\n".join(lines)
+
+    def reset(self):
+        """清空统计"""
+        with self._lock:
+            self.statements.clear()
+            self.actions.clear()
+
+
+# 全局查询统计
+query_stats = QueryStats()
@@ -5,14 +5,608 @@ JTBD库存分配系统 - 主程序入口
 - 支持A、B两款机型的库存分配
 - 根据优先级规则分配共用物料
 - 计算并展示各机型的满足率
+- 命令行生成全部机型的可制造性报告（--buildability）
+- 发布库存/BOM共享内存快照供多进程复用（--publish-snapshot）
+- 本地HTTP分配服务，供多个计划员共享常驻缓存（--serve）
+- 查询导出的分配追溯日志（--query-trace）
+- 从CSV/Excel批量导入计划并一次完成多机型分配（--import-plan）
+- 按工厂/库存地点分区并行分配，可选跨分区调拨（--by-partition / --cross-partition）
+- 定点整数分配，结果无浮点误差（--fixed-point）
+- 各阶段内存统计与内存预算（--memory-profile / --memory-budget）
+- 历史库存保存与按历史库存重放计划（--record-history / --list-history / --as-of）
+- 数据库查询统计：按语句汇总次数/耗时/行数，记录慢查询（--query-stats）
+- 定时批量分配：本地任务队列与执行进程（--batch-schedule / --batch-enqueue / --batch-worker / --batch-status）
 """
-import tkinter as tk
-from ui.main_window import MainWindow
+import time
+
+# 进程启动时间（启动基准测试以此为起点）：必须在导入其他模块之前取值，导入耗时才计入启动时间
+STARTED_AT = time.perf_counter()
+
+import argparse
 import sys
 
+# 启动基准：窗口可用的目标耗时（秒）
+STARTUP_TARGET_SECONDS = 0.5
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="JTBD库存分配系统")
+    parser.add_argument(
+        "--buildability",
+        action="store_true",
+        help="生成全部机型的可制造性报告（不启动界面）"
+    )
+    parser.add_argument(
+        "--publish-snapshot",
+        action="store_true",
+        help="加载库存和BOM并发布到共享内存，供多个计划进程只读挂载（按 Ctrl+C 退出并释放）"
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="以本地HTTP服务方式运行，提供分配、扫描和可制造性接口（JSON）"
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="服务监听地址（默认 127.0.0.1）"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="服务监听端口（默认 8765）"
+    )
+    parser.add_argument(
+        "--from-snapshot",
+        action="store_true",
+        help="服务挂载最新的共享内存快照，不访问数据库"
+    )
+    parser.add_argument(
+        "--database-url",
+        help="数据库连接字符串（默认使用 database/config.py 中的配置，可用 sqlite:///文件 做本地测试）"
+    )
+    parser.add_argument(
+        "--startup-benchmark",
+        action="store_true",
+        help="测量界面冷启动耗时（窗口可用后自动退出）"
+    )
+    parser.add_argument(
+        "--import-plan",
+        metavar="FILE",
+        help="导入计划文件（CSV/xlsx，列：机型编码、计划数量、优先级）并执行多机型分配"
+    )
+    parser.add_argument(
+        "--strategy",
+        choices=["priority", "kit", "optimal"],
+        default="priority",
+        help="计划导入的分配策略：priority 优先级分配 / kit 齐套分配 / optimal 最优分配"
+    )
+    parser.add_argument(
+        "--by-partition",
+        action="store_true",
+        help="计划导入时按计划行的库区列只用本分区（工厂/库存地点）库存分配，各分区并行计算"
+    )
+    parser.add_argument(
+        "--cross-partition",
+        action="store_true",
+        help="配合 --by-partition：允许用其他分区的剩余库存补足缺口"
+    )
+    parser.add_argument(
+        "--fixed-point",
+        action="store_true",
+        help="计划导入时以定点整数计算分配（库存和单台用量按物料精度缩放为 int64，避免浮点误差少算一台）"
+    )
+    parser.add_argument(
+        "--query-trace",
+        metavar="FILE",
+        help="查询导出的分配追溯日志（.npz 或 .parquet），可配合 --material / --model 筛选"
+    )
+    parser.add_argument(
+        "--material",
+        help="追溯查询：物料编码"
+    )
+    parser.add_argument(
+        "--model",
+        help="追溯查询：机型编码"
+    )
+    parser.add_argument(
+        "--as-of",
+        metavar="VERSION",
+        help="计划导入时使用历史库存（版本号或日期 YYYY-MM-DD，取当天最后一个版本）重放分配"
+    )
+    parser.add_argument(
+        "--record-history",
+        action="store_true",
+        help="读取当前全部库存并保存为一个历史版本（压缩增量，适合每日定时执行）"
+    )
+    parser.add_argument(
+        "--list-history",
+        action="store_true",
+        help="列出已保存的历史库存版本"
+    )
+    parser.add_argument(
+        "--batch-schedule",
+        metavar="FILE",
+        help="从JSON文件登记定时批量任务（每项含 name、plan、interval 以及 strategy/snapshot/outputs 等）"
+    )
+    parser.add_argument(
+        "--batch-enqueue",
+        metavar="NAME",
+        help="立即将指定定时任务加入批量队列执行一次"
+    )
+    parser.add_argument(
+        "--batch-worker",
+        action="store_true",
+        help="启动批量执行进程：按周期领取到期任务，共享库存/BOM加载并行分配（按 Ctrl+C 退出）"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="批量执行进程的工作线程数（默认 4）"
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="配合 --batch-worker：只执行一个周期后退出（可由系统定时任务调用）"
+    )
+    parser.add_argument(
+        "--batch-status",
+        action="store_true",
+        help="列出定时批量任务和最近的任务执行情况"
+    )
+    parser.add_argument(
+        "--memory-profile",
+        action="store_true",
+        help="统计加载/分配/计算/展示/导出各阶段的峰值和留存内存（tracemalloc，会降低运行速度）"
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=float,
+        metavar="MB",
+        help="内存预算（MB，自动开启内存统计）：加载超出时中止，展示和导出改为精简/流式处理"
+    )
+    parser.add_argument(
+        "--query-stats",
+        action="store_true",
+        help="退出时打印数据库查询统计（按语句指纹汇总次数、耗时和行数）"
+    )
+    parser.add_argument(
+        "--output",
+        help="报告/分配结果输出的CSV文件路径（默认打印到控制台）"
+    )
+    return parser.parse_args(argv)
+
+
+def run_buildability_report(output=None, database_url=None):
+    """
+    生成可制造性报告
+
+    Args:
+        output: CSV文件路径；为空时打印到控制台
+        database_url: 数据库连接字符串；为空时使用默认配置
+
+    Returns:
+        进程退出码
+    """
+    from database.connection import db_manager
+    from core.buildability import build_report
+
+    if not db_manager.connect(database_url):
+        return 1
+    try:
+        report = build_report(db_manager)
+    except RuntimeError as e:
+        print(f"生成可制造性报告失败: {e}")
+        return 1
+    finally:
+        db_manager.disconnect()
+
+    if output:
+        report.to_csv(output)
+        print(f"可制造性报告已保存到: {output}（共 {len(report)} 个机型）")
+    else:
+        print("机型编码\t最大可制造数量\t瓶颈物料\t瓶颈物料库存\t单台用量")
+        for parent, units, material, inventory, per_unit in report.rows():
+            units_text = "不受限" if units == float("inf") else f"{int(units)}"
+            print(f"{parent}\t{units_text}\t{material or ''}\t{inventory:.2f}\t{per_unit:.2f}")
+    return 0
+
+
+def run_snapshot_publisher(database_url=None):
+    """
+    发布共享内存快照并保持到用户中断
+
+    Args:
+        database_url: 数据库连接字符串；为空时使用默认配置
+
+    Returns:
+        进程退出码
+    """
+    from database.connection import db_manager
+    from core.snapshot import InventorySnapshot
+
+    if not db_manager.connect(database_url):
+        return 1
+    try:
+        snapshot = InventorySnapshot.load_and_publish(db_manager)
+    except RuntimeError as e:
+        print(f"发布库存快照失败: {e}")
+        return 1
+    finally:
+        db_manager.disconnect()
+
+    print(
+        f"库存快照已发布: 版本 {snapshot.version}，"
+        f"{len(snapshot.material_codes)} 个物料，{len(snapshot.parent_codes)} 个机型"
+    )
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        snapshot.unlink()
+        print("库存快照已释放")
+    return 0
+
+
+def run_service(host, port, from_snapshot=False, database_url=None):
+    """
+    运行本地HTTP分配服务
+
+    Args:
+        host: 监听地址
+        port: 监听端口
+        from_snapshot: 是否挂载共享内存快照（不访问数据库）
+        database_url: 数据库连接字符串；为空时使用默认配置
+
+    Returns:
+        进程退出码
+    """
+    from database.connection import db_manager
+    from service import AllocationService, run_server
+
+    if from_snapshot:
+        from core.snapshot import InventorySnapshot
+        try:
+            snapshot = InventorySnapshot.attach()
+        except FileNotFoundError as e:
+            print(f"挂载库存快照失败: {e}")
+            return 1
+        service = AllocationService.from_snapshot(snapshot)
+    else:
+        if not db_manager.connect(database_url):
+            return 1
+        service = AllocationService(db_manager)
+        if not service.load():
+            db_manager.disconnect()
+            return 1
+
+    status = service.status()
+    print(f"服务数据已加载: {status['models']} 个机型，{status['materials']} 个物料")
+    try:
+        run_server(service, host, port)
+    finally:
+        if not from_snapshot:
+            db_manager.disconnect()
+    return 0
+
+
+def run_startup_benchmark():
+    """
+    测量从进程启动到主窗口可用（首次绘制完成、可响应输入）的耗时
+
+    Returns:
+        进程退出码（超过目标耗时返回 1）
+    """
+    timings = [("进程启动", STARTED_AT)]
+    import tkinter as tk
+    from ui.main_window import MainWindow
+    timings.append(("导入界面模块", time.perf_counter()))
+
+    root = tk.Tk()
+    app = MainWindow(root)
+    timings.append(("创建主窗口", time.perf_counter()))
+
+    root.update()
+    timings.append(("首次绘制完成", time.perf_counter()))
+    ready = timings[-1][1] - STARTED_AT
+
+    for (_, previous), (label, current) in zip(timings, timings[1:]):
+        print(f"{label}: {(current - previous) * 1000:.0f} ms")
+    print(f"窗口可用总耗时: {ready * 1000:.0f} ms（目标 {STARTUP_TARGET_SECONDS * 1000:.0f} ms）")
+    heavy_modules = [name for name in ("pandas", "openpyxl", "sqlalchemy", "scipy") if name in sys.modules]
+    if heavy_modules:
+        print(f"启动时已导入的重量级模块: {', '.join(heavy_modules)}")
+
+    root.destroy()
+    return 0 if ready <= STARTUP_TARGET_SECONDS else 1
+
+
+def run_plan_import(filename, strategy="priority", output=None, database_url=None,
+                    by_partition=False, cross_partition=False, as_of=None, fixed_point=False):
+    """
+    导入计划文件并执行多机型分配
+
+    Args:
+        filename: 计划文件
+        strategy: 分配策略（priority/kit/optimal）
+        output: 结果CSV路径；为空时打印到控制台
+        database_url: 数据库连接字符串；为空时使用默认配置
+        by_partition: 是否按分区库存分配
+        cross_partition: 按分区分配时是否允许跨分区调拨
+        as_of: 历史库存版本号或日期；为空时使用当前库存
+        fixed_point: 是否以定点整数计算分配
+
+    Returns:
+        进程退出码
+    """
+    from database.connection import db_manager
+    from core.plan_import import PlanImporter
+
+    if not db_manager.connect(database_url):
+        return 1
+    try:
+        result = PlanImporter(db_manager).run(
+            filename,
+            kit_aware=strategy == "kit",
+            optimal=strategy == "optimal",
+            by_partition=by_partition,
+            cross_partition=cross_partition,
+            as_of=as_of,
+            fixed_point=fixed_point
+        )
+    except (OSError, ValueError, RuntimeError, MemoryError) as e:
+        print(f"计划导入失败: {e}")
+        return 1
+    finally:
+        db_manager.disconnect()
+
+    for error in result.errors:
+        print(f"跳过: {error}")
+    from core.memory import memory_monitor
+    if output:
+        with memory_monitor.stage("export"):
+            result.to_csv(output)
+        print(f"分配结果已保存到: {output}")
+    else:
+        print("机型编码\t计划数量\t优先级\t可制造数量\t满足率\t瓶颈物料\t分区\t调入数量")
+        for code, quantity, priority, units, rate, bottleneck, partition, transfer in result.rows():
+            print(f"{code}\t{quantity}\t{priority}\t{units}\t{rate:.2f}%\t{bottleneck or ''}\t{partition}\t{transfer:g}")
+    for summary in result.partitions:
+        print(
+            f"分区 {summary.partition}: {summary.line_count} 行，计划 {summary.plan_quantity:g}，"
+            f"可制造 {summary.buildable_quantity:g}（{summary.satisfaction_rate:.2f}%），"
+            f"调入 {summary.transfer_in:g}，调出 {summary.transfer_out:g}"
+        )
+    timings = "，".join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in result.timings.items())
+    print(f"共 {len(result)} 个计划行（{timings}）")
+    if memory_monitor.enabled:
+        print(f"内存：{memory_monitor.summary()}")
+    return 0
+
+
+def run_history_recorder(database_url=None):
+    """
+    读取当前全部库存并保存为历史版本
+
+    Args:
+        database_url: 数据库连接字符串；为空时使用默认配置
+
+    Returns:
+        进程退出码
+    """
+    from database.connection import db_manager
+    from core.history import inventory_history
+
+    if not db_manager.connect(database_url):
+        return 1
+    try:
+        version = inventory_history.capture(db_manager)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"保存历史库存失败: {e}")
+        return 1
+    finally:
+        db_manager.disconnect()
+    print(
+        f"历史库存版本 {version.version}：{version.materials} 种物料，"
+        f"变化 {version.changed} 种（存储共 {inventory_history.size() / 1024 / 1024:.1f} MB）"
+    )
+    return 0
+
+
+def run_history_list():
+    """
+    列出历史库存版本
+
+    Returns:
+        进程退出码
+    """
+    from core.history import inventory_history
+
+    print("版本\t保存时间\t类型\t物料数\t变化物料数")
+    for version in inventory_history.versions():
+        kind = "完整" if version.keyframe else "增量"
+        print(f"{version.version}\t{version.taken_at}\t{kind}\t{version.materials}\t{version.changed}")
+    print(f"共 {len(inventory_history.versions())} 个版本")
+    return 0
+
+
+def run_batch_schedule(filename):
+    """
+    从JSON文件登记定时批量任务
+
+    Args:
+        filename: JSON文件，内容为任务列表
+
+    Returns:
+        进程退出码
+    """
+    import json
+    from batch import JobQueue, JobSpec
+
+    try:
+        with open(filename, encoding="utf-8") as f:
+            entries = json.load(f)
+        queue = JobQueue()
+        for entry in entries:
+            queue.add_schedule(JobSpec.from_dict(entry), entry.get("interval", "nightly"))
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        print(f"登记批量任务失败: {e}")
+        return 1
+    print(f"已登记 {len(entries)} 个定时批量任务")
+    return 0
+
+
+def run_batch_enqueue(name):
+    """
+    立即将定时任务加入队列
+
+    Args:
+        name: 定时任务名称
+
+    Returns:
+        进程退出码
+    """
+    from batch import JobQueue
 
-def main():
+    try:
+        job_id = JobQueue().enqueue_schedule(name)
+    except ValueError as e:
+        print(e)
+        return 1
+    print(f"任务 {job_id} 已加入队列")
+    return 0
+
+
+def run_batch_worker(workers=4, once=False, database_url=None):
+    """
+    启动批量执行进程
+
+    Args:
+        workers: 工作线程数
+        once: 是否只执行一个周期
+        database_url: 数据库连接字符串；为空时使用默认配置
+
+    Returns:
+        进程退出码
+    """
+    from database.connection import db_manager
+    from batch import BatchRunner
+
+    if not db_manager.connect(database_url):
+        return 1
+    runner = BatchRunner(db_manager, workers=workers)
+    try:
+        if once:
+            runner.run_cycle()
+        else:
+            print(f"批量执行进程已启动（{workers} 个工作线程），按 Ctrl+C 退出")
+            runner.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db_manager.disconnect()
+    return 0
+
+
+def run_batch_status():
+    """
+    列出定时批量任务和最近的任务
+
+    Returns:
+        进程退出码
+    """
+    from datetime import datetime
+    from batch import JobQueue
+
+    queue = JobQueue()
+    print("定时任务\t间隔\t下次执行")
+    for schedule in queue.schedules():
+        next_run = datetime.fromtimestamp(schedule["next_run"]).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"{schedule['name']}\t{schedule['interval']}\t{next_run}")
+    print()
+    print("编号\t任务\t状态\t尝试次数\t各阶段耗时\t输出/错误")
+    for job in queue.jobs():
+        timings = "，".join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in job.timings.items())
+        detail = "；".join(job.outputs) if job.outputs else (job.error or "").split("\n")[0]
+        print(f"{job.id}\t{job.spec.name}\t{job.status}\t{job.attempts}\t{timings}\t{detail}")
+    return 0
+
+
+def run_trace_query(filename, material=None, model=None):
+    """
+    按物料/机型查询分配追溯日志
+
+    Args:
+        filename: 追溯日志文件
+        material: 物料编码
+        model: 机型编码
+
+    Returns:
+        进程退出码
+    """
+    from datetime import datetime
+    from core.trace import TraceLog
+
+    log = TraceLog.load(filename)
+    records = log.query(material=material, model=model)
+    print("批次\t时间\t层级\t机型\t物料\t需求数量\t分配数量\t分配前库存\t分配后库存")
+    for record in records:
+        timestamp = datetime.fromtimestamp(record["time"]).strftime("%Y-%m-%d %H:%M:%S")
+        print(
+            f"{record['run']}\t{timestamp}\t{record['tier']}\t{record['model']}\t{record['material']}\t"
+            f"{record['requested']:.2f}\t{record['allocated']:.2f}\t"
+            f"{record['stock_before']:.2f}\t{record['stock_after']:.2f}"
+        )
+    print(f"共 {len(records)} 条决策（日志共 {len(log)} 条）")
+    return 0
+
+
+def main(argv=None):
     """主函数"""
+    args = parse_args(argv)
+    if args.memory_profile or args.memory_budget:
+        from core.memory import memory_monitor
+        memory_monitor.start(int(args.memory_budget * 1024 * 1024) if args.memory_budget else None)
+    if args.query_stats:
+        import atexit
+        from database.query_stats import query_stats
+        atexit.register(lambda: print(f"数据库查询：{query_stats.summary()}"))
+    if args.buildability:
+        return run_buildability_report(args.output, args.database_url)
+    if args.publish_snapshot:
+        return run_snapshot_publisher(args.database_url)
+    if args.serve:
+        return run_service(args.host, args.port, args.from_snapshot, args.database_url)
+    if args.startup_benchmark:
+        return run_startup_benchmark()
+    if args.import_plan:
+        return run_plan_import(
+            args.import_plan, args.strategy, args.output, args.database_url,
+            args.by_partition, args.cross_partition, args.as_of, args.fixed_point
+        )
+    if args.record_history:
+        return run_history_recorder(args.database_url)
+    if args.list_history:
+        return run_history_list()
+    if args.batch_schedule:
+        return run_batch_schedule(args.batch_schedule)
+    if args.batch_enqueue:
+        return run_batch_enqueue(args.batch_enqueue)
+    if args.batch_worker:
+        return run_batch_worker(args.workers, args.once, args.database_url)
+    if args.batch_status:
+        return run_batch_status()
+    if args.query_trace:
+        return run_trace_query(args.query_trace, args.material, args.model)
+
+    import tkinter as tk
+    from ui.main_window import MainWindow
+
     # 创建主窗口
     root = tk.Tk()
     
@@ -24,11 +618,12 @@ def main():
     
     # 启动主循环
     root.mainloop()
+    return 0
 
 
 if __name__ == "__main__":
     try:
-        main()
+        sys.exit(main())
     except KeyboardInterrupt:
         print("\n程序被用户中断")
         sys.exit(0)
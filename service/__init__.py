@@ -0,0 +1,11 @@
+"""
+分配服务模块
+"""
+from .engine import AllocationService
+from .server import AllocationServer, run_server
+
+__all__ = [
+    'AllocationService',
+    'AllocationServer',
+    'run_server'
+]
@@ -0,0 +1,289 @@
+"""
+分配服务计算引擎 - 常驻内存的库存/BOM缓存与分配、扫描、可制造性计算
+"""
+import threading
+from typing import Dict, List
+import numpy as np
+from database.models import ModelConfig
+from core.allocation import InventoryAllocator, STRATEGIES
+from core.bom_matrix import BOMMatrix
+from core.buildability import compute_buildability
+from core.calculator import SatisfactionCalculator
+from core.kernels import buildable_units
+from core.optimizer import OptimalAllocator
+from core.result_cache import ResultCache, config_fingerprint
+from core.scheduler import PriorityScheduler
+
+# 单次扫描允许的最多计划数量点数
+MAX_SWEEP_POINTS = 1000
+
+
+def _integer(value, name: str, minimum=None) -> int:
+    """
+    取请求中的整数字段（整数或整数值的浮点数）
+
+    Args:
+        value: 字段值
+        name: 字段名（用于错误信息）
+        minimum: 可选的最小值
+
+    Returns:
+        整数
+
+    Raises:
+        ValueError: 不是整数或小于最小值
+    """
+    if (
+        isinstance(value, bool)
+        or not isinstance(value, (int, float))
+        or (isinstance(value, float) and not value.is_integer())
+    ):
+        raise ValueError(f"{name} 必须是整数: {value!r}")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"{name} 不能小于 {minimum}: {value!r}")
+    return int(value)
+
+
+class AllocationService:
+    """分配服务（库存和BOM加载一次后常驻内存，供所有请求共享）"""
+
+    def __init__(self, db_manager=None):
+        """
+        初始化分配服务
+
+        Args:
+            db_manager: 数据库管理器实例；基于快照创建时可为 None
+        """
+        self.db_manager = db_manager
+        self.calculator = SatisfactionCalculator()
+        self.result_cache = ResultCache()
+        self.version = 0  # 每次重新加载后递增，作为请求合并和结果缓存的一部分
+        self.bom = None
+        self.allocator = None
+        self._report = None
+        self._report_version = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> "AllocationService":
+        """基于共享内存快照创建服务（不访问数据库）"""
+        service = cls()
+        service._install(snapshot.bom, snapshot.inventory, snapshot.version)
+        return service
+
+    def load(self) -> bool:
+        """
+        从数据库加载整张BOM表和全部库存
+
+        Returns:
+            是否加载成功
+        """
+        try:
+            bom = BOMMatrix.load(self.db_manager)
+            inventory_data = {
+                matnr: clabs if clabs else 0.0
+                for matnr, clabs in self.db_manager.get_inventory_data()
+            }
+        except Exception as e:
+            print(f"加载服务数据失败: {e}")
+            return False
+        self._install(bom, inventory_data)
+        return True
+
+    def _install(self, bom: BOMMatrix, inventory_data, inventory_version=None):
+        """替换常驻数据（整体替换引用，进行中的请求继续使用旧数据）"""
+        allocator = InventoryAllocator(
+            self.db_manager, inventory_data=inventory_data, inventory_version=inventory_version
+        )
+        with self._lock:
+            self.bom = bom
+            self.allocator = allocator
+            self.version += 1
+
+    def status(self) -> Dict:
+        """服务状态"""
+        bom = self.bom
+        return {
+            "version": self.version,
+            "models": len(bom.parent_codes) if bom else 0,
+            "materials": len(self.allocator.inventory_data) if self.allocator else 0,
+            "inventory_version": self.allocator.inventory_version if self.allocator else None,
+            "result_cache": self.result_cache.stats(),
+        }
+
+    def model_configs(self, payload: Dict) -> List[ModelConfig]:
+        """
+        由请求中的机型列表构建机型配置
+
+        Args:
+            payload: {"models": [{"code", "plan_quantity", "priority", "material_priorities"}]}
+
+        Returns:
+            机型配置列表
+
+        Raises:
+            ValueError: 机型列表或其中的字段无效
+        """
+        models = payload.get("models")
+        if not models:
+            raise ValueError("请求中缺少 models")
+        if not isinstance(models, list):
+            raise ValueError("models 必须是列表")
+        configs = []
+        for model in models:
+            if not isinstance(model, dict):
+                raise ValueError(f"models 中的机型必须是对象: {model!r}")
+            code = model.get("code")
+            if not isinstance(code, str) or code not in self.bom.parent_index:
+                raise ValueError(f"未知机型: {code}")
+            material_priorities = model.get("material_priorities") or {}
+            if not isinstance(material_priorities, dict):
+                raise ValueError(f"机型 {code} 的 material_priorities 必须是对象")
+            configs.append(ModelConfig(
+                model_code=code,
+                model_name=code,
+                plan_quantity=_integer(model.get("plan_quantity", 0), f"机型 {code} 的 plan_quantity", 0),
+                priority=_integer(model.get("priority", 1), f"机型 {code} 的 priority"),
+                bom_items=self.bom.bom_items(code),
+                material_priorities={
+                    material: _integer(priority, f"机型 {code} 物料 {material} 的优先级")
+                    for material, priority in material_priorities.items()
+                }
+            ))
+        return configs
+
+    @staticmethod
+    def strategy_options(payload: Dict) -> Dict:
+        """解析分配策略"""
+        strategy = payload.get("strategy", "priority")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"未知分配策略: {strategy}（可选 {', '.join(STRATEGIES)}）")
+        return STRATEGIES[strategy]
+
+    def allocate(self, payload: Dict) -> Dict:
+        """
+        多机型分配并计算满足率
+
+        Args:
+            payload: 机型列表、分配策略（priority/kit/optimal），以及是否返回物料明细 include_materials
+
+        Returns:
+            各机型的可制造数量、满足率、瓶颈物料和短缺物料
+        """
+        configs = self.model_configs(payload)
+        options = self.strategy_options(payload)
+        allocator = self.allocator
+        results = self.result_cache.get_or_compute(
+            allocator.inventory_version,
+            config_fingerprint(configs, options),
+            lambda: self._allocate_models(allocator, configs, options)
+        )
+
+        models = []
+        for result in results:
+            model = {
+                "code": result.model_code,
+                "plan_quantity": result.plan_quantity,
+                "allocated_quantity": result.allocated_quantity,
+                "satisfaction_rate": result.satisfaction_rate,
+                "avg_satisfaction": result.material_metrics.avg_satisfaction,
+                "bottleneck_material": result.material_metrics.bottleneck_material,
+                "shortage_materials": result.shortage_materials,
+            }
+            if payload.get("include_materials"):
+                model["allocated_materials"] = result.allocated_materials
+            models.append(model)
+        return {"version": self.version, "models": models}
+
+    def _allocate_models(self, allocator: InventoryAllocator, configs: List[ModelConfig], options: Dict):
+        """执行分配并计算各机型满足率"""
+        scheduler = PriorityScheduler(configs)
+        allocation = allocator.allocation_matrix(scheduler, **options)
+        return self.calculator.calculate_models(configs, scheduler.to_material_dicts(allocation))
+
+    def sweep(self, payload: Dict) -> Dict:
+        """
+        扫描某个机型的计划数量，计算各计划数量下所有机型的可制造数量
+
+        优先级分配和齐套分配一次批量计算全部扫描点；最优分配逐点求解。
+
+        Args:
+            payload: 机型列表、分配策略、扫描机型 model 和计划数量列表 quantities
+
+        Returns:
+            {"quantities": [...], "models": [机型编码], "buildable": [[各机型可制造数量], ...]}
+        """
+        configs = self.model_configs(payload)
+        options = self.strategy_options(payload)
+        codes = [config.model_code for config in configs]
+        target = payload.get("model")
+        if target not in codes:
+            raise ValueError(f"扫描机型不在机型列表中: {target}")
+        quantities = payload.get("quantities") or []
+        if not isinstance(quantities, list):
+            raise ValueError("quantities 必须是列表")
+        quantities = [float(_integer(quantity, "quantities 中的计划数量", 0)) for quantity in quantities]
+        if not quantities or len(quantities) > MAX_SWEEP_POINTS:
+            raise ValueError(f"quantities 需包含 1~{MAX_SWEEP_POINTS} 个计划数量")
+
+        scheduler = PriorityScheduler(configs)
+        plans = np.tile(scheduler.plan_quantities, (len(quantities), 1))
+        plans[:, codes.index(target)] = quantities
+
+        inventory = scheduler.inventory_vector(self.allocator.inventory_data)
+        if options.get("optimal"):
+            units = []
+            for plan in plans:
+                scheduler.plan_quantities = plan
+                units.append(OptimalAllocator(scheduler).solve(inventory))
+            units = np.asarray(units)
+        else:
+            allocation = scheduler.allocate(inventory, plans, options.get("kit_aware", False))
+            units = buildable_units(allocation, scheduler.per_unit, plans)
+
+        return {
+            "version": self.version,
+            "quantities": quantities,
+            "models": codes,
+            "buildable": units.astype(np.int64).tolist(),
+        }
+
+    def buildability(self, payload: Dict) -> Dict:
+        """
+        全部机型（或指定机型）的最大可制造数量和瓶颈物料（按数据版本缓存）
+
+        Args:
+            payload: 可选 parents（机型编码列表）和 limit
+
+        Returns:
+            {"rows": [{"code", "buildable", "bottleneck_material", "bottleneck_inventory", "per_unit"}]}
+        """
+        version = self.version
+        with self._lock:
+            report = self._report if self._report_version == version else None
+        if report is None:
+            bom = self.bom
+            inventory = self.allocator.inventory_data
+            vector = getattr(inventory, "vector", None)
+            inventory = vector(bom.material_codes) if vector else bom.inventory_vector(inventory)
+            report = compute_buildability(bom, inventory)
+            with self._lock:
+                self._report, self._report_version = report, version
+
+        parents = payload.get("parents")
+        wanted = set(parents) if parents else None
+        rows = []
+        for code, units, material, inventory, per_unit in report.rows():
+            if wanted is not None and code not in wanted:
+                continue
+            rows.append({
+                "code": code,
+                "buildable": None if units == float("inf") else int(units),
+                "bottleneck_material": material,
+                "bottleneck_inventory": inventory,
+                "per_unit": per_unit,
+            })
+        limit = payload.get("limit")
+        if limit:
+            rows = rows[:_integer(limit, "limit", 0)]
+        return {"version": version, "rows": rows}
@@ -0,0 +1,213 @@
+"""
+分配服务HTTP接口 - 基于 asyncio 的本地JSON服务
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+from service.engine import AllocationService
+
+# 默认监听地址
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# 计算线程数（数组运算大部分时间释放 GIL）
+DEFAULT_WORKERS = 4
+
+# 请求体大小上限（字节）
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class ServiceConflict(Exception):
+    """请求与服务当前状态冲突（如基于快照启动的服务没有数据库，不能重新加载）"""
+
+
+class AllocationServer:
+    """分配服务HTTP服务器（相同的并发请求合并为一次计算）"""
+
+    def __init__(
+        self,
+        service: AllocationService,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        workers: int = DEFAULT_WORKERS
+    ):
+        """
+        初始化服务器
+
+        Args:
+            service: 已加载数据的分配服务
+            host: 监听地址
+            port: 监听端口（0 表示自动分配）
+            workers: 计算线程数
+        """
+        self.service = service
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jtbd-service")
+        self.routes = {
+            ("GET", "/health"): lambda payload: {
+                **self.service.status(),
+                "requests": self.requests,
+                "computations": self.computations,
+            },
+            ("POST", "/allocate"): self.service.allocate,
+            ("POST", "/sweep"): self.service.sweep,
+            ("GET", "/buildability"): self.service.buildability,
+            ("POST", "/buildability"): self.service.buildability,
+            ("POST", "/reload"): self._reload,
+        }
+        self.requests = 0  # 收到的请求数
+        self.computations = 0  # 实际执行的计算次数（合并后的请求不计入）
+        self._in_flight: Dict[tuple, asyncio.Future] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def _reload(self, payload: Dict) -> Dict:
+        """重新从数据库加载库存和BOM"""
+        if self.service.db_manager is None:
+            raise ServiceConflict("服务基于共享内存快照启动，没有数据库连接，不能重新加载（请重新发布快照后重启服务）")
+        return {"reloaded": self.service.load(), **self.service.status()}
+
+    async def start(self):
+        """开始监听"""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"分配服务已启动: http://{self.host}:{self.port}")
+
+    async def serve_forever(self):
+        """启动并持续提供服务"""
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        """停止服务"""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    async def dispatch(self, method: str, path: str, payload: Dict):
+        """
+        执行请求；与进行中的请求（同一接口、同一请求内容、同一数据版本）相同时共享其结果
+
+        Args:
+            method: HTTP方法
+            path: 请求路径
+            payload: 请求JSON
+
+        Returns:
+            (状态码, 响应JSON)
+        """
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                return 405, {"error": f"不支持的请求方法: {method}"}
+            return 404, {"error": f"未知接口: {path}"}
+
+        self.requests += 1
+        key = (path, json.dumps(payload, sort_keys=True), self.service.version)
+        future = self._in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, handler, payload)
+            self.computations += 1
+            if path != "/reload":
+                self._in_flight[key] = future
+                future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        try:
+            return 200, await asyncio.shield(future)
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except ServiceConflict as e:
+            return 409, {"error": str(e)}
+        except Exception as e:
+            print(f"请求处理失败 {method} {path}: {e}")
+            return 500, {"error": str(e)}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个连接（支持 HTTP/1.1 keep-alive）"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "无效的请求行"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "无效的 Content-Length"}, False)
+                    break
+                if length > MAX_BODY_SIZE:
+                    await self._respond(writer, 413, {"error": "请求体过大"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                try:
+                    payload = json.loads(body) if body else {}
+                    if not isinstance(payload, dict):
+                        raise ValueError("请求体必须是JSON对象")
+                except ValueError as e:
+                    status, response = 400, {"error": f"无效的JSON: {e}"}
+                else:
+                    status, response = await self.dispatch(method, urlsplit(target).path, payload)
+
+                await self._respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, response: Dict, keep_alive: bool):
+        """写出JSON响应"""
+        body = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        ).encode("latin-1")
+        writer.write(head + body)
+        await writer.drain()
+
+
+def run_server(service: AllocationService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+    """阻塞运行分配服务直到用户中断"""
+    server = AllocationServer(service, host, port)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("分配服务已停止")
@@ -0,0 +1,111 @@
+"""
+BOM缓存测试 - 同一机型的并发请求只查询一次，清空缓存后不写回进行中查询的旧结果
+"""
+import threading
+import time
+from database.bom_cache import BOMCache
+
+
+class SlowBOMSource:
+    """查询阻塞到 release 被设置的BOM来源（统计每个机型的查询次数）"""
+
+    engine = True
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.calls = {}
+        self.quantity = 1.0
+
+    def get_bom_data(self, model_code):
+        self.calls[model_code] = self.calls.get(model_code, 0) + 1
+        quantity = self.quantity
+        self.started.set()
+        self.release.wait()
+        return [(model_code, "M1", "", quantity)]
+
+
+def cache_for(source, tmp_path):
+    return BOMCache(source, usage_file=str(tmp_path / "usage.json"))
+
+
+def run_in_threads(target, count):
+    results = [None] * count
+
+    def worker(position):
+        results[position] = target()
+
+    threads = [threading.Thread(target=worker, args=(position,)) for position in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_gets_query_once(tmp_path):
+    source = SlowBOMSource()
+    cache = cache_for(source, tmp_path)
+
+    threads, results = run_in_threads(lambda: cache.get("A"), 5)
+    source.started.wait()
+    time.sleep(0.05)
+    source.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert source.calls == {"A": 1}
+    assert results == [[("A", "M1", "", 1.0)]] * 5
+    assert "A" in cache
+
+
+def test_get_waits_for_prefetch(tmp_path):
+    source = SlowBOMSource()
+    cache = cache_for(source, tmp_path)
+
+    done = cache.prefetch(["A", "B"])
+    source.started.wait()
+    threads, results = run_in_threads(lambda: cache.get("A"), 2)
+    time.sleep(0.05)
+    source.release.set()
+    for thread in threads:
+        thread.join()
+    done.wait()
+
+    assert source.calls == {"A": 1, "B": 1}
+    assert results == [[("A", "M1", "", 1.0)]] * 2
+    assert cache.prefetch(["A", "B"]) is None
+
+
+def test_clear_during_fetch_discards_stale_rows(tmp_path):
+    source = SlowBOMSource()
+    cache = cache_for(source, tmp_path)
+
+    threads, results = run_in_threads(lambda: cache.get("A"), 1)
+    source.started.wait()
+    cache.clear()
+    source.quantity = 2.0
+    source.release.set()
+    threads[0].join()
+
+    # 清空前开始的查询照常返回，但不写入缓存
+    assert results == [[("A", "M1", "", 1.0)]]
+    assert "A" not in cache
+    assert cache.get("A") == [("A", "M1", "", 2.0)]
+    assert source.calls == {"A": 2}
+
+
+def test_failed_query_is_not_cached(tmp_path):
+    class FailingSource:
+        engine = True
+        calls = 0
+
+        def get_bom_data(self, model_code):
+            self.calls += 1
+            return None
+
+    source = FailingSource()
+    cache = cache_for(source, tmp_path)
+
+    assert cache.get("A") is None
+    assert cache.get("A") is None
+    assert source.calls == 2
+    assert "A" not in cache
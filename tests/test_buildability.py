@@ -0,0 +1,86 @@
+"""
+可制造性报告测试 - CSR 内核与逐机型的 buildable_units 一致，十进制用量不少算一台
+"""
+import numpy as np
+from core.bom_matrix import BOMMatrix
+from core.buildability import compute_buildability
+from core.kernels import buildable_units, buildable_units_fixed, fixed_point_scale, to_fixed
+
+# 足够大的计划数量（可制造数量不受计划限制）
+UNLIMITED_PLAN = 10 ** 9
+
+
+def random_bom(rng, per_unit):
+    """由稠密单台用量矩阵构建 BOM（0 表示不使用）"""
+    rows = [
+        (f"P{row}", f"M{column}", per_unit[row, column])
+        for row, column in zip(*np.nonzero(per_unit))
+    ]
+    # 保证物料列与稠密矩阵对齐
+    rows += [("_", f"M{column}", 1.0) for column in range(per_unit.shape[1])]
+    rows.sort(key=lambda row: (row[1] != "M0", int(row[1][1:])))
+    bom = BOMMatrix.from_rows(rows)
+    assert bom.material_codes == [f"M{column}" for column in range(per_unit.shape[1])]
+    return bom
+
+
+def dense_units(bom, report, rows):
+    """报告中各父项行对应的可制造数量"""
+    position = {code: index for index, code in enumerate(report.parent_codes)}
+    return np.array([report.buildable[position[f"P{row}"]] for row in rows])
+
+
+def test_decimal_usage_is_not_one_short():
+    bom = BOMMatrix.from_rows([("A", "M1", 0.1), ("A", "M2", 1.0), ("B", "M2", 3.0), ("C", "M3", 0.0)])
+
+    report = compute_buildability(bom, bom.inventory_vector({"M1": 0.3, "M2": 10.0}))
+
+    assert list(report.rows()) == [
+        ("A", 3.0, "M1", 0.3, 0.1),
+        ("B", 3.0, "M2", 10.0, 3.0),
+        ("C", float("inf"), None, 0.0, 0.0),
+    ]
+
+
+def test_matches_fixed_point_buildable_units():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        per_unit = np.round(rng.uniform(0, 3, (8, 6)), 1) * (rng.random((8, 6)) < 0.5)
+        inventory = np.round(rng.uniform(0, 40, 6), 1)
+        rows = np.flatnonzero(per_unit.any(axis=1))
+        bom = random_bom(rng, per_unit)
+
+        report = compute_buildability(bom, inventory)
+
+        scale = fixed_point_scale(per_unit, inventory)
+        expected = buildable_units_fixed(
+            np.broadcast_to(to_fixed(inventory, scale), per_unit.shape),
+            to_fixed(per_unit, scale),
+            np.full(len(per_unit), UNLIMITED_PLAN)
+        )
+        assert dense_units(bom, report, rows).tolist() == expected[rows].tolist()
+
+
+def test_matches_float_buildable_units_on_exact_quantities():
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        # 1/8 的整数倍在浮点下精确，浮点内核结果也精确
+        per_unit = rng.integers(0, 24, (8, 6)) / 8 * (rng.random((8, 6)) < 0.5)
+        inventory = rng.integers(0, 320, 6) / 8
+        rows = np.flatnonzero(per_unit.any(axis=1))
+        bom = random_bom(rng, per_unit)
+
+        report = compute_buildability(bom, inventory)
+
+        expected = buildable_units(
+            np.broadcast_to(inventory, per_unit.shape), per_unit, np.full(len(per_unit), UNLIMITED_PLAN)
+        )
+        assert dense_units(bom, report, rows).tolist() == expected[rows].tolist()
+
+
+def test_bottleneck_is_first_material_with_lowest_coverage():
+    bom = BOMMatrix.from_rows([("A", "M1", 2.0), ("A", "M2", 1.0), ("A", "M3", 4.0)])
+
+    report = compute_buildability(bom, bom.inventory_vector({"M1": 8.0, "M2": 4.0, "M3": 30.0}))
+
+    assert list(report.rows()) == [("A", 4.0, "M1", 8.0, 2.0)]
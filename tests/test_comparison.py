@@ -0,0 +1,68 @@
+"""
+分配结果对比测试 - 机型级差异、物料行的新增/移除/变化
+"""
+from core.comparison import STATUS_ADDED, STATUS_CHANGED, STATUS_REMOVED, compare_results
+from database.models import AllocationResult, MaterialMetrics
+
+
+def result(plan, units, rate, materials, bottleneck=None, code="A"):
+    """materials: {物料编码: (需求, 分配)}"""
+    codes = list(materials)
+    required = [materials[material][0] for material in codes]
+    allocated = [materials[material][1] for material in codes]
+    return AllocationResult(
+        model_code=code,
+        model_name=code,
+        plan_quantity=plan,
+        allocated_quantity=units,
+        satisfaction_rate=rate,
+        allocated_materials={},
+        shortage_materials={},
+        bom_items=[],
+        material_metrics=MaterialMetrics(
+            material_codes=codes,
+            required=required,
+            allocated=allocated,
+            shortage=[need - got for need, got in zip(required, allocated)],
+            ratio=[got / need for need, got in zip(required, allocated)],
+            bottleneck_material=bottleneck
+        )
+    )
+
+
+def test_model_only_change_has_no_material_rows():
+    # 只改计划数量，物料分配不变：机型有差异，物料差异为空，但对比结果仍然存在（可导出）
+    materials = {"M1": (10.0, 10.0), "M2": (5.0, 5.0)}
+    comparison = compare_results([result(10, 10, 100.0, materials)], [result(12, 10, 100.0, materials)])
+
+    assert comparison is not None
+    assert len(comparison) == 0
+    assert comparison.compared_rows == 2
+    [delta] = comparison.changed_models()
+    assert (delta.model_code, delta.plan_before, delta.plan_after) == ("A", 10, 12)
+
+
+def test_material_rows_added_removed_changed():
+    before = result(10, 5, 50.0, {"M1": (10.0, 5.0), "M2": (10.0, 10.0), "M3": (4.0, 4.0)}, "M1")
+    after = result(10, 10, 100.0, {"M2": (10.0, 10.0), "M1": (10.0, 10.0), "M4": (2.0, 2.0)})
+
+    comparison = compare_results([before], [after])
+
+    rows = {(model, material): (status, allocated_delta) for (
+        model, material, status, _, _, allocated_delta, *_
+    ) in comparison.rows()}
+    assert rows == {
+        ("A", "M1"): (STATUS_CHANGED, 5.0),
+        ("A", "M4"): (STATUS_ADDED, 2.0),
+        ("A", "M3"): (STATUS_REMOVED, -4.0),
+    }
+    [delta] = comparison.changed_models()
+    assert delta.bottleneck_changed
+
+
+def test_model_missing_on_one_side():
+    comparison = compare_results([], [result(4, 2, 50.0, {"M1": (4.0, 2.0)}, code="B")])
+
+    [delta] = comparison.models
+    assert (delta.plan_before, delta.plan_after) == (None, 4)
+    assert comparison.status == [STATUS_ADDED]
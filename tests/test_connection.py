@@ -0,0 +1,99 @@
+"""
+流式查询测试 - 查询失败时抛出异常并计入统计，库存缓存只并入完整读取的结果
+"""
+import pytest
+from sqlalchemy import event, text
+from core.allocation import InventoryAllocator
+from database.connection import DatabaseManager
+from database.query_stats import query_stats, statement_fingerprint
+
+
+def connect():
+    """内存 SQLite 库存表；check_stock(n) 在 n > 2 时报错（模拟读取中途失败）"""
+    manager = DatabaseManager()
+    assert manager.connect("sqlite://")
+
+    def register(connection, record):
+        def check_stock(value):
+            if value > 2:
+                raise ValueError("连接中断")
+            return value
+        connection.create_function("check_stock", 1, check_stock)
+
+    event.listen(manager.engine, "connect", register)
+    manager.engine.dispose()
+    with manager.engine.begin() as connection:
+        connection.execute(text("CREATE TABLE XZB_InvNum (MATNR TEXT, CLABS REAL)"))
+        connection.execute(
+            text("INSERT INTO XZB_InvNum VALUES (:code, :stock)"),
+            [{"code": f"M{index}", "stock": index} for index in range(1, 5)]
+        )
+    return manager
+
+
+def errors_of(query):
+    stats = query_stats.statements.get(statement_fingerprint(query))
+    return stats.errors if stats else 0
+
+
+def test_failure_mid_stream_raises_and_is_recorded():
+    manager = connect()
+    query = "SELECT MATNR, check_stock(CLABS) FROM XZB_InvNum"
+    before = errors_of(query)
+
+    rows = []
+    with pytest.raises(RuntimeError):
+        for row in manager.iter_query(query, batch_size=1):
+            rows.append(row)
+
+    # 已经读到部分行之后才失败
+    assert rows
+    assert errors_of(query) == before + 1
+
+
+def test_missing_engine_raises():
+    with pytest.raises(RuntimeError):
+        list(DatabaseManager().iter_query("SELECT 1"))
+
+
+class FailingInventory:
+    """读取若干行后失败的库存来源"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.fail = False
+
+    def get_inventory_data(self, material_codes=None):
+        for matnr, clabs in self.rows:
+            if material_codes is None or matnr in material_codes:
+                yield matnr, clabs
+                if self.fail:
+                    raise RuntimeError("查询执行失败")
+
+
+def test_missing_inventory_is_cached_only_after_complete_read():
+    source = FailingInventory([("M1", 1.0), ("M2", 2.0), ("M3", 3.0)])
+    allocator = InventoryAllocator(source, {"M1"})
+    version = allocator.inventory_version
+
+    source.fail = True
+    assert not allocator.load_missing_inventory({"M1", "M2", "M3"})
+    assert allocator.inventory_data == {"M1": 1.0}
+    assert allocator.loaded_materials == {"M1"}
+    assert allocator.inventory_version == version
+
+    source.fail = False
+    assert allocator.load_missing_inventory({"M1", "M2", "M3"})
+    assert allocator.inventory_data == {"M1": 1.0, "M2": 2.0, "M3": 3.0}
+    assert allocator.loaded_materials == {"M1", "M2", "M3"}
+
+
+def test_failed_load_leaves_allocator_empty():
+    source = FailingInventory([("M1", 1.0), ("M2", 2.0)])
+    source.fail = True
+
+    allocator = InventoryAllocator(source, {"M1", "M2"})
+
+    assert allocator.inventory_data == {}
+    assert allocator.loaded_materials == set()
+    assert not allocator.load_inventory_data({"M1", "M2"})
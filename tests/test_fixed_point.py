@@ -0,0 +1,105 @@
+"""
+定点整数分配测试 - 齐套数量刚好够时不少算一台，整数等比例分配守恒
+"""
+import numpy as np
+import pytest
+from database.models import BOMItem, ModelConfig
+from core.calculator import SatisfactionCalculator
+from core.kernels import allocate_by_tiers_fixed, buildable_units_fixed, fixed_point_scale, to_fixed
+from core.scheduler import PriorityScheduler
+
+
+def make_config(model_code, plan_quantity, priority, materials):
+    """按 {物料编码: 单台用量} 构建机型配置"""
+    return ModelConfig(
+        model_code=model_code,
+        model_name=model_code,
+        plan_quantity=plan_quantity,
+        priority=priority,
+        bom_items=[BOMItem(model_code, code, code, num) for code, num in materials.items()]
+    )
+
+
+def allocate(configs, inventory, fixed_point, kit_aware=False):
+    """分配并计算满足率"""
+    scheduler = PriorityScheduler(configs, fixed_point)
+    allocation = scheduler.allocate(scheduler.inventory_vector(inventory), kit_aware=kit_aware)
+    return SatisfactionCalculator(fixed_point).calculate_models(configs, scheduler.to_material_dicts(allocation))
+
+
+@pytest.mark.parametrize("kit_aware", [False, True])
+def test_exact_kit_is_not_one_short(kit_aware):
+    # 0.1 × 3 在浮点下为 0.30000000000000004，库存 0.3 刚好够 3 台
+    configs = [make_config("A", 3, 1, {"M1": 0.1, "M2": 1.0})]
+    inventory = {"M1": 0.3, "M2": 3.0}
+
+    result, = allocate(configs, inventory, fixed_point=True, kit_aware=kit_aware)
+
+    assert result.allocated_quantity == 3
+    assert result.shortage_materials == {}
+
+
+def test_float_mode_keeps_float_arithmetic():
+    configs = [make_config("A", 20000000, 1, {"M1": 1e-7})]
+
+    result, = allocate(configs, {"M1": 1.0}, fixed_point=False)
+
+    assert result.allocated_quantity == 10000000
+
+
+def test_fixed_mode_rejects_quantity_below_precision():
+    configs = [make_config("A", 20000000, 1, {"M1": 1e-7})]
+
+    with pytest.raises(ValueError):
+        allocate(configs, {"M1": 1.0}, fixed_point=True)
+    with pytest.raises(ValueError):
+        SatisfactionCalculator(fixed_point=True).calculate_models(configs, [{"M1": 1.0}])
+
+
+def test_fixed_point_scale_per_material():
+    per_unit = np.array([[0.1, 2.0, 0.0], [0.25, 1.0, 3.0]])
+    inventory = np.array([0.3, 7.0, 1.5])
+
+    scale = fixed_point_scale(per_unit, inventory)
+
+    assert scale.tolist() == [100, 1, 10]
+    assert to_fixed(inventory, scale).tolist() == [30, 7, 15]
+
+
+def test_same_tier_split_uses_largest_remainder():
+    # 库存 5 按需求 3:3 等比例分配为 2.5:2.5，整数单位的余数给排在前面的机型
+    requirements = np.array([[3], [3]], dtype=np.int64)
+    tier_index = np.zeros((2, 1), dtype=np.int64)
+
+    allocation = allocate_by_tiers_fixed(np.array([5], dtype=np.int64), requirements, tier_index, 1)
+
+    assert allocation[:, 0].tolist() == [3, 2]
+
+
+def test_tiers_conserve_inventory():
+    rng = np.random.default_rng(0)
+    requirements = rng.integers(0, 50, size=(6, 8))
+    tier_index = np.where(requirements > 0, rng.integers(0, 3, size=(6, 8)), -1)
+    requirements = np.where(tier_index >= 0, requirements, 0)
+    inventory = rng.integers(0, 120, size=8)
+
+    allocation = allocate_by_tiers_fixed(inventory, requirements, tier_index, 3)
+
+    assert allocation.dtype == np.int64
+    assert (allocation <= requirements).all()
+    assert (allocation.sum(axis=0) == np.minimum(inventory, requirements.sum(axis=0))).all()
+    # 高层级满足之前低层级不分配
+    for column in range(8):
+        for tier in range(1, 3):
+            higher = tier_index[:, column] < tier
+            if allocation[tier_index[:, column] == tier, column].any():
+                assert (allocation[higher, column] == requirements[higher, column]).all()
+
+
+def test_buildable_units_fixed_exact_division():
+    per_unit = np.array([[10, 3, 0]], dtype=np.int64)
+    allocation = np.array([[30, 9, 0]], dtype=np.int64)
+
+    units = buildable_units_fixed(allocation, per_unit, np.array([5], dtype=np.int64))
+
+    assert units.tolist() == [3]
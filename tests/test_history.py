@@ -0,0 +1,72 @@
+"""
+库存历史测试 - 保存增量（变化/删除/新增物料）后逐版本还原，按日期取当天最后一个版本
+"""
+from datetime import datetime
+
+import pytest
+from core.history import InventoryHistory
+
+
+class Inventory:
+    """按当前内容返回库存行的数据库替身"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def get_inventory_data(self):
+        yield from self.data.items()
+
+
+SNAPSHOTS = [
+    (datetime(2026, 3, 1, 8), {"M1": 10.0, "M2": 5.0, "M3": 0.0}),
+    (datetime(2026, 3, 1, 18), {"M1": 7.5, "M2": 5.0, "M3": 0.0}),  # 变化
+    (datetime(2026, 3, 2, 8), {"M1": 7.5, "M3": 2.0}),  # 删除 M2
+    (datetime(2026, 3, 2, 9), {"M1": 7.5, "M3": 2.0, "M4": 1.0}),  # 新增 M4（完整快照）
+    (datetime(2026, 3, 2, 20), {"M2": 3.0, "M3": 2.0, "M4": 1.0, "M5": 9.0}),  # 删除 M1、恢复 M2、新增 M5
+    (datetime(2026, 3, 4, 8), {"M2": 3.0, "M3": 2.5, "M4": 1.0, "M5": 9.0}),
+]
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = InventoryHistory(str(tmp_path), keyframe_interval=3)
+    for taken_at, data in SNAPSHOTS:
+        history.record(dict(data), taken_at)
+    return history
+
+
+def test_capture_reads_database(tmp_path):
+    history = InventoryHistory(str(tmp_path))
+    version = history.capture(Inventory({"M1": 4.0, "M2": None}))
+
+    assert history.load(version.version) == {"M1": 4.0, "M2": 0.0}
+    # 内容相同时不新建版本
+    assert history.capture(Inventory({"M1": 4.0, "M2": 0.0})) == version
+    assert len(history.versions()) == 1
+
+
+def test_every_version_replays(history, tmp_path):
+    versions = history.versions()
+    assert [version.keyframe for version in versions] == [True, False, False, True, False, False]
+    assert [version.changed for version in versions[1:3]] == [1, 2]
+
+    # 同一实例（使用回放缓存）按倒序还原，新实例（从磁盘读取）按顺序还原
+    for version, (_, data) in reversed(list(zip(versions, SNAPSHOTS))):
+        assert history.load(version.version) == data
+    reopened = InventoryHistory(str(tmp_path), keyframe_interval=3)
+    for version, (_, data) in zip(reopened.versions(), SNAPSHOTS):
+        assert reopened.load(version.version) == data
+
+
+def test_date_resolves_to_last_version_of_day(history):
+    assert history.load("2026-03-01") == SNAPSHOTS[1][1]
+    assert history.load("2026-03-02") == SNAPSHOTS[4][1]
+    # 没有版本的日期取之前最后一个版本
+    assert history.load("2026-03-03") == SNAPSHOTS[4][1]
+    assert history.load("2026-03-02 08:30") == SNAPSHOTS[2][1]
+    assert history.resolve("2026-03-02").version == "20260302-200000"
+
+    with pytest.raises(ValueError):
+        history.resolve("2026-02-28")
+    with pytest.raises(ValueError):
+        history.resolve("last-week")
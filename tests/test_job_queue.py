@@ -0,0 +1,76 @@
+"""
+任务队列租约测试 - 只重新排队心跳过期的任务，过期后原执行进程不再修改任务
+"""
+import sqlite3
+
+from batch.job_queue import JobQueue, JobSpec, LEASE_SECONDS, STATUS_DONE, STATUS_PENDING, STATUS_RUNNING
+
+
+def status_of(queue, job_id):
+    return {job.id: job for job in queue.jobs()}[job_id]
+
+
+def test_claim_records_worker_and_heartbeat(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), worker="a")
+    job_id = queue.enqueue(JobSpec("nightly", "plan.csv"), not_before=100.0)
+
+    job, = queue.claim(now=200.0)
+
+    stored = status_of(queue, job_id)
+    assert (job.worker, job.heartbeat_at) == ("a", 200.0)
+    assert (stored.status, stored.worker, stored.heartbeat_at) == (STATUS_RUNNING, "a", 200.0)
+
+
+def test_recover_only_requeues_expired_leases(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    first, second = JobQueue(path, worker="a"), JobQueue(path, worker="b")
+    stale = first.enqueue(JobSpec("stale", "plan.csv"), not_before=100.0)
+    first.claim(now=100.0)
+    live = second.enqueue(JobSpec("live", "plan.csv"), not_before=100.0)
+    job, = second.claim(now=100.0)
+
+    # 另一个进程启动时不能抢走仍在心跳的任务
+    second.heartbeat([job], now=100.0 + LEASE_SECONDS)
+    assert second.recover(now=100.0 + LEASE_SECONDS + 1) == 1
+
+    assert status_of(first, stale).status == STATUS_PENDING
+    assert status_of(first, stale).worker is None
+    assert status_of(first, live).status == STATUS_RUNNING
+
+
+def test_expired_worker_cannot_overwrite_reclaimed_job(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    first, second = JobQueue(path, worker="a"), JobQueue(path, worker="b")
+    job_id = first.enqueue(JobSpec("nightly", "plan.csv"), not_before=100.0)
+    old, = first.claim(now=100.0)
+
+    second.recover(now=100.0 + LEASE_SECONDS + 1)
+    new, = second.claim(now=100.0 + LEASE_SECONDS + 1)
+
+    assert first.heartbeat([old]) == 0
+    assert not first.complete(old, {}, [])
+    first.fail(old, "超时")
+    assert status_of(second, job_id).status == STATUS_RUNNING
+    assert second.complete(new, {}, ["out.csv"])
+    assert status_of(second, job_id).status == STATUS_DONE
+    assert status_of(second, job_id).attempts == 2
+
+
+def test_old_queue_file_is_migrated(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        "CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, spec TEXT NOT NULL, "
+        "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, "
+        "not_before REAL NOT NULL, created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+        "timings TEXT, outputs TEXT, error TEXT);"
+        "INSERT INTO jobs (name, spec, status, max_attempts, not_before, created_at, started_at) "
+        "VALUES ('old', '{\"name\": \"old\", \"plan\": \"plan.csv\"}', 'running', 3, 0, 0, 50);"
+    )
+    connection.commit()
+    connection.close()
+
+    queue = JobQueue(path, worker="a")
+
+    assert queue.recover(now=50.0 + LEASE_SECONDS - 1) == 0
+    assert queue.recover(now=50.0 + LEASE_SECONDS + 1) == 1
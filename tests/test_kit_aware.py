@@ -0,0 +1,98 @@
+"""
+齐套分配测试 - 只保留整台消耗的物料、不超过库存、与单独分配/定点内核一致
+"""
+import numpy as np
+import pytest
+from core.kernels import allocate_by_tiers, allocate_kit_aware, buildable_units
+from core.scheduler import PriorityScheduler
+from database.models import BOMItem, ModelConfig
+
+
+def random_case(rng, model_count=None, material_count=5, tiers=3):
+    """随机单台用量（1/4 的整数倍，浮点下精确）、计划数量、层级和库存"""
+    model_count = model_count or int(rng.integers(1, 6))
+    per_unit = rng.integers(0, 9, (model_count, material_count)) / 4
+    per_unit[rng.random((model_count, material_count)) < 0.3] = 0
+    plans = rng.integers(0, 12, model_count).astype(np.float64)
+    tier_index = np.where(per_unit > 0, rng.integers(0, tiers, (model_count, material_count)), -1)
+    inventory = rng.integers(0, 160, material_count) / 4
+    return inventory, per_unit, plans, tier_index
+
+
+def kit(inventory, per_unit, plans, tier_index, tiers=3, **options):
+    return allocate_kit_aware(inventory, per_unit * plans[..., None], per_unit, plans, tier_index, tiers, **options)
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_allocation_is_whole_kits_within_stock(seed):
+    inventory, per_unit, plans, tier_index = random_case(np.random.default_rng(seed))
+
+    allocation = kit(inventory, per_unit, plans, tier_index)
+    units = buildable_units(allocation, per_unit, plans)
+
+    # 1/4 的整数倍求和没有舍入误差，可以精确比较
+    assert (allocation.sum(axis=0) <= inventory).all()
+    assert (units <= plans).all()
+    assert np.array_equal(units, np.floor(units))
+    assert np.array_equal(allocation, per_unit * units[:, None])
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_sole_top_priority_model_keeps_priority_result(seed):
+    # 最高层级只有一个机型时，它的可制造数量与普通优先级分配相同（齐套只释放它用不上的库存）
+    inventory, per_unit, plans, tier_index = random_case(np.random.default_rng(seed), model_count=4)
+    tier_index = np.where(per_unit > 0, np.maximum(tier_index, 1), -1)
+    tier_index[0] = np.where(per_unit[0] > 0, 0, -1)
+
+    allocation = kit(inventory, per_unit, plans, tier_index)
+    priority = allocate_by_tiers(inventory, per_unit * plans[:, None], tier_index, 3)
+
+    assert buildable_units(allocation, per_unit, plans)[0] == buildable_units(priority, per_unit, plans)[0]
+
+
+def test_batch_matches_single_runs():
+    rng = np.random.default_rng(7)
+    _, per_unit, plans, tier_index = random_case(rng, model_count=4)
+    inventory = rng.integers(0, 160, (6, 5)) / 4
+    batch_plans = np.tile(plans, (6, 1))
+    batch_plans[:, 0] = np.arange(6)
+
+    batch = kit(inventory, per_unit, batch_plans, tier_index)
+
+    for sample in range(6):
+        single = kit(inventory[sample], per_unit, batch_plans[sample], tier_index)
+        assert np.array_equal(batch[sample], single)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_fixed_point_matches_float_without_ties(seed):
+    # 各机型层级互不相同时没有等比例分配，整数数量下浮点与定点内核结果一致
+    rng = np.random.default_rng(seed)
+    _, per_unit, plans, _ = random_case(rng, model_count=4)
+    per_unit = np.ceil(per_unit)
+    tier_index = np.where(per_unit > 0, np.arange(4)[:, None], -1)
+    inventory = rng.integers(0, 40, 5).astype(np.float64)
+
+    expected = kit(inventory, per_unit, plans, tier_index, tiers=4)
+    fixed = kit(
+        inventory.astype(np.int64), per_unit.astype(np.int64), plans.astype(np.int64),
+        tier_index, tiers=4, fixed_point=True
+    )
+
+    assert fixed.dtype == np.int64
+    assert np.array_equal(fixed, expected)
+
+
+def test_scheduler_kit_aware_uses_kernel():
+    configs = [
+        ModelConfig("A", "A", 5, 1, [BOMItem("A", "M1", "", 1.0), BOMItem("A", "M2", "", 1.0)]),
+        ModelConfig("B", "B", 5, 2, [BOMItem("B", "M1", "", 1.0)]),
+    ]
+    scheduler = PriorityScheduler(configs)
+    inventory = scheduler.inventory_vector({"M1": 5.0, "M2": 1.0})
+
+    allocation = scheduler.allocate(inventory, kit_aware=True)
+
+    # A 受 M2 限制只做 1 台，其余 M1 给 B
+    assert scheduler.to_material_dicts(allocation) == [{"M1": 1.0, "M2": 1.0}, {"M1": 4.0}]
+    assert buildable_units(allocation, scheduler.per_unit, scheduler.plan_quantities).tolist() == [1.0, 4.0]
@@ -0,0 +1,106 @@
+"""
+分区分配测试 - 不跨分区时与各分区单独分配一致，跨分区调拨不超过调出分区的剩余库存且调入调出平衡
+"""
+import numpy as np
+import pytest
+from database.models import BOMItem, ModelConfig
+from core import partition as partition_module
+from core.partition import PartitionedAllocator
+from core.scheduler import PriorityScheduler
+
+PARTITIONS = ["P1", "P2", "P3"]
+MATERIALS = [f"M{index}" for index in range(6)]
+
+
+def plan(seed):
+    """随机计划行（同一机型可出现在多个分区）和分区库存；P3 没有计划行，只能调出"""
+    rng = np.random.default_rng(seed)
+    models = {
+        f"A{model}": [
+            BOMItem(f"A{model}", material, "", float(rng.integers(1, 4)))
+            for material in MATERIALS if rng.random() < 0.7
+        ]
+        for model in range(4)
+    }
+    configs, partitions = [], []
+    for line in range(8):
+        code = f"A{line % 4}"
+        configs.append(ModelConfig(code, code, int(rng.integers(1, 20)), int(rng.integers(1, 4)), models[code]))
+        partitions.append(PARTITIONS[line % 2])
+    inventory = {
+        partition: {material: float(rng.integers(0, 60)) for material in MATERIALS}
+        for partition in PARTITIONS
+    }
+    return configs, partitions, inventory
+
+
+def leftover_by_partition(configs, partitions, inventory, **options):
+    """各分区独立分配后的剩余库存"""
+    result = PartitionedAllocator(None, inventory_data=inventory).allocate(configs, partitions, **options)
+    codes = result.scheduler.material_codes
+    leftover = {}
+    for partition in PARTITIONS:
+        rows = [row for row, owner in enumerate(partitions) if owner == partition]
+        stock = np.array([inventory[partition].get(code, 0.0) for code in codes])
+        leftover[partition] = stock - result.allocation[rows].sum(axis=0)
+    return leftover
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("kit_aware", [False, True])
+def test_without_transfers_matches_single_partition_runs(seed, kit_aware):
+    configs, partitions, inventory = plan(seed)
+
+    result = PartitionedAllocator(None, inventory_data=inventory).allocate(
+        configs, partitions, kit_aware=kit_aware
+    )
+
+    assert not result.transfers.any()
+    for partition in PARTITIONS[:2]:
+        rows = [row for row, owner in enumerate(partitions) if owner == partition]
+        scheduler = PriorityScheduler([configs[row] for row in rows])
+        single = scheduler.allocate(scheduler.inventory_vector(inventory[partition]), kit_aware=kit_aware)
+        columns = [result.scheduler.material_index[code] for code in scheduler.material_codes]
+        assert np.array_equal(result.allocation[np.ix_(rows, columns)], single)
+    assert all(summary.transfer_in == summary.transfer_out == 0 for summary in result.summaries)
+
+
+def test_parallel_matches_in_process(monkeypatch):
+    configs, partitions, inventory = plan(0)
+    allocator = PartitionedAllocator(None, inventory_data=inventory)
+    serial = allocator.allocate(configs, partitions, kit_aware=True, max_workers=1)
+
+    monkeypatch.setattr(partition_module, "PARALLEL_MIN_CELLS", 0)
+    parallel = allocator.allocate(configs, partitions, kit_aware=True, max_workers=2)
+
+    assert np.array_equal(serial.allocation, parallel.allocation)
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("kit_aware", [False, True])
+def test_transfers_stay_within_donor_leftover(seed, kit_aware):
+    configs, partitions, inventory = plan(seed)
+    leftover = leftover_by_partition(configs, partitions, inventory, kit_aware=kit_aware)
+
+    result = PartitionedAllocator(None, inventory_data=inventory).allocate(
+        configs, partitions, kit_aware=kit_aware, fallback=True
+    )
+    summaries = {summary.partition: summary for summary in result.summaries}
+    tolerance = 1e-9 * sum(sum(stock.values()) for stock in inventory.values())
+
+    # 调出量不超过调出分区自己的剩余库存
+    for partition in PARTITIONS:
+        assert summaries[partition].transfer_out <= leftover[partition].sum() + tolerance
+    # 调入的每种物料不超过其他分区该物料的剩余库存之和
+    for partition in PARTITIONS[:2]:
+        rows = [row for row, owner in enumerate(partitions) if owner == partition]
+        others = sum(leftover[other] for other in PARTITIONS if other != partition)
+        assert (result.transfers[rows].sum(axis=0) <= others + tolerance).all()
+    # 调入合计等于调出合计
+    assert sum(summary.transfer_in for summary in result.summaries) == pytest.approx(
+        sum(summary.transfer_out for summary in result.summaries), abs=tolerance
+    )
+    # 调拨后每种物料的分配总量不超过全部分区的库存
+    stock = np.array([sum(inventory[partition][code] for partition in PARTITIONS)
+                      for code in result.scheduler.material_codes])
+    assert (result.allocation.sum(axis=0) <= stock + tolerance).all()
@@ -0,0 +1,45 @@
+"""
+查询统计测试 - 界面操作只统计开始该操作的线程的查询
+"""
+import threading
+from database.query_stats import QueryStats
+
+
+def test_action_counts_only_its_own_thread():
+    stats = QueryStats(slow_threshold=None)
+    started = threading.Event()
+    finish = threading.Event()
+    background = []
+
+    def worker():
+        with stats.action("后台") as action:
+            background.append(action)
+            started.set()
+            finish.wait()
+            stats.record("SELECT 2", None, 0.5, 20)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    started.wait()
+    with stats.action("前台") as foreground:
+        stats.record("SELECT 1", None, 0.1, 10)
+        stats.record("SELECT 1", None, 0.1, 10)
+        finish.set()
+        thread.join()
+
+    assert (foreground.queries, foreground.rows, foreground.repeated) == (2, 20, 1)
+    assert (background[0].queries, background[0].rows) == (1, 20)
+    assert sum(entry.calls for entry in stats.report()) == 3
+
+
+def test_end_from_another_thread():
+    stats = QueryStats(slow_threshold=None)
+    action = stats.begin("模拟")
+
+    thread = threading.Thread(target=stats.end, args=(action,))
+    thread.start()
+    thread.join()
+    stats.record("SELECT 1", None, 0.1, 1)
+
+    assert action.queries == 0
+    assert list(stats.actions) == [action]
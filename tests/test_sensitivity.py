@@ -0,0 +1,112 @@
+"""
+敏感性分析测试 - 瓶颈排序、补料数量与逐物料补足后的可制造数量一致
+"""
+import numpy as np
+import pytest
+from core.sensitivity import SensitivityAnalyzer
+from database.models import AllocationResult, MaterialMetrics
+
+
+def result(plan, per_unit, allocated):
+    """per_unit/allocated: {物料编码: 数量}；可制造数量按分配量可支撑的最少台数"""
+    codes = list(per_unit)
+    required = [per_unit[code] * plan for code in codes]
+    buildable = int(min(
+        [np.floor(allocated[code] / per_unit[code]) for code in codes if per_unit[code] > 0] + [plan]
+    ))
+    return AllocationResult(
+        model_code="A",
+        model_name="A",
+        plan_quantity=plan,
+        allocated_quantity=buildable,
+        satisfaction_rate=buildable / plan * 100 if plan else 0.0,
+        allocated_materials=dict(allocated),
+        shortage_materials={},
+        bom_items=[],
+        material_metrics=MaterialMetrics(
+            material_codes=codes,
+            required=required,
+            allocated=[allocated[code] for code in codes],
+            shortage=[need - allocated[code] for need, code in zip(required, codes)]
+        )
+    )
+
+
+def buildable_after(model, extra):
+    """补料后按分配量可支撑的台数"""
+    metrics = model.material_metrics
+    return min(
+        [np.floor((allocated + extra.get(code, 0.0)) / (required / model.plan_quantity) + 1e-9)
+         for code, required, allocated in zip(metrics.material_codes, metrics.required, metrics.allocated)
+         if required > 0] + [model.plan_quantity]
+    )
+
+
+def test_bottleneck_ranking_and_steps():
+    model = result(
+        10,
+        {"M1": 1.0, "M2": 2.0, "M3": 1.0, "M4": 0.5},
+        {"M1": 4.0, "M2": 12.0, "M3": 10.0, "M4": 4.0}
+    )
+
+    analysis = SensitivityAnalyzer().analyze(model)
+
+    assert analysis.buildable == 4
+    # M3 已满足，不是瓶颈
+    assert [(entry.material_code, entry.supported_units, entry.extra_quantity, entry.units_after,
+             entry.units_unlocked) for entry in analysis.bottlenecks] == [
+        ("M1", 4.0, 2.0, 6, 2),
+        ("M2", 6.0, 4.0, 8, 2),
+        ("M4", 8.0, 1.0, 10, 2),
+    ]
+    assert [step.target_units for step in analysis.steps] == [5, 6, 7, 8, 9, 10]
+    steps = {step.target_units: step for step in analysis.steps}
+    assert (steps[5].materials, steps[5].extra_quantities, steps[5].total_extra) == (["M1"], [1.0], 1.0)
+    assert (steps[7].materials, steps[7].extra_quantities, steps[7].total_extra) == (["M1", "M2"], [3.0, 2.0], 5.0)
+    assert steps[10].total_extra == 15.0
+
+
+def test_custom_targets_and_no_shortage():
+    model = result(10, {"M1": 1.0, "M2": 2.0}, {"M1": 4.0, "M2": 20.0})
+    analyzer = SensitivityAnalyzer(step_ratio=0.5)
+
+    # 不超过当前可制造数量的目标不需要补料
+    assert [step.target_units for step in analyzer.analyze(model, targets=[3, 4, 8]).steps] == [8]
+    assert analyzer.default_targets(4, 10) == [9, 10]
+
+    satisfied = analyzer.analyze(result(10, {"M1": 1.0}, {"M1": 10.0}))
+    assert analyzer.analyze(result(0, {"M1": 1.0}, {"M1": 0.0})).bottlenecks == []
+    assert (satisfied.bottlenecks, satisfied.steps) == ([], [])
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_extra_quantities_reach_targets(seed):
+    rng = np.random.default_rng(seed)
+    plan = int(rng.integers(1, 40))
+    codes = [f"M{index}" for index in range(int(rng.integers(1, 8)))]
+    per_unit = {code: float(rng.integers(1, 8)) / 4 for code in codes}
+    allocated = {code: float(rng.integers(0, per_unit[code] * plan * 4 + 1)) / 4 for code in codes}
+    model = result(plan, per_unit, allocated)
+
+    analysis = SensitivityAnalyzer().analyze(model)
+
+    for step in analysis.steps:
+        extra = dict(zip(step.materials, step.extra_quantities))
+        assert buildable_after(model, extra) >= step.target_units
+        assert all(quantity > 0 for quantity in step.extra_quantities)
+        assert step.total_extra == pytest.approx(sum(step.extra_quantities))
+    metrics = model.material_metrics
+    per_unit_of = {code: required / plan for code, required in zip(metrics.material_codes, metrics.required)}
+    levels = [entry.supported_units for entry in analysis.bottlenecks[1:]] + [plan]
+    for position, (entry, level) in enumerate(zip(analysis.bottlenecks, levels)):
+        # 单独补充该物料后可支撑到下一个瓶颈物料的台数
+        supported = (allocated[entry.material_code] + entry.extra_quantity) / per_unit_of[entry.material_code]
+        assert supported == pytest.approx(max(level, entry.supported_units))
+        # 连同排在前面的物料一起补足后达到 units_after
+        [step] = SensitivityAnalyzer().analyze(model, targets=[entry.units_after]).steps or [None]
+        if step is not None:
+            ranked = [earlier.material_code for earlier in analysis.bottlenecks[:position + 1]]
+            assert set(step.materials) <= set(ranked)
+            assert buildable_after(model, dict(zip(step.materials, step.extra_quantities))) >= entry.units_after
+    if analysis.bottlenecks:
+        assert analysis.bottlenecks[-1].units_after == plan
@@ -0,0 +1,97 @@
+"""
+分配服务测试 - 基于内存 SQLite 的分配、扫描和无效请求
+"""
+import pytest
+from sqlalchemy import text
+from database.connection import DatabaseManager
+from service.engine import AllocationService
+
+BOM_ROWS = [
+    ("A", "M1", 2.0), ("A", "M2", 1.0),
+    ("B", "M1", 1.0), ("B", "M3", 1.0),
+]
+INVENTORY = [("M1", 10.0), ("M2", 3.0), ("M3", 20.0)]
+
+
+@pytest.fixture(scope="module")
+def service():
+    manager = DatabaseManager()
+    assert manager.connect("sqlite://")
+    with manager.engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE XZB_Forcast_BOM (Parent_ItemNumber TEXT, Component_ItemNumber TEXT, "
+            "[Component_ItemNumber Description] TEXT, [Component_ItemNumber Num] REAL)"
+        ))
+        connection.execute(
+            text("INSERT INTO XZB_Forcast_BOM VALUES (:parent, :component, '', :num)"),
+            [{"parent": parent, "component": component, "num": num} for parent, component, num in BOM_ROWS]
+        )
+        connection.execute(text("CREATE TABLE XZB_InvNum (MATNR TEXT, CLABS REAL)"))
+        connection.execute(
+            text("INSERT INTO XZB_InvNum VALUES (:code, :stock)"),
+            [{"code": code, "stock": stock} for code, stock in INVENTORY]
+        )
+    service = AllocationService(manager)
+    assert service.load()
+    return service
+
+
+def payload(**extra):
+    return dict({"models": [
+        {"code": "A", "plan_quantity": 5, "priority": 1},
+        {"code": "B", "plan_quantity": 8, "priority": 2},
+    ]}, **extra)
+
+
+def test_allocate(service):
+    # 按优先级分配时 A 的需求 10 个 M1 占满库存，B 分不到 M1
+    models = {model["code"]: model for model in service.allocate(payload())["models"]}
+    assert models["A"]["allocated_quantity"] == 3
+    assert models["A"]["bottleneck_material"] == "M2"
+    assert models["B"]["allocated_quantity"] == 0
+
+    # 齐套分配：A 受 M2 限制做 3 台（用掉 6 个 M1），剩下 4 个 M1 给 B
+    response = service.allocate(payload(strategy="kit", include_materials=True))
+    models = {model["code"]: model for model in response["models"]}
+    assert models["A"]["allocated_quantity"] == 3
+    assert models["B"]["allocated_quantity"] == 4
+    assert models["B"]["allocated_materials"]["M1"] == 4.0
+
+
+def test_sweep(service):
+    response = service.sweep(payload(model="A", quantities=[0, 2, 5], strategy="kit"))
+
+    assert response["models"] == ["A", "B"]
+    assert response["quantities"] == [0.0, 2.0, 5.0]
+    assert response["buildable"] == [[0, 8], [2, 6], [3, 4]]
+    assert service.sweep(payload(model="A", quantities=[5]))["buildable"] == [[3, 0]]
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"models": "A"},
+    {"models": ["A"]},
+    {"models": [{"code": "X"}]},
+    {"models": [{"code": "A", "plan_quantity": 2.5}]},
+    {"models": [{"code": "A", "plan_quantity": "5"}]},
+    {"models": [{"code": "A", "plan_quantity": -1}]},
+    {"models": [{"code": "A", "priority": None}]},
+    {"models": [{"code": "A", "material_priorities": ["M1"]}]},
+    {"models": [{"code": "A", "material_priorities": {"M1": 1.5}}]},
+    {"models": [{"code": "A"}], "strategy": "fastest"},
+])
+def test_invalid_payload_raises_value_error(service, body):
+    with pytest.raises(ValueError):
+        service.allocate(body)
+
+
+@pytest.mark.parametrize("extra", [
+    {"model": "C", "quantities": [1]},
+    {"model": "A", "quantities": []},
+    {"model": "A", "quantities": "5"},
+    {"model": "A", "quantities": [1, None]},
+    {"model": "A", "quantities": [1.5]},
+])
+def test_invalid_sweep_raises_value_error(service, extra):
+    with pytest.raises(ValueError):
+        service.sweep(payload(**extra))
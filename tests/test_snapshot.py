@@ -0,0 +1,48 @@
+"""
+共享内存快照测试 - 发布、挂载、释放后不再指向已删除的快照
+"""
+import pytest
+from core.bom_matrix import BOMMatrix
+from core.snapshot import InventorySnapshot
+
+BOM = BOMMatrix.from_rows([("A", "M1", 2.0), ("A", "M2", 1.0), ("B", "M1", 1.0)])
+
+
+def test_attach_reads_published_snapshot(tmp_path):
+    published = InventorySnapshot.publish({"M1": 5.0, "M2": 3.0, "M9": 1.0}, BOM, str(tmp_path))
+    try:
+        attached = InventorySnapshot.attach(snapshot_dir=str(tmp_path))
+        assert attached.version == published.version
+        assert dict(attached.inventory) == {"M1": 5.0, "M2": 3.0, "M9": 1.0}
+        assert attached.inventory.vector(["M2", "M0"]).tolist() == [3.0, 0.0]
+        assert attached.parent_codes == ["A", "B"]
+        assert attached.bom.row("A") == {"M1": 2.0, "M2": 1.0}
+        # 库存视图与BOM矩阵共用同一份物料索引
+        assert attached.material_index is attached.bom.material_index
+        attached.close()
+    finally:
+        published.unlink()
+
+
+def test_unlink_clears_latest_pointer(tmp_path):
+    snapshot = InventorySnapshot.publish({"M1": 5.0}, BOM, str(tmp_path))
+    assert InventorySnapshot.latest_version(str(tmp_path)) == snapshot.version
+
+    snapshot.unlink()
+
+    assert InventorySnapshot.latest_version(str(tmp_path)) is None
+    with pytest.raises(FileNotFoundError):
+        InventorySnapshot.attach(snapshot_dir=str(tmp_path))
+
+
+def test_unlink_keeps_newer_latest(tmp_path):
+    older = InventorySnapshot.publish({"M1": 5.0}, BOM, str(tmp_path))
+    newer = InventorySnapshot.publish({"M1": 6.0}, BOM, str(tmp_path))
+    try:
+        older.unlink()
+        assert InventorySnapshot.latest_version(str(tmp_path)) == newer.version
+        attached = InventorySnapshot.attach(snapshot_dir=str(tmp_path))
+        assert attached.inventory["M1"] == 6.0
+        attached.close()
+    finally:
+        newer.unlink()
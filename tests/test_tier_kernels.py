@@ -0,0 +1,157 @@
+"""
+浮点层级分配测试 - 同层级平分、库存耗尽、分配之和不超过库存
+"""
+from fractions import Fraction
+
+import numpy as np
+import pytest
+from core.kernels import allocate_by_tiers, allocate_kit_aware
+
+EPSILON = Fraction(np.finfo(np.float64).eps)
+
+
+def exact_sum(values):
+    """浮点数组的精确和"""
+    return sum(Fraction(value) for value in np.ravel(values))
+
+
+def test_sole_model_gets_exact_min():
+    # 只有一个机型需要的短缺物料精确分到全部库存（不是 1.2 × (0.7 ÷ 1.2)）
+    requirements = np.array([[1.2], [0.5]])
+    tier_index = np.array([[0], [1]])
+
+    allocation = allocate_by_tiers(np.array([0.7]), requirements, tier_index, 2)
+
+    assert allocation[:, 0].tolist() == [0.7, 0.0]
+
+
+def test_same_tier_tie_splits_evenly():
+    requirements = np.array([[10.0], [10.0]])
+    tier_index = np.zeros((2, 1), dtype=np.int64)
+
+    allocation = allocate_by_tiers(np.array([10.0]), requirements, tier_index, 1)
+
+    assert allocation[:, 0].tolist() == [5.0, 5.0]
+
+
+def test_shared_split_stays_within_stock():
+    # 4 按 2:44:14 等比例分配，每份按精确份额向下舍入，累加不超过 4
+    requirements = np.array([[2.0], [44.0], [14.0]])
+    tier_index = np.zeros((3, 1), dtype=np.int64)
+
+    allocation = allocate_by_tiers(np.array([4.0]), requirements, tier_index, 1)
+
+    assert exact_sum(allocation) <= 4
+    assert 4 - exact_sum(allocation) < 1e-15
+
+
+def test_exhausted_material_leaves_nothing_to_lower_tiers():
+    # 0.1 + 0.2 超出库存 0.3：高层级用完，低层级分不到浮点残差
+    requirements = np.array([[0.1], [0.2], [0.5]])
+    tier_index = np.array([[0], [0], [1]])
+
+    stock_levels = np.empty((3, 1))
+    allocation = allocate_by_tiers(np.array([0.3]), requirements, tier_index, 2, stock_levels)
+
+    assert allocation[2, 0] == 0.0
+    assert stock_levels[1:, 0].tolist() == [0.0, 0.0]
+    assert exact_sum(allocation) <= Fraction(0.3)
+
+
+def test_random_tiers_never_exceed_stock():
+    rng = np.random.default_rng(1)
+    for _ in range(500):
+        model_count = int(rng.integers(1, 7))
+        # 1/16 的整数倍在浮点下精确，可以按精确和检查
+        inventory = rng.integers(0, 400, 4) / 16
+        requirements = rng.integers(0, 200, (model_count, 4)) / 16
+        tier_index = rng.integers(0, 3, (model_count, 4))
+
+        allocation = allocate_by_tiers(inventory, requirements, tier_index, 3)
+
+        assert (allocation <= requirements).all()
+        for column in range(4):
+            assert exact_sum(allocation[:, column]) <= Fraction(inventory[column])
+            # 高层级未满足时低层级分不到库存
+            for tier in range(1, 3):
+                higher = tier_index[:, column] < tier
+                if (allocation[higher, column] < requirements[higher, column]).any():
+                    assert not allocation[tier_index[:, column] == tier, column].any()
+
+
+def test_random_decimal_quantities_never_exceed_stock():
+    rng = np.random.default_rng(2)
+    for _ in range(500):
+        model_count = int(rng.integers(1, 6))
+        inventory = np.round(rng.uniform(0, 3, 4), 1)
+        requirements = np.round(rng.uniform(0, 2, (model_count, 4)), 1)
+        tier_index = rng.integers(0, 3, (model_count, 4))
+
+        allocation = allocate_by_tiers(inventory, requirements, tier_index, 3)
+
+        assert (allocation <= requirements).all()
+        for column in range(4):
+            # 层级需求按浮点刚好等于库存时全部满足，只允许十进制数量的表示误差
+            assert exact_sum(allocation[:, column]) <= Fraction(inventory[column]) * (1 + EPSILON)
+            # 高层级未满足时低层级分不到浮点残差
+            for tier in range(1, 3):
+                higher = tier_index[:, column] < tier
+                if (allocation[higher, column] < requirements[higher, column]).any():
+                    assert not allocation[tier_index[:, column] == tier, column].any()
+
+
+def test_batch_matches_single_runs():
+    rng = np.random.default_rng(3)
+    requirements = rng.integers(0, 50, (5, 6)) / 10
+    tier_index = rng.integers(0, 3, (5, 6))
+    inventory = rng.integers(0, 120, (4, 6)) / 10
+
+    batch = allocate_by_tiers(inventory, requirements, tier_index, 3)
+
+    for sample in range(4):
+        single = allocate_by_tiers(inventory[sample], requirements, tier_index, 3)
+        assert np.array_equal(batch[sample], single)
+
+
+@pytest.mark.parametrize("inventory", [[6.0, 5.0], [3.0, 10.0], [0.0, 4.0]])
+def test_kit_aware_fixpoint_within_stock(inventory):
+    # 两个同层级机型共用 M1，M2 只有高层级机型使用
+    per_unit = np.array([[1.0, 1.0], [1.0, 0.0], [1.0, 0.0]])
+    plans = np.array([4.0, 4.0, 4.0])
+    tier_index = np.array([[0, 0], [0, -1], [1, -1]])
+    inventory = np.array(inventory)
+
+    allocation = allocate_kit_aware(
+        inventory, per_unit * plans[:, None], per_unit, plans, tier_index, 2
+    )
+
+    assert (allocation.sum(axis=0) <= inventory).all()
+    # 每个机型只保留整数台数实际消耗的物料
+    units = allocation[:, 0]
+    assert np.array_equal(units, np.floor(units))
+    assert (allocation <= per_unit * units[:, None]).all()
+
+
+def test_kit_aware_releases_stock_to_lower_tier():
+    # 高层级机型受 M2 限制只能做 1 台，用不上的 M1 让给低层级
+    per_unit = np.array([[1.0, 1.0], [1.0, 0.0]])
+    plans = np.array([5.0, 5.0])
+    tier_index = np.array([[0, 0], [1, -1]])
+
+    allocation = allocate_kit_aware(
+        np.array([5.0, 1.0]), per_unit * plans[:, None], per_unit, plans, tier_index, 2
+    )
+
+    assert allocation.tolist() == [[1.0, 1.0], [4.0, 0.0]]
+
+
+def test_kit_aware_tie_is_symmetric():
+    per_unit = np.array([[2.0], [2.0]])
+    plans = np.array([3.0, 3.0])
+    tier_index = np.zeros((2, 1), dtype=np.int64)
+
+    allocation = allocate_kit_aware(
+        np.array([8.0]), per_unit * plans[:, None], per_unit, plans, tier_index, 1
+    )
+
+    assert allocation[:, 0].tolist() == [4.0, 4.0]
@@ -0,0 +1,67 @@
+"""
+分配追溯测试 - 决策记录、容量上限丢弃最早记录、按物料/机型查询
+"""
+import numpy as np
+from core.kernels import allocate_by_tiers
+from core.trace import TraceLog, TraceRecorder
+
+
+def record(recorder, inventory, models=("A", "B"), materials=("M1", "M2")):
+    requirements = np.array([[2.0, 1.0], [3.0, 0.0]])
+    tier_index = np.array([[0, 0], [1, -1]])
+    stock_levels = np.empty((3, 2))
+    allocation = allocate_by_tiers(np.array(inventory), requirements, tier_index, 2, stock_levels)
+    return recorder.record_allocation(
+        list(models), list(materials), requirements, allocation, tier_index, stock_levels
+    )
+
+
+def test_decisions_follow_tiers():
+    recorder = TraceRecorder()
+    run = record(recorder, [4.0, 1.0])
+
+    log = recorder.to_log()
+
+    assert len(log) == len(recorder) == 3
+    assert log.query(material="M1") == [
+        {"run": run, "time": log.run_times[run], "tier": 0, "model": "A", "material": "M1",
+         "requested": 2.0, "allocated": 2.0, "stock_before": 4.0, "stock_after": 2.0},
+        {"run": run, "time": log.run_times[run], "tier": 1, "model": "B", "material": "M1",
+         "requested": 3.0, "allocated": 2.0, "stock_before": 2.0, "stock_after": 0.0},
+    ]
+    assert [entry["material"] for entry in log.query(model="A")] == ["M1", "M2"]
+    assert log.query(material="M9") == []
+
+
+def test_capacity_keeps_latest_decisions():
+    recorder = TraceRecorder(capacity=4)
+    record(recorder, [4.0, 1.0])
+    second = record(recorder, [1.0, 1.0], models=("C", "D"))
+
+    log = recorder.to_log()
+
+    assert recorder.written == 6
+    assert len(log) == len(recorder) == 4
+    # 第一批只剩最后一条决策
+    assert log.columns["run"].tolist() == [0, second, second, second]
+    assert list(log.run_times) == [0, second]
+    assert [(entry["model"], entry["material"]) for entry in log.query(run=0)] == [("B", "M1")]
+    assert log.query(model="C", material="M1")[0]["allocated"] == 1.0
+
+    third = record(recorder, [4.0, 1.0])
+    assert set(recorder.to_log().columns["run"].tolist()) == {second, third}
+
+    recorder.clear()
+    assert len(recorder) == 0 and len(recorder.to_log()) == 0
+
+
+def test_save_round_trip(tmp_path):
+    recorder = TraceRecorder()
+    record(recorder, [4.0, 1.0])
+    log = recorder.to_log()
+
+    filename = str(tmp_path / "trace.npz")
+    recorder.save(filename)
+    loaded = TraceLog.load(filename)
+
+    assert loaded.query() == log.query()
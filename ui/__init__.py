@@ -4,11 +4,17 @@ UI模块
 from .main_window import MainWindow
 from .config_frame import ConfigFrame, ModelConfigFrame
 from .result_frame import ResultFrame, ModelResultFrame
+from .buildability_frame import BuildabilityFrame
+from .plan_frame import PlanImportFrame
+from .comparison_frame import ComparisonFrame
 
 __all__ = [
     'MainWindow',
     'ConfigFrame',
     'ModelConfigFrame',
     'ResultFrame',
-    'ModelResultFrame'
+    'ModelResultFrame',
+    'BuildabilityFrame',
+    'PlanImportFrame',
+    'ComparisonFrame'
 ]
@@ -0,0 +1,136 @@
+"""
+可制造性报告界面 - 展示全部机型在当前库存下的最大可制造数量
+"""
+import threading
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+from datetime import datetime
+from database.connection import db_manager
+from ui.table_sync import TreeviewSync
+
+
+class BuildabilityFrame(ttk.Frame):
+    """可制造性报告框架"""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.report = None
+        self._outcome = None
+        self._queries = None  # 最近一次后台任务的查询汇总
+        self.create_widgets()
+
+    def create_widgets(self):
+        """创建报告展示组件"""
+        button_frame = ttk.Frame(self)
+        button_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        self.generate_btn = ttk.Button(
+            button_frame,
+            text="生成可制造性报告",
+            command=self.generate_report
+        )
+        self.generate_btn.pack(side=tk.LEFT)
+
+        export_btn = ttk.Button(
+            button_frame,
+            text="导出CSV",
+            command=self.export_to_csv
+        )
+        export_btn.pack(side=tk.LEFT, padx=5)
+
+        self.status_var = tk.StringVar()
+        ttk.Label(button_frame, textvariable=self.status_var).pack(side=tk.LEFT, padx=10)
+
+        report_frame = ttk.LabelFrame(self, text="各机型最大可制造数量（单独生产）", padding="10")
+        report_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        columns = ("机型编码", "最大可制造数量", "瓶颈物料", "瓶颈物料库存", "单台用量")
+        self.report_tree = ttk.Treeview(report_frame, columns=columns, show="headings")
+
+        for col in columns:
+            self.report_tree.heading(col, text=col)
+            self.report_tree.column(col, width=100)
+
+        report_scrollbar = ttk.Scrollbar(
+            report_frame,
+            orient=tk.VERTICAL,
+            command=self.report_tree.yview
+        )
+        self.report_tree.configure(yscrollcommand=report_scrollbar.set)
+
+        self.report_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.report_table = TreeviewSync(self.report_tree)
+        report_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def generate_report(self):
+        """在后台线程中生成报告"""
+        from core.buildability import build_report
+        from database.query_stats import query_stats
+
+        self.generate_btn.state(["disabled"])
+        self.status_var.set("正在加载BOM和库存数据...")
+        self._outcome = None
+
+        def worker():
+            with query_stats.action("可制造性报告") as queries:
+                try:
+                    outcome = (build_report(db_manager), None)
+                except Exception as e:
+                    outcome = (None, e)
+            self._queries = queries
+            self._outcome = outcome
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.after(100, self._poll_report)
+
+    def _poll_report(self):
+        """取回后台生成的报告并展示"""
+        if self._outcome is None:
+            self.after(100, self._poll_report)
+            return
+
+        report, error = self._outcome
+        self.generate_btn.state(["!disabled"])
+        if error:
+            self.status_var.set(f"生成失败: {str(error)}")
+            return
+
+        self.report = report
+        self.display_report(report)
+        self.status_var.set(f"共 {len(report)} 个机型（{self._queries}）")
+
+    def display_report(self, report):
+        """展示报告（可制造数量少的机型排在前面，重新生成时只更新变化的行）"""
+        self.report_table.update({
+            parent: (
+                parent,
+                "不受限" if units == float("inf") else f"{int(units)}",
+                material or "",
+                f"{inventory:.2f}",
+                f"{per_unit:.2f}"
+            )
+            for parent, units, material, inventory, per_unit in sorted(
+                report.rows(), key=lambda row: row[1]
+            )
+        })
+
+    def export_to_csv(self):
+        """导出报告到CSV"""
+        if not self.report:
+            messagebox.showwarning("警告", "没有可导出的数据，请先生成报告")
+            return
+
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV文件", "*.csv"), ("所有文件", "*.*")],
+            initialfile=f"可制造性报告_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            title="保存导出文件"
+        )
+        if not filename:
+            return
+
+        try:
+            self.report.to_csv(filename)
+            messagebox.showinfo("成功", f"导出成功！\n文件已保存到:\n{filename}")
+        except Exception as e:
+            messagebox.showerror("错误", f"导出失败：{str(e)}")
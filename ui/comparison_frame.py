@@ -0,0 +1,189 @@
+"""
+运行对比界面 - 将本次分配结果与基准结果对比，只展示发生变化的机型和物料
+"""
+import time
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+from datetime import datetime
+from ui.table_sync import TreeviewSync
+
+# 物料差异表最多展示的行数（按分配差绝对值从大到小），导出不受限制
+COMPARISON_DISPLAY_LIMIT = 1000
+
+
+class ComparisonFrame(ttk.Frame):
+    """运行对比框架"""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.baseline = None  # 基准结果 (运行时间, 分配结果字典)
+        self.current = None  # 最近一次结果 (运行时间, 分配结果字典)
+        self.pinned = False  # 基准是否固定；未固定时基准为上一次运行
+        self.comparison = None
+        self.create_widgets()
+
+    def create_widgets(self):
+        """创建对比展示组件"""
+        button_frame = ttk.Frame(self)
+        button_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        ttk.Button(
+            button_frame,
+            text="固定本次结果为基准",
+            command=self.pin_baseline
+        ).pack(side=tk.LEFT)
+
+        ttk.Button(
+            button_frame,
+            text="基准改为上次运行",
+            command=self.unpin_baseline
+        ).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(
+            button_frame,
+            text="导出差异",
+            command=self.export_to_excel
+        ).pack(side=tk.LEFT, padx=5)
+
+        self.status_var = tk.StringVar(value="执行两次库存分配后在此对比结果差异")
+        ttk.Label(self, textvariable=self.status_var).pack(fill=tk.X, padx=10)
+
+        models_frame = ttk.LabelFrame(self, text="机型差异", padding="10")
+        models_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        columns = ("机型编码", "基准满足率", "当前满足率", "满足率变化", "基准可制造", "当前可制造", "基准瓶颈", "当前瓶颈")
+        models_tree = ttk.Treeview(models_frame, columns=columns, show="headings", height=4)
+        for col in columns:
+            models_tree.heading(col, text=col)
+            models_tree.column(col, width=90)
+        models_tree.pack(fill=tk.X)
+        self.models_table = TreeviewSync(models_tree)
+
+        materials_frame = ttk.LabelFrame(self, text="物料差异", padding="10")
+        materials_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        columns = ("机型编码", "物料编码", "状态", "基准分配", "当前分配", "分配差", "基准短缺", "当前短缺", "短缺差", "满足比例变化")
+        self.materials_tree = ttk.Treeview(materials_frame, columns=columns, show="headings")
+        for col in columns:
+            self.materials_tree.heading(col, text=col)
+            self.materials_tree.column(col, width=80)
+
+        materials_scrollbar = ttk.Scrollbar(
+            materials_frame,
+            orient=tk.VERTICAL,
+            command=self.materials_tree.yview
+        )
+        self.materials_tree.configure(yscrollcommand=materials_scrollbar.set)
+
+        self.materials_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.materials_table = TreeviewSync(self.materials_tree)
+        materials_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def add_run(self, results: dict):
+        """
+        记录一次分配结果，并与基准对比
+
+        Args:
+            results: 分配结果字典（model_a/model_b 为 AllocationResult）
+        """
+        run = (datetime.now(), results)
+        if not self.pinned:
+            self.baseline = self.current
+        self.current = run
+        self.refresh()
+
+    def pin_baseline(self):
+        """以最近一次结果为固定基准"""
+        if not self.current:
+            messagebox.showwarning("警告", "没有可作为基准的结果，请先执行库存分配")
+            return
+        self.baseline = self.current
+        self.pinned = True
+        self.refresh()
+
+    def unpin_baseline(self):
+        """取消固定基准，之后每次运行与上一次运行对比"""
+        self.pinned = False
+
+    def refresh(self):
+        """重新计算并展示差异"""
+        if not self.baseline or not self.current:
+            return
+
+        from core.comparison import compare_results
+
+        (baseline_time, baseline), (current_time, current) = self.baseline, self.current
+        started = time.perf_counter()
+        self.comparison = compare_results(
+            [baseline.get('model_a'), baseline.get('model_b')],
+            [current.get('model_a'), current.get('model_b')]
+        )
+        elapsed = (time.perf_counter() - started) * 1000
+        comparison = self.comparison
+
+        changed_models = comparison.changed_models()
+        self.models_table.update({
+            delta.model_code: (
+                delta.model_code,
+                f"{delta.rate_before:.2f}%",
+                f"{delta.rate_after:.2f}%",
+                f"{delta.rate_after - delta.rate_before:+.2f}%",
+                delta.units_before,
+                delta.units_after,
+                delta.bottleneck_before or "",
+                delta.bottleneck_after or ""
+            )
+            for delta in changed_models
+        })
+
+        rows = list(comparison.rows())
+        if len(rows) > COMPARISON_DISPLAY_LIMIT:
+            rows.sort(key=lambda row: abs(row[5]), reverse=True)
+            rows = rows[:COMPARISON_DISPLAY_LIMIT]
+        self.materials_table.update({
+            f"{model}|{material}": (
+                model, material, status,
+                f"{allocated_before:.2f}", f"{allocated_after:.2f}", f"{allocated_delta:+.2f}",
+                f"{shortage_before:.2f}", f"{shortage_after:.2f}", f"{shortage_delta:+.2f}",
+                f"{(ratio_after - ratio_before) * 100:+.2f}%"
+            )
+            for (model, material, status, allocated_before, allocated_after, allocated_delta,
+                 shortage_before, shortage_after, shortage_delta, ratio_before, ratio_after) in rows
+        })
+
+        shown = f"（展示分配差最大的 {len(rows)} 行）" if len(rows) < len(comparison) else ""
+        self.status_var.set(
+            f"基准 {baseline_time.strftime('%H:%M:%S')}{'（固定）' if self.pinned else ''} → "
+            f"本次 {current_time.strftime('%H:%M:%S')}：{len(changed_models)} 个机型、"
+            f"{len(comparison)} / {comparison.compared_rows} 个物料行有变化{shown}，对比耗时 {elapsed:.1f} ms"
+        )
+
+    def export_to_excel(self):
+        """导出全部差异到Excel"""
+        # 只有机型级差异时物料差异为空（len 为 0），仍可导出
+        if self.comparison is None:
+            messagebox.showwarning("警告", "没有可导出的差异，请先执行两次库存分配")
+            return
+
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            filetypes=[("Excel文件", "*.xlsx"), ("所有文件", "*.*")],
+            initialfile=f"分配结果对比_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+            title="保存导出文件"
+        )
+        if not filename:
+            return
+
+        try:
+            self.comparison.to_excel(filename)
+            messagebox.showinfo("成功", f"导出成功！\n文件已保存到:\n{filename}")
+        except Exception as e:
+            messagebox.showerror("错误", f"导出失败：{str(e)}")
+
+    def clear(self):
+        """清空对比"""
+        self.baseline = self.current = self.comparison = None
+        self.pinned = False
+        self.models_table.clear()
+        self.materials_table.clear()
+        self.status_var.set("执行两次库存分配后在此对比结果差异")
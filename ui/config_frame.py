@@ -1,10 +1,30 @@
 """
 配置界面 - 机型信息管理和参数设置
 """
+import queue
 import tkinter as tk
 from tkinter import ttk
-from database.connection import db_manager
+from core.allocation import STRATEGIES
+from database.catalog import model_catalog
+from database.bom_cache import bom_cache
+from database.query_stats import query_stats
 from database.models import ModelConfig, BOMItem
+from ui.table_sync import TreeviewSync
+
+# 分配策略显示名称 {策略名称: 显示名称}
+STRATEGY_LABELS = {
+    "priority": "优先级分配",
+    "kit": "齐套分配",
+    "optimal": "最优分配",
+}
+
+# 分配策略 {显示名称: 分配参数}（由 core.allocation.STRATEGIES 生成，未配置显示名称的策略按策略名称显示）
+ALLOCATION_STRATEGIES = {
+    STRATEGY_LABELS.get(name, name): options for name, options in STRATEGIES.items()
+}
+
+# 主线程检查机型目录更新通知的间隔（毫秒）
+CATALOG_POLL_MS = 200
 
 
 class ConfigFrame(ttk.Frame):
@@ -13,6 +33,9 @@ class ConfigFrame(ttk.Frame):
     def __init__(self, parent, main_window):
         super().__init__(parent)
         self.main_window = main_window
+        self._catalog_version = None
+        self._catalog_events = queue.Queue()  # 机型目录更新通知（任意线程写入，主线程取出）
+        self._catalog_after_id = None
         self.create_widgets()
         self.load_available_models()
     
@@ -39,16 +62,66 @@ class ConfigFrame(ttk.Frame):
         self.notebook.add(self.model_b_frame, text="机型 B")
     
     def load_available_models(self):
-        """加载可用机型列表"""
-        try:
-            parent_items = db_manager.get_all_parent_items()
-            if parent_items:
-                models = [item[0] for item in parent_items]
-                self.model_a_frame.set_available_models(models, other_frame=self.model_b_frame)
-                self.model_b_frame.set_available_models(models, other_frame=self.model_a_frame)
-        except Exception as e:
-            print(f"加载机型列表失败: {e}")
+        """
+        加载可用机型列表（A/B两个配置页共享同一份机型目录）
+
+        先展示本地缓存的机型列表；数据库连接成功后由主窗口触发后台刷新。
+        """
+        self.model_a_frame.other_frame = self.model_b_frame
+        self.model_b_frame.other_frame = self.model_a_frame
+        # 目录更新（可能在后台加载线程中）时只写入队列，由主线程定时取出后同步；
+        # 后台线程不调用任何 Tk 方法
+        model_catalog.add_listener(self._on_catalog_changed)
+        self.bind("<Destroy>", self._on_destroy, add="+")
+        if not model_catalog.models:
+            model_catalog.load_cache()
+        self._sync_catalog()
+        self._catalog_after_id = self.after(CATALOG_POLL_MS, self._drain_catalog_events)
+
+    def _on_catalog_changed(self):
+        """机型目录更新回调（任意线程）"""
+        self._catalog_events.put(None)
+
+    def _drain_catalog_events(self):
+        """主线程：取出全部目录更新通知，有通知时同步一次"""
+        changed = False
+        while True:
+            try:
+                self._catalog_events.get_nowait()
+            except queue.Empty:
+                break
+            changed = True
+        if changed:
+            self._sync_catalog()
+        self._catalog_after_id = self.after(CATALOG_POLL_MS, self._drain_catalog_events)
+
+    def _on_destroy(self, event):
+        """配置页销毁时取消目录回调和定时检查"""
+        if event.widget is self:
+            model_catalog.remove_listener(self._on_catalog_changed)
+            if self._catalog_after_id is not None:
+                self.after_cancel(self._catalog_after_id)
+                self._catalog_after_id = None
+
+    def _sync_catalog(self):
+        """机型目录更新后同步到两个配置页"""
+        if model_catalog.version != self._catalog_version:
+            self._catalog_version = model_catalog.version
+            models = model_catalog.models
+            self.model_a_frame.set_available_models(models, other_frame=self.model_b_frame)
+            self.model_b_frame.set_available_models(models, other_frame=self.model_a_frame)
     
+    def watch_parameters(self, callback):
+        """
+        监听两个机型的计划数量与优先级变化
+
+        Args:
+            callback: 参数变化时调用的函数
+        """
+        for frame in (self.model_a_frame, self.model_b_frame):
+            frame.plan_quantity_var.trace_add("write", lambda *args: callback())
+            frame.priority_var.trace_add("write", lambda *args: callback())
+
     def get_model_a_config(self):
         """获取机型A配置"""
         return self.model_a_frame.get_config()
@@ -71,6 +144,7 @@ class ModelConfigFrame(ttk.Frame):
         self.model_label = model_label
         self.available_models = []
         self.other_frame = None  # 另一个机型的引用
+        self.excluded_model = ""  # 另一个机型已选择的编码（互斥）
         self.bom_items = []
         self.create_widgets()
     
@@ -86,11 +160,11 @@ class ModelConfigFrame(ttk.Frame):
         self.model_code_var = tk.StringVar()
         self.model_code_combo = ttk.Combobox(
             selection_frame,
-            textvariable=self.model_code_var,
-            state="readonly"
+            textvariable=self.model_code_var
         )
         self.model_code_combo.grid(row=0, column=1, sticky=tk.EW, padx=5, pady=5)
         self.model_code_combo.bind("<<ComboboxSelected>>", self.on_model_selected)
+        self.model_code_combo.bind("<KeyRelease>", self.on_model_typed)
         
         # 机型名称
         ttk.Label(selection_frame, text="机型名称:").grid(row=1, column=0, sticky=tk.W, pady=5)
@@ -135,18 +209,17 @@ class ModelConfigFrame(ttk.Frame):
         priority_frame = ttk.Frame(params_frame)
         priority_frame.grid(row=1, column=1, sticky=tk.EW, padx=5, pady=5)
         
-        ttk.Radiobutton(
+        ttk.Spinbox(
             priority_frame,
-            text="高优先级",
-            variable=self.priority_var,
-            value=1
+            from_=1,
+            to=99,
+            width=6,
+            textvariable=self.priority_var
         ).pack(side=tk.LEFT, padx=5)
         
-        ttk.Radiobutton(
+        ttk.Label(
             priority_frame,
-            text="低优先级",
-            variable=self.priority_var,
-            value=2
+            text="（数字越小优先级越高，相同数字为同一层级）"
         ).pack(side=tk.LEFT, padx=5)
         
         # 加载BOM按钮
@@ -176,6 +249,7 @@ class ModelConfigFrame(ttk.Frame):
         self.bom_tree.configure(yscrollcommand=bom_scrollbar.set)
         
         self.bom_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.bom_table = TreeviewSync(self.bom_tree)
         bom_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         # BOM统计信息
@@ -193,22 +267,41 @@ class ModelConfigFrame(ttk.Frame):
         """
         self.other_frame = other_frame
         self.available_models = models
-        self.model_code_combo['values'] = models
-    
+        self.update_model_values()
+
+    def set_excluded_model(self, model_code):
+        """
+        设置需要排除的机型（另一个机型已选择）
+
+        Args:
+            model_code: 被排除的机型编码
+        """
+        self.excluded_model = model_code
+        self.update_model_values()
+
+    def update_model_values(self):
+        """按当前输入过滤下拉列表（前缀优先，其次子串）"""
+        typed = self.model_code_var.get()
+        if typed in model_catalog:
+            typed = ""  # 已选定完整编码时展示全部候选
+        self.model_code_combo['values'] = [
+            model for model in model_catalog.search(typed)
+            if model != self.excluded_model
+        ]
+
     def refresh_models(self):
-        """刷新机型列表"""
-        self.load_available_models()
-    
-    def load_available_models(self):
-        """从数据库加载可用机型"""
-        try:
-            parent_items = db_manager.get_all_parent_items()
-            if parent_items:
-                models = [item[0] for item in parent_items]
-                self.set_available_models(models, self.other_frame)
-        except Exception as e:
-            print(f"加载机型列表失败: {e}")
-    
+        """刷新机型列表（后台加载，结果由 ConfigFrame 同步到两个配置页），同时丢弃已缓存的BOM"""
+        bom_cache.clear()
+        model_catalog.refresh()
+
+    def on_model_typed(self, event):
+        """输入机型编码时实时过滤候选列表"""
+        if event.keysym in ("Up", "Down", "Escape", "Tab"):
+            return
+        self.update_model_values()
+        if event.keysym == "Return" or self.model_code_var.get() in model_catalog:
+            self.on_model_selected(event)
+
     def on_model_selected(self, event):
         """机型选择事件"""
         model_code = self.model_code_var.get()
@@ -216,12 +309,12 @@ class ModelConfigFrame(ttk.Frame):
             # 自动填充机型名称（使用机型编码）
             self.model_name_var.set(model_code)
 
+            # 后台预取BOM，点击"加载BOM数据"时直接使用缓存
+            bom_cache.prefetch([model_code])
+
             # 更新另一个机型的可用列表（排除已选择的机型）
             if self.other_frame:
-                available_for_other = [
-                    model for model in self.available_models if model != model_code
-                ]
-                self.other_frame.set_available_models(available_for_other, self)
+                self.other_frame.set_excluded_model(model_code)
     
     def load_bom_data(self):
         """加载BOM数据"""
@@ -230,10 +323,13 @@ class ModelConfigFrame(ttk.Frame):
             return
         
         try:
-            bom_data = db_manager.get_bom_data(model_code)
+            with query_stats.action("加载BOM") as queries:
+                bom_data = bom_cache.get(model_code)
             if bom_data:
+                bom_cache.record_use(model_code)
                 self.bom_items = []
-                self.bom_tree.delete(*self.bom_tree.get_children())
+                rows = {}
+                occurrences = {}
                 
                 for row in bom_data:
                     bom_item = BOMItem(
@@ -244,16 +340,18 @@ class ModelConfigFrame(ttk.Frame):
                     )
                     self.bom_items.append(bom_item)
                     
-                    self.bom_tree.insert(
-                        "",
-                        tk.END,
-                        values=(row[1], row[2] if row[2] else "", row[3] if row[3] else 0)
-                    )
+                    # 行键为物料编码（同一物料多行时加序号），切换机型时共用物料的行原地保留
+                    occurrence = occurrences.get(row[1], 0)
+                    occurrences[row[1]] = occurrence + 1
+                    key = row[1] if occurrence == 0 else f"{row[1]}#{occurrence}"
+                    rows[key] = (row[1], row[2] if row[2] else "", row[3] if row[3] else 0)
+                
+                self.bom_table.update(rows)
                 
                 # 更新统计信息
-                self.bom_stats_var.set(f"共 {len(self.bom_items)} 个物料")
+                self.bom_stats_var.set(f"共 {len(self.bom_items)} 个物料（{queries}）")
             else:
-                self.bom_tree.delete(*self.bom_tree.get_children())
+                self.bom_table.clear()
                 self.bom_items = []
                 self.bom_stats_var.set("未找到BOM数据")
         
@@ -285,10 +383,10 @@ class ModelConfigFrame(ttk.Frame):
         self.model_name_var.set("")
         self.plan_quantity_var.set(0)
         self.priority_var.set(1)
-        self.bom_tree.delete(*self.bom_tree.get_children())
+        self.bom_table.clear()
         self.bom_items = []
         self.bom_stats_var.set("")
 
         # 恢复另一个机型的可用列表
         if self.other_frame:
-            self.other_frame.set_available_models(self.available_models, self)
+            self.other_frame.set_excluded_model("")
@@ -1,12 +1,20 @@
 """
 主窗口界面
 """
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-from ui.config_frame import ConfigFrame
+from ui.config_frame import ConfigFrame, ALLOCATION_STRATEGIES
 from ui.result_frame import ResultFrame
 from database.connection import db_manager
 
+# 实时模拟：参数停止变化多久后触发重新分配（毫秒）
+LIVE_DEBOUNCE_MS = 60
+
+# 实时模拟：轮询后台分配结果的间隔（毫秒）
+LIVE_POLL_MS = 10
+
 
 class MainWindow:
     """主窗口类"""
@@ -16,15 +24,30 @@ class MainWindow:
         self.root.title("JTBD库存分配系统")
         self.root.geometry("1200x800")
         
-        # 初始化数据库连接
-        self.db_connected = db_manager.connect()
+        # 数据库在后台连接，窗口先以缓存的机型列表可用
+        self.db_connected = False
+        
+        # 缓存的分配器（库存数据），供实时模拟复用
+        self.allocator = None
+        
+        # 分配追溯记录器（开启追溯后创建）
+        self.trace_recorder = None
+        
+        # 实时模拟状态
+        self._live_after_id = None
+        self._live_running = False
+        self._live_pending = False
+        self._live_outcome = None
         
         # 创建界面
         self.create_widgets()
+        self.config_frame.watch_parameters(self.on_parameters_changed)
         
         # 机型配置数据
         self.model_a = None
         self.model_b = None
+        
+        self.connect_database()
     
     def create_widgets(self):
         """创建界面组件"""
@@ -79,6 +102,63 @@ class MainWindow:
         )
         clear_btn.pack(side=tk.LEFT, padx=5)
         
+        # 蒙特卡洛模拟按钮
+        simulate_btn = ttk.Button(
+            button_frame,
+            text="不确定性模拟",
+            command=self.run_simulation
+        )
+        simulate_btn.pack(side=tk.LEFT, padx=5)
+        
+        # 分配策略
+        ttk.Label(button_frame, text="分配策略:").pack(side=tk.LEFT, padx=(10, 0))
+        self.strategy_var = tk.StringVar(value="优先级分配")
+        strategy_combo = ttk.Combobox(
+            button_frame,
+            textvariable=self.strategy_var,
+            values=list(ALLOCATION_STRATEGIES),
+            state="readonly",
+            width=10
+        )
+        strategy_combo.pack(side=tk.LEFT, padx=5)
+        strategy_combo.bind("<<ComboboxSelected>>", lambda event: self.on_parameters_changed())
+        
+        # 定点数量计算
+        self.fixed_point_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            button_frame,
+            text="定点计算",
+            variable=self.fixed_point_var,
+            command=self.on_parameters_changed
+        ).pack(side=tk.LEFT, padx=5)
+        
+        # 实时模拟开关
+        self.live_mode_var = tk.BooleanVar(value=False)
+        live_check = ttk.Checkbutton(
+            button_frame,
+            text="实时模拟",
+            variable=self.live_mode_var,
+            command=self.toggle_live_mode
+        )
+        live_check.pack(side=tk.LEFT, padx=5)
+        
+        # 分配追溯
+        self.trace_var = tk.BooleanVar(value=False)
+        trace_check = ttk.Checkbutton(
+            button_frame,
+            text="记录分配追溯",
+            variable=self.trace_var,
+            command=self.toggle_trace
+        )
+        trace_check.pack(side=tk.LEFT, padx=5)
+        
+        export_trace_btn = ttk.Button(
+            button_frame,
+            text="导出追溯日志",
+            command=self.export_trace
+        )
+        export_trace_btn.pack(side=tk.LEFT, padx=5)
+        
         # 退出按钮
         exit_btn = ttk.Button(
             button_frame,
@@ -96,14 +176,38 @@ class MainWindow:
             anchor=tk.W
         )
         status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+    
+    def connect_database(self):
+        """在后台连接数据库，连接成功后刷新机型目录并预热最近使用机型的BOM"""
+        from database.catalog import model_catalog
+        from database.bom_cache import bom_cache
         
-        if self.db_connected:
-            self.status_var.set("数据库连接成功，系统就绪")
-        else:
-            self.status_var.set("数据库连接失败，请检查连接配置")
+        def on_done(connected, error):
+            self.db_connected = bool(connected)
+            if self.db_connected:
+                self.status_var.set("数据库连接成功，系统就绪")
+                model_catalog.refresh()
+                bom_cache.warm()
+            else:
+                self.status_var.set("数据库连接失败，请检查连接配置")
+        
+        self.status_var.set("正在连接数据库...")
+        self.run_in_background(db_manager.connect, on_done)
+    
+    def ensure_connected(self) -> bool:
+        """检查数据库是否已连接，未连接时提示用户"""
+        if not self.db_connected:
+            messagebox.showwarning("提示", "数据库尚未连接，请稍后再试")
+        return self.db_connected
     
     def execute_allocation(self):
         """执行库存分配"""
+        if not self.ensure_connected():
+            return
+        if self._live_running:
+            # 实时模拟的后台分配会替换分配器并写入同一个追溯记录，完成后再执行
+            messagebox.showinfo("提示", "实时模拟正在计算，请稍后再执行分配")
+            return
         try:
             # 获取配置数据
             config_a = self.config_frame.get_model_a_config()
@@ -115,28 +219,321 @@ class MainWindow:
             
             # 导入分配算法
             from core.allocation import InventoryAllocator
-            from core.calculator import SatisfactionCalculator
-            
-            # 创建分配器
-            allocator = InventoryAllocator(db_manager)
-            
-            # 执行分配
-            allocation_results = allocator.allocate(config_a, config_b)
+            from database.query_stats import query_stats
             
-            # 计算满足率
-            calculator = SatisfactionCalculator()
-            results = calculator.calculate_satisfaction(config_a, config_b, allocation_results)
+            with query_stats.action("执行分配") as queries:
+                # 创建分配器（只加载两个机型BOM涉及的物料库存，手动执行时总是重新读取库存；
+                # 读取失败时不保留旧的分配器）
+                self.allocator = None
+                self.allocator = self.load_allocator(
+                    None, InventoryAllocator.collect_material_codes(config_a, config_b)
+                )
+                self.allocator.trace = self.trace_recorder
+                
+                # 执行分配并计算满足率
+                results = self.run_allocation(
+                    self.allocator, config_a, config_b, **self.strategy_options()
+                )
             
             # 展示结果
             self.result_frame.display_results(results)
             
-            self.status_var.set("库存分配完成")
+            from core.result_cache import result_cache
+            from core.memory import memory_monitor
+            stats = result_cache.stats()
+            status = f"库存分配完成（{queries}；结果缓存 命中 {stats['hits']} / 未命中 {stats['misses']}）"
+            if memory_monitor.enabled:
+                status += f" 内存：{memory_monitor.summary()}"
+            self.status_var.set(status)
             messagebox.showinfo("成功", "库存分配完成！")
             
         except Exception as e:
             messagebox.showerror("错误", f"分配失败：{str(e)}")
             self.status_var.set(f"分配失败: {str(e)}")
     
+    def strategy_options(self):
+        """当前分配策略对应的分配参数"""
+        options = ALLOCATION_STRATEGIES.get(self.strategy_var.get(), {})
+        if self.fixed_point_var.get():
+            options = dict(options, fixed_point=True)
+        return options
+    
+    @staticmethod
+    def load_allocator(base_allocator, material_codes):
+        """
+        准备加载了指定物料库存的分配器（可在后台线程中调用）
+        
+        Args:
+            base_allocator: 已缓存的分配器；在其副本上补充加载库存，为 None 时新建
+            material_codes: 分配涉及的物料编码
+            
+        Returns:
+            分配器
+            
+        Raises:
+            RuntimeError: 库存加载失败
+        """
+        from core.allocation import InventoryAllocator
+        
+        if base_allocator is None:
+            allocator = InventoryAllocator(db_manager, set())
+        else:
+            allocator = base_allocator.copy()
+        if not allocator.load_missing_inventory(material_codes):
+            raise RuntimeError("加载库存数据失败")
+        return allocator
+    
+    @staticmethod
+    def run_allocation(allocator, config_a, config_b, **options):
+        """
+        执行分配并计算满足率
+        
+        Args:
+            allocator: 已加载库存的分配器
+            config_a: 机型A配置
+            config_b: 机型B配置
+            **options: 分配参数（kit_aware / optimal / fixed_point）
+            
+        Returns:
+            包含满足率的结果字典
+        """
+        from core.calculator import SatisfactionCalculator
+        from core.result_cache import result_cache, config_fingerprint
+        
+        def compute():
+            allocation_results = allocator.allocate(config_a, config_b, **options)
+            calculator = SatisfactionCalculator(options.get('fixed_point', False))
+            return calculator.calculate_satisfaction(config_a, config_b, allocation_results)
+        
+        # 记录追溯时每次都重新分配；否则相同库存版本下重复的机型配置直接返回缓存结果
+        if allocator.trace is not None:
+            return compute()
+        return result_cache.get_or_compute(
+            allocator.inventory_version,
+            config_fingerprint([config_a, config_b], options),
+            compute
+        )
+    
+    def toggle_trace(self):
+        """开启或关闭分配追溯"""
+        if self.trace_var.get():
+            from core.trace import TraceRecorder
+            if self.trace_recorder is None:
+                self.trace_recorder = TraceRecorder()
+            self.status_var.set("分配追溯已开启：之后的每次分配都会记录各物料的分配过程")
+        else:
+            self.trace_recorder = None
+            self.status_var.set("分配追溯已关闭")
+        if self.allocator is not None:
+            self.allocator.trace = self.trace_recorder
+    
+    def export_trace(self):
+        """导出分配追溯日志"""
+        if self.trace_recorder is None or not len(self.trace_recorder):
+            messagebox.showwarning("警告", "没有追溯记录，请先勾选\"记录分配追溯\"并执行分配")
+            return
+        from tkinter import filedialog
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".npz",
+            filetypes=[("追溯日志", "*.npz"), ("Parquet文件（需安装 pyarrow）", "*.parquet")],
+            initialfile=f"分配追溯_{time.strftime('%Y%m%d_%H%M%S')}.npz",
+            title="保存追溯日志"
+        )
+        if not filename:
+            return
+        try:
+            self.trace_recorder.save(filename)
+            self.status_var.set(f"追溯日志已保存（{len(self.trace_recorder)} 条决策）: {filename}")
+        except Exception as e:
+            messagebox.showerror("错误", f"导出失败：{str(e)}")
+    
+    def toggle_live_mode(self):
+        """切换实时模拟模式"""
+        if self.live_mode_var.get():
+            self.status_var.set("实时模拟已开启：修改计划数量或优先级后自动重新分配")
+            self.schedule_live_allocation()
+        else:
+            if self._live_after_id:
+                self.root.after_cancel(self._live_after_id)
+                self._live_after_id = None
+            self._live_pending = False
+            self.status_var.set("实时模拟已关闭")
+    
+    def on_parameters_changed(self):
+        """计划数量或优先级变化"""
+        if self.live_mode_var.get():
+            self.schedule_live_allocation()
+    
+    def schedule_live_allocation(self):
+        """防抖：参数停止变化 LIVE_DEBOUNCE_MS 毫秒后再重新分配"""
+        if self._live_after_id:
+            self.root.after_cancel(self._live_after_id)
+        self._live_after_id = self.root.after(LIVE_DEBOUNCE_MS, self._start_live_allocation)
+    
+    def _start_live_allocation(self):
+        """在后台线程中基于缓存的库存和BOM重新分配"""
+        self._live_after_id = None
+        if not self.db_connected:
+            return
+        if self._live_running:
+            # 上一次分配尚未完成，完成后再按最新参数执行一次
+            self._live_pending = True
+            return
+        
+        try:
+            config_a = self.config_frame.get_model_a_config()
+            config_b = self.config_frame.get_model_b_config()
+        except tk.TclError:
+            # 数量输入框内容暂时不是合法整数（正在输入）
+            return
+        if not config_a or not config_b:
+            return
+        
+        self._live_running = True
+        self._live_outcome = None
+        threading.Thread(
+            target=self._run_live_allocation,
+            args=(self.allocator, self.trace_recorder, config_a, config_b, self.strategy_options()),
+            daemon=True
+        ).start()
+        self.root.after(LIVE_POLL_MS, self._poll_live_allocation)
+    
+    def _run_live_allocation(self, allocator, trace_recorder, config_a, config_b, options):
+        """
+        后台分配线程（不访问任何界面组件，也不修改 self.allocator）
+        
+        Args:
+            allocator: 启动时的分配器；在其副本上补充加载库存，完成后由主线程替换
+            trace_recorder: 启动时的追溯记录
+            config_a: 机型A配置
+            config_b: 机型B配置
+            options: 分配参数
+        """
+        from core.allocation import InventoryAllocator
+        
+        started = time.perf_counter()
+        try:
+            material_codes = InventoryAllocator.collect_material_codes(config_a, config_b)
+            allocator = self.load_allocator(allocator, material_codes)
+            allocator.trace = trace_recorder
+            results = self.run_allocation(allocator, config_a, config_b, **options)
+            self._live_outcome = (allocator, results, None, time.perf_counter() - started)
+        except Exception as e:
+            self._live_outcome = (None, None, e, time.perf_counter() - started)
+    
+    def _poll_live_allocation(self):
+        """在主线程中取回后台分配结果并增量刷新界面"""
+        if self._live_outcome is None:
+            self.root.after(LIVE_POLL_MS, self._poll_live_allocation)
+            return
+        
+        allocator, results, error, elapsed = self._live_outcome
+        self._live_outcome = None
+        self._live_running = False
+        if allocator is not None:
+            # 后台补充加载的库存留给下一次实时分配复用；追溯设置以当前开关为准
+            allocator.trace = self.trace_recorder
+            self.allocator = allocator
+        elif error:
+            # 加载或分配失败时丢弃缓存的分配器，下一次实时分配重新读取库存
+            self.allocator = None
+        
+        if self.live_mode_var.get():
+            if error:
+                self.status_var.set(f"实时模拟失败: {str(error)}")
+            else:
+                self.result_frame.display_results(results)
+                self.status_var.set(f"实时模拟已更新（{elapsed * 1000:.0f} ms）")
+        
+        if self._live_pending:
+            self._live_pending = False
+            self.schedule_live_allocation()
+    
+    def run_in_background(self, task, on_done, poll_ms=50):
+        """
+        在后台线程中执行耗时任务，完成后在主线程回调
+        
+        Args:
+            task: 无参数的耗时函数（不得访问界面组件）
+            on_done: 回调函数 on_done(result, error)
+            poll_ms: 轮询间隔（毫秒）
+        """
+        outcome = []
+        
+        def worker():
+            try:
+                outcome.append((task(), None))
+            except Exception as e:
+                outcome.append((None, e))
+        
+        def poll():
+            if outcome:
+                on_done(*outcome[0])
+            else:
+                self.root.after(poll_ms, poll)
+        
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(poll_ms, poll)
+    
+    def run_simulation(self):
+        """对当前配置执行蒙特卡洛模拟（库存与需求误差）"""
+        if not self.ensure_connected():
+            return
+        config_a = self.config_frame.get_model_a_config()
+        config_b = self.config_frame.get_model_b_config()
+        if not config_a or not config_b:
+            messagebox.showerror("错误", "请先完善A、B机型的配置信息")
+            return
+        
+        from core.simulation import DEFAULT_SAMPLES, DEFAULT_INVENTORY_ERROR, DEFAULT_DEMAND_ERROR
+        from database.query_stats import query_stats
+        
+        # 最优分配不适合逐样本求解，模拟时按齐套分配近似
+        kit_aware = bool(ALLOCATION_STRATEGIES.get(self.strategy_var.get()))
+        base_allocator = self.allocator
+        
+        queries = None
+        
+        def task():
+            nonlocal queries
+            from core.allocation import InventoryAllocator
+            from core.scheduler import PriorityScheduler
+            from core.simulation import MonteCarloSimulator
+            
+            # 查询在后台线程执行，操作统计也在后台线程开始
+            with query_stats.action("不确定性模拟") as queries:
+                material_codes = InventoryAllocator.collect_material_codes(config_a, config_b)
+                # 在副本上补充加载库存，不与主线程或实时模拟共用的分配器冲突
+                allocator = self.load_allocator(base_allocator, material_codes)
+                scheduler = PriorityScheduler([config_a, config_b])
+                simulator = MonteCarloSimulator(
+                    scheduler,
+                    scheduler.inventory_vector(allocator.inventory_data),
+                    kit_aware=kit_aware
+                )
+                return simulator.run(DEFAULT_SAMPLES)
+        
+        def on_done(result, error):
+            if error:
+                messagebox.showerror("错误", f"模拟失败：{str(error)}")
+                self.status_var.set(f"模拟失败: {str(error)}")
+                return
+            lines = [
+                f"样本数 {result.samples}，库存误差 ±{DEFAULT_INVENTORY_ERROR:.0%}，"
+                f"需求误差 ±{DEFAULT_DEMAND_ERROR:.0%}（标准差）",
+                ""
+            ]
+            for label, row in zip(("机型 A", "机型 B"), result.summary()):
+                lines.append(
+                    f"{label} ({row['model_name']}): "
+                    f"P10 {row['p10']:.2f}%, P50 {row['p50']:.2f}%, P90 {row['p90']:.2f}%"
+                )
+            self.status_var.set(f"不确定性模拟完成（{queries}）")
+            messagebox.showinfo("满足率分布", "\n".join(lines))
+        
+        self.status_var.set("正在进行不确定性模拟...")
+        self.run_in_background(task, on_done)
+    
     def clear_all(self):
         """清空所有数据"""
         self.config_frame.clear_all()
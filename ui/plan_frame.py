@@ -0,0 +1,219 @@
+"""
+计划导入界面 - 从CSV/Excel批量导入机型计划并一次完成多机型分配
+"""
+import threading
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+from datetime import datetime
+from database.connection import db_manager
+from ui.config_frame import ALLOCATION_STRATEGIES
+from ui.table_sync import TreeviewSync
+
+
+# 库存版本下拉框中表示数据库当前库存的选项
+CURRENT_INVENTORY = "当前库存"
+
+
+class PlanImportFrame(ttk.Frame):
+    """计划导入框架"""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.result = None
+        self._outcome = None
+        self._queries = None  # 最近一次后台任务的查询汇总
+        self.create_widgets()
+
+    def create_widgets(self):
+        """创建导入和结果展示组件"""
+        button_frame = ttk.Frame(self)
+        button_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        self.import_btn = ttk.Button(
+            button_frame,
+            text="导入计划并分配",
+            command=self.import_plan
+        )
+        self.import_btn.pack(side=tk.LEFT)
+
+        ttk.Label(button_frame, text="分配策略:").pack(side=tk.LEFT, padx=(10, 0))
+        self.strategy_var = tk.StringVar(value="优先级分配")
+        ttk.Combobox(
+            button_frame,
+            textvariable=self.strategy_var,
+            values=list(ALLOCATION_STRATEGIES),
+            state="readonly",
+            width=10
+        ).pack(side=tk.LEFT, padx=5)
+
+        ttk.Label(button_frame, text="库存:").pack(side=tk.LEFT, padx=(10, 0))
+        self.as_of_var = tk.StringVar(value=CURRENT_INVENTORY)
+        self.as_of_combo = ttk.Combobox(
+            button_frame,
+            textvariable=self.as_of_var,
+            values=[CURRENT_INVENTORY],
+            postcommand=self.load_history_versions,
+            state="readonly",
+            width=16
+        )
+        self.as_of_combo.pack(side=tk.LEFT, padx=5)
+
+        self.by_partition_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            button_frame,
+            text="按分区分配",
+            variable=self.by_partition_var
+        ).pack(side=tk.LEFT, padx=5)
+
+        self.cross_partition_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            button_frame,
+            text="允许跨分区调拨",
+            variable=self.cross_partition_var
+        ).pack(side=tk.LEFT, padx=5)
+
+        self.fixed_point_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            button_frame,
+            text="定点计算",
+            variable=self.fixed_point_var
+        ).pack(side=tk.LEFT, padx=5)
+
+        export_btn = ttk.Button(
+            button_frame,
+            text="导出CSV",
+            command=self.export_to_csv
+        )
+        export_btn.pack(side=tk.LEFT, padx=5)
+
+        self.status_var = tk.StringVar(value="计划文件列：机型编码、计划数量、优先级（可选）、库区（按分区分配时必填）")
+        ttk.Label(self, textvariable=self.status_var).pack(fill=tk.X, padx=10)
+
+        result_frame = ttk.LabelFrame(self, text="计划行分配结果", padding="10")
+        result_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        columns = ("行号", "机型编码", "计划数量", "优先级", "可制造数量", "满足率", "瓶颈物料", "分区", "调入数量")
+        self.result_tree = ttk.Treeview(result_frame, columns=columns, show="headings")
+
+        for col in columns:
+            self.result_tree.heading(col, text=col)
+            self.result_tree.column(col, width=90)
+
+        result_scrollbar = ttk.Scrollbar(
+            result_frame,
+            orient=tk.VERTICAL,
+            command=self.result_tree.yview
+        )
+        self.result_tree.configure(yscrollcommand=result_scrollbar.set)
+
+        self.result_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.result_table = TreeviewSync(self.result_tree)
+        result_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        summary_frame = ttk.LabelFrame(self, text="分区汇总", padding="10")
+        summary_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        summary_columns = ("分区", "计划行数", "计划数量", "可制造数量", "满足率", "调入数量", "调出数量")
+        summary_tree = ttk.Treeview(summary_frame, columns=summary_columns, show="headings", height=5)
+        for col in summary_columns:
+            summary_tree.heading(col, text=col)
+            summary_tree.column(col, width=90)
+        summary_tree.pack(fill=tk.X)
+        self.summary_table = TreeviewSync(summary_tree)
+
+    def load_history_versions(self):
+        """展开下拉框时读取历史库存版本（最新的在前）"""
+        from core.history import inventory_history
+        versions = [version.version for version in reversed(inventory_history.versions())]
+        self.as_of_combo.configure(values=[CURRENT_INVENTORY] + versions)
+
+    def import_plan(self):
+        """选择计划文件并在后台线程中导入和分配"""
+        filename = filedialog.askopenfilename(
+            filetypes=[("计划文件", "*.xlsx *.csv"), ("所有文件", "*.*")],
+            title="选择计划文件"
+        )
+        if not filename:
+            return
+
+        from core.plan_import import PlanImporter
+        from database.query_stats import query_stats
+
+        options = dict(ALLOCATION_STRATEGIES.get(self.strategy_var.get(), {}))
+        options['by_partition'] = self.by_partition_var.get()
+        options['cross_partition'] = options['by_partition'] and self.cross_partition_var.get()
+        options['fixed_point'] = self.fixed_point_var.get()
+        if self.as_of_var.get() != CURRENT_INVENTORY:
+            options['as_of'] = self.as_of_var.get()
+        self.import_btn.state(["disabled"])
+        self.status_var.set("正在导入计划并分配...")
+        self._outcome = None
+
+        def worker():
+            with query_stats.action("计划导入") as queries:
+                try:
+                    outcome = (PlanImporter(db_manager).run(filename, **options), None)
+                except Exception as e:
+                    outcome = (None, e)
+            self._queries = queries
+            self._outcome = outcome
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.after(100, self._poll_import)
+
+    def _poll_import(self):
+        """取回后台导入结果并展示"""
+        if self._outcome is None:
+            self.after(100, self._poll_import)
+            return
+
+        result, error = self._outcome
+        self.import_btn.state(["!disabled"])
+        if error:
+            self.status_var.set(f"导入失败: {str(error)}")
+            return
+
+        self.result = result
+        self.result_table.update({
+            str(line.line_number): (
+                line.line_number, code, quantity, priority, units, f"{rate:.2f}%", bottleneck or "",
+                partition, f"{transfer:.2f}" if transfer else ""
+            )
+            for line, (code, quantity, priority, units, rate, bottleneck, partition, transfer)
+            in zip(result.lines, result.rows())
+        })
+        self.summary_table.update({
+            summary.partition: (
+                summary.partition, summary.line_count, f"{summary.plan_quantity:g}",
+                f"{summary.buildable_quantity:g}", f"{summary.satisfaction_rate:.2f}%",
+                f"{summary.transfer_in:.2f}", f"{summary.transfer_out:.2f}"
+            )
+            for summary in result.partitions
+        })
+        elapsed = sum(result.timings.values())
+        self.status_var.set(f"共 {len(result)} 个计划行，耗时 {elapsed:.2f} 秒（{self._queries}）")
+        if result.errors:
+            shown = "\n".join(result.errors[:20])
+            more = f"\n... 另有 {len(result.errors) - 20} 行" if len(result.errors) > 20 else ""
+            messagebox.showwarning("部分计划行被跳过", shown + more)
+
+    def export_to_csv(self):
+        """导出分配结果到CSV"""
+        if not self.result:
+            messagebox.showwarning("警告", "没有可导出的数据，请先导入计划")
+            return
+
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV文件", "*.csv"), ("所有文件", "*.*")],
+            initialfile=f"计划分配结果_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            title="保存导出文件"
+        )
+        if not filename:
+            return
+
+        try:
+            self.result.to_csv(filename)
+            messagebox.showinfo("成功", f"导出成功！\n文件已保存到:\n{filename}")
+        except Exception as e:
+            messagebox.showerror("错误", f"导出失败：{str(e)}")
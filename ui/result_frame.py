@@ -4,9 +4,16 @@
 import tkinter as tk
 from tkinter import ttk, filedialog
 from typing import List
-import pandas as pd
 from datetime import datetime
 from database.models import AllocationResult
+from ui.buildability_frame import BuildabilityFrame
+from ui.plan_frame import PlanImportFrame
+from ui.comparison_frame import ComparisonFrame
+from ui.table_sync import TreeviewSync
+
+# 内存预算估算：每个表格行在界面中的占用、每个导出行在 pandas 表格中的占用（字节）
+RENDER_ROW_BYTES = 1024
+EXPORT_ROW_BYTES = 2048
 
 
 class ResultFrame(ttk.Frame):
@@ -42,6 +49,18 @@ class ResultFrame(ttk.Frame):
         self.model_b_frame = ModelResultFrame(self.notebook, "机型 B")
         self.notebook.add(self.model_b_frame, text="机型 B 详情")
         
+        # 运行对比页
+        self.comparison_frame = ComparisonFrame(self.notebook)
+        self.notebook.add(self.comparison_frame, text="运行对比")
+        
+        # 可制造性报告页
+        self.buildability_frame = BuildabilityFrame(self.notebook)
+        self.notebook.add(self.buildability_frame, text="可制造性报告")
+        
+        # 计划导入页
+        self.plan_import_frame = PlanImportFrame(self.notebook)
+        self.notebook.add(self.plan_import_frame, text="计划导入")
+        
         # 初始化总览界面
         self.create_summary_view()
     
@@ -72,6 +91,7 @@ class ResultFrame(ttk.Frame):
         # 物料分配总览
         materials_frame = ttk.LabelFrame(self.summary_frame, text="物料分配总览", padding="10")
         materials_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.materials_frame = materials_frame
         
         # 创建Treeview
         columns = ("物料编码", "总库存", "机型A分配", "机型B分配", "剩余库存")
@@ -90,6 +110,7 @@ class ResultFrame(ttk.Frame):
         self.materials_tree.configure(yscrollcommand=materials_scrollbar.set)
 
         self.materials_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.materials_table = TreeviewSync(self.materials_tree)
         materials_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         # 导出按钮区域
@@ -107,7 +128,12 @@ class ResultFrame(ttk.Frame):
         self.current_results = None
     
     def display_results(self, results: dict):
-        """展示分配结果"""
+        """
+        展示分配结果（统计和表格只更新发生变化的部分）
+        
+        Args:
+            results: 分配结果字典
+        """
         # 存储当前结果用于导出
         self.current_results = results
 
@@ -117,8 +143,7 @@ class ResultFrame(ttk.Frame):
 
         # 更新统计信息
         if result_a:
-            # 计算子项物料平均满足率
-            avg_material_satisfaction_a = self._calculate_avg_material_satisfaction(result_a)
+            avg_material_satisfaction_a = result_a.material_metrics.avg_satisfaction
             stats_a = (
                 f"机型 A ({result_a.model_name}): "
                 f"计划 {result_a.plan_quantity} 台, "
@@ -126,11 +151,11 @@ class ResultFrame(ttk.Frame):
                 f"满足率 {result_a.satisfaction_rate:.2f}%, "
                 f"子项物料平均满足率 {avg_material_satisfaction_a:.2f}%"
             )
-            self.model_a_stats_var.set(stats_a)
+            if stats_a != self.model_a_stats_var.get():
+                self.model_a_stats_var.set(stats_a)
 
         if result_b:
-            # 计算子项物料平均满足率
-            avg_material_satisfaction_b = self._calculate_avg_material_satisfaction(result_b)
+            avg_material_satisfaction_b = result_b.material_metrics.avg_satisfaction
             stats_b = (
                 f"机型 B ({result_b.model_name}): "
                 f"计划 {result_b.plan_quantity} 台, "
@@ -138,85 +163,66 @@ class ResultFrame(ttk.Frame):
                 f"满足率 {result_b.satisfaction_rate:.2f}%, "
                 f"子项物料平均满足率 {avg_material_satisfaction_b:.2f}%"
             )
-            self.model_b_stats_var.set(stats_b)
+            if stats_b != self.model_b_stats_var.get():
+                self.model_b_stats_var.set(stats_b)
         
-        # 更新物料分配总览
-        self.update_materials_overview(materials)
+        from core.memory import memory_monitor
         
-        # 更新机型详情
-        if result_a:
-            self.model_a_frame.display_result(result_a)
+        with memory_monitor.stage("render"):
+            # 更新物料分配总览；内存预算不足时只展示两个机型用到的物料
+            title = "物料分配总览"
+            if not memory_monitor.fits(len(materials) * RENDER_ROW_BYTES):
+                used = set()
+                for result in (result_a, result_b):
+                    if result:
+                        used.update(result.material_metrics.material_codes)
+                materials = {code: data for code, data in materials.items() if code in used}
+                title = "物料分配总览（内存预算不足，仅展示机型用到的物料，完整数据请导出）"
+            if self.materials_frame.cget("text") != title:
+                self.materials_frame.configure(text=title)
+            self.update_materials_overview(materials)
+            
+            # 更新机型详情
+            if result_a:
+                self.model_a_frame.display_result(result_a)
+            
+            if result_b:
+                self.model_b_frame.display_result(result_b)
         
-        if result_b:
-            self.model_b_frame.display_result(result_b)
+        # 与基准运行对比
+        self.comparison_frame.add_run(results)
     
     def update_materials_overview(self, materials: dict):
         """更新物料分配总览"""
-        self.materials_tree.delete(*self.materials_tree.get_children())
-        
+        rows = {}
         for material_code, material_data in materials.items():
             total_inv = material_data.get('total_inventory', 0)
             allocated_a = material_data.get('allocated_a', 0)
             allocated_b = material_data.get('allocated_b', 0)
             remaining = total_inv - allocated_a - allocated_b
             
-            self.materials_tree.insert(
-                "",
-                tk.END,
-                values=(
-                    material_code,
-                    f"{total_inv:.2f}",
-                    f"{allocated_a:.2f}",
-                    f"{allocated_b:.2f}",
-                    f"{remaining:.2f}"
-                )
+            rows[material_code] = (
+                material_code,
+                f"{total_inv:.2f}",
+                f"{allocated_a:.2f}",
+                f"{allocated_b:.2f}",
+                f"{remaining:.2f}"
             )
+        
+        self.materials_table.update(rows)
     
     def clear_all(self):
         """清空所有结果"""
         self.model_a_stats_var.set("")
         self.model_b_stats_var.set("")
-        self.materials_tree.delete(*self.materials_tree.get_children())
+        self.materials_table.clear()
         self.model_a_frame.clear()
         self.model_b_frame.clear()
+        self.comparison_frame.clear()
         self.current_results = None
 
-    def _calculate_avg_material_satisfaction(self, result: AllocationResult) -> float:
-        """
-        计算子项物料平均满足率
-
-        Args:
-            result: 机型分配结果
-
-        Returns:
-            物料平均满足率（百分比）
-        """
-        if not result.allocated_materials or not result.bom_items:
-            return 0.0
-
-        total_satisfaction = 0.0
-        material_count = 0
-
-        # 遍历所有BOM物料
-        for bom_item in result.bom_items:
-            material_code = bom_item.component_item_number
-            required_qty = bom_item.component_num * result.plan_quantity
-            allocated_qty = result.allocated_materials.get(material_code, 0)
-
-            # 计算单个物料的满足率
-            if required_qty > 0:
-                satisfaction = min(allocated_qty / required_qty, 1.0) * 100
-                total_satisfaction += satisfaction
-                material_count += 1
-
-        # 计算平均满足率
-        if material_count > 0:
-            return total_satisfaction / material_count
-        else:
-            return 0.0
-
     def export_to_excel(self):
-        """导出物料分配详情到Excel"""
+        """导出物料分配详情到Excel（内存预算不足时改为逐行流式写入）"""
         if not self.current_results:
             from tkinter import messagebox
             messagebox.showwarning("警告", "没有可导出的数据，请先执行库存分配")
@@ -234,103 +240,112 @@ class ResultFrame(ttk.Frame):
             if not filename:
                 return
 
-            # 创建Excel writer
-            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                # 写入总览数据
-                result_a = self.current_results.get('model_a')
-                result_b = self.current_results.get('model_b')
-                materials = self.current_results.get('materials', {})
-
-                # 1. 写入分配统计
-                summary_data = []
-                if result_a:
-                    summary_data.append({
-                        '机型': '机型 A',
-                        '机型编码': result_a.model_code,
-                        '机型名称': result_a.model_name,
-                        '计划制造数量': result_a.plan_quantity,
-                        '实际可生产': result_a.allocated_quantity,
-                        '满足率(%)': f"{result_a.satisfaction_rate:.2f}"
-                    })
-                if result_b:
-                    summary_data.append({
-                        '机型': '机型 B',
-                        '机型编码': result_b.model_code,
-                        '机型名称': result_b.model_name,
-                        '计划制造数量': result_b.plan_quantity,
-                        '实际可生产': result_b.allocated_quantity,
-                        '满足率(%)': f"{result_b.satisfaction_rate:.2f}"
-                    })
-
-                pd.DataFrame(summary_data).to_excel(
-                    writer, sheet_name='分配统计', index=False
-                )
+            from core.memory import memory_monitor
 
-                # 2. 写入物料分配总览
-                materials_data = []
-                for material_code, material_data in materials.items():
-                    total_inv = material_data.get('total_inventory', 0)
-                    allocated_a = material_data.get('allocated_a', 0)
-                    allocated_b = material_data.get('allocated_b', 0)
-                    remaining = total_inv - allocated_a - allocated_b
-
-                    materials_data.append({
-                        '物料编码': material_code,
-                        '总库存': total_inv,
-                        '机型A分配': allocated_a,
-                        '机型B分配': allocated_b,
-                        '剩余库存': remaining
-                    })
-
-                pd.DataFrame(materials_data).to_excel(
-                    writer, sheet_name='物料分配总览', index=False
+            with memory_monitor.stage("export"):
+                sheets = self._export_sheets()
+                row_count = len(self.current_results.get('materials', {})) + sum(
+                    len(result.material_metrics)
+                    for result in (self.current_results.get('model_a'), self.current_results.get('model_b'))
+                    if result
                 )
-
-                # 3. 写入机型A详情
-                if result_a:
-                    model_a_data = []
-                    for material_code, allocated_qty in result_a.allocated_materials.items():
-                        required_qty = allocated_qty + result_a.shortage_materials.get(material_code, 0)
-                        shortage_qty = result_a.shortage_materials.get(material_code, 0)
-
-                        model_a_data.append({
-                            '物料编码': material_code,
-                            '需求数量': required_qty,
-                            '分配数量': allocated_qty,
-                            '短缺数量': shortage_qty
-                        })
-
-                    if model_a_data:
-                        pd.DataFrame(model_a_data).to_excel(
-                            writer, sheet_name='机型A详情', index=False
-                        )
-
-                # 4. 写入机型B详情
-                if result_b:
-                    model_b_data = []
-                    for material_code, allocated_qty in result_b.allocated_materials.items():
-                        required_qty = allocated_qty + result_b.shortage_materials.get(material_code, 0)
-                        shortage_qty = result_b.shortage_materials.get(material_code, 0)
-
-                        model_b_data.append({
-                            '物料编码': material_code,
-                            '需求数量': required_qty,
-                            '分配数量': allocated_qty,
-                            '短缺数量': shortage_qty
-                        })
-
-                    if model_b_data:
-                        pd.DataFrame(model_b_data).to_excel(
-                            writer, sheet_name='机型B详情', index=False
-                        )
+                streaming = not memory_monitor.fits(row_count * EXPORT_ROW_BYTES)
+                if streaming:
+                    self._write_streaming(filename, sheets)
+                else:
+                    self._write_with_pandas(filename, sheets)
 
             from tkinter import messagebox
-            messagebox.showinfo("成功", f"导出成功！\n文件已保存到:\n{filename}")
+            note = "\n（内存预算不足，已改为流式导出）" if streaming else ""
+            messagebox.showinfo("成功", f"导出成功！{note}\n文件已保存到:\n{filename}")
 
         except Exception as e:
             from tkinter import messagebox
             messagebox.showerror("错误", f"导出失败：{str(e)}")
 
+    def _export_sheets(self):
+        """
+        导出内容：[(工作表名, 表头, 行迭代器)]，行按需生成
+
+        Returns:
+            工作表列表
+        """
+        result_a = self.current_results.get('model_a')
+        result_b = self.current_results.get('model_b')
+        materials = self.current_results.get('materials', {})
+
+        # 1. 分配统计
+        summary_rows = [
+            (
+                label,
+                result.model_code,
+                result.model_name,
+                result.plan_quantity,
+                result.allocated_quantity,
+                f"{result.satisfaction_rate:.2f}",
+                f"{result.material_metrics.avg_satisfaction:.2f}",
+                result.material_metrics.bottleneck_material or ''
+            )
+            for label, result in (('机型 A', result_a), ('机型 B', result_b)) if result
+        ]
+        sheets = [(
+            '分配统计',
+            ('机型', '机型编码', '机型名称', '计划制造数量', '实际可生产', '满足率(%)', '子项物料平均满足率(%)', '瓶颈物料'),
+            iter(summary_rows)
+        )]
+
+        # 2. 物料分配总览
+        def material_rows():
+            for material_code, material_data in materials.items():
+                total_inv = material_data.get('total_inventory', 0)
+                allocated_a = material_data.get('allocated_a', 0)
+                allocated_b = material_data.get('allocated_b', 0)
+                yield (material_code, total_inv, allocated_a, allocated_b, total_inv - allocated_a - allocated_b)
+
+        sheets.append((
+            '物料分配总览',
+            ('物料编码', '总库存', '机型A分配', '机型B分配', '剩余库存'),
+            material_rows()
+        ))
+
+        # 3. 机型详情（直接使用计算器生成的物料指标表）
+        for sheet_name, result in (('机型A详情', result_a), ('机型B详情', result_b)):
+            if result and len(result.material_metrics):
+                sheets.append((
+                    sheet_name,
+                    ('物料编码', '需求数量', '分配数量', '短缺数量', '满足比例(%)'),
+                    (
+                        (code, required, allocated, shortage, ratio * 100)
+                        for code, required, allocated, shortage, ratio in result.material_metrics.rows()
+                    )
+                ))
+        return sheets
+
+    @staticmethod
+    def _write_with_pandas(filename, sheets):
+        """用 pandas 一次性生成各工作表"""
+        # pandas/openpyxl 只在导出时才导入，避免拖慢启动
+        import pandas as pd
+
+        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+            for sheet_name, header, rows in sheets:
+                pd.DataFrame(list(rows), columns=list(header)).to_excel(
+                    writer, sheet_name=sheet_name, index=False
+                )
+
+    @staticmethod
+    def _write_streaming(filename, sheets):
+        """用 openpyxl 只写模式逐行写入，不在内存中构建完整表格"""
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        for sheet_name, header, rows in sheets:
+            worksheet = workbook.create_sheet(sheet_name)
+            worksheet.append(list(header))
+            for row in rows:
+                worksheet.append(list(row))
+        workbook.save(filename)
+
 
 class ModelResultFrame(ttk.Frame):
     """单机型结果展示框架"""
@@ -338,6 +353,7 @@ class ModelResultFrame(ttk.Frame):
     def __init__(self, parent, model_label):
         super().__init__(parent)
         self.model_label = model_label
+        self.sensitivity_analyzer = None  # 首次展示瓶颈分析时创建（延迟导入数值计算模块）
         self.create_widgets()
     
     def create_widgets(self):
@@ -391,12 +407,42 @@ class ModelResultFrame(ttk.Frame):
         self.materials_tree.configure(yscrollcommand=materials_scrollbar.set)
         
         self.materials_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.materials_table = TreeviewSync(self.materials_tree)
         materials_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        # 瓶颈物料与补料建议
+        bottleneck_frame = ttk.LabelFrame(self, text="瓶颈物料（按建议补料顺序）", padding="10")
+        bottleneck_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        
+        self.sensitivity_var = tk.StringVar()
+        ttk.Label(bottleneck_frame, textvariable=self.sensitivity_var).pack(fill=tk.X, pady=2)
+        
+        columns = ("物料编码", "可支撑台数", "需补充数量", "补足后可生产", "多释放台数")
+        self.bottleneck_tree = ttk.Treeview(bottleneck_frame, columns=columns, show="headings", height=6)
+        
+        for col in columns:
+            self.bottleneck_tree.heading(col, text=col)
+            self.bottleneck_tree.column(col, width=100)
+        
+        bottleneck_scrollbar = ttk.Scrollbar(
+            bottleneck_frame,
+            orient=tk.VERTICAL,
+            command=self.bottleneck_tree.yview
+        )
+        self.bottleneck_tree.configure(yscrollcommand=bottleneck_scrollbar.set)
+        
+        self.bottleneck_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.bottleneck_table = TreeviewSync(self.bottleneck_tree)
+        bottleneck_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
     
     def display_result(self, result: AllocationResult):
-        """展示机型分配结果"""
-        # 计算子项物料平均满足率
-        avg_material_satisfaction = self._calculate_avg_material_satisfaction(result)
+        """
+        展示机型分配结果（统计和表格只更新发生变化的部分）
+        
+        Args:
+            result: 机型分配结果
+        """
+        metrics = result.material_metrics
 
         # 更新统计信息
         stats = (
@@ -404,69 +450,73 @@ class ModelResultFrame(ttk.Frame):
             f"计划制造数量: {result.plan_quantity} 台\n"
             f"实际可生产: {result.allocated_quantity} 台\n"
             f"满足率: {result.satisfaction_rate:.2f}%\n"
-            f"子项物料平均满足率: {avg_material_satisfaction:.2f}%"
+            f"子项物料平均满足率: {metrics.avg_satisfaction:.2f}%"
         )
-        self.stats_var.set(stats)
+        if metrics.bottleneck_material:
+            stats += (
+                f"\n瓶颈物料: {metrics.bottleneck_material} "
+                f"(满足比例 {metrics.bottleneck_ratio * 100:.2f}%)"
+            )
+        if stats != self.stats_var.get():
+            self.stats_var.set(stats)
 
         # 更新满足率进度条
         self.satisfaction_progress['value'] = result.satisfaction_rate
         self.satisfaction_label.config(text=f"{result.satisfaction_rate:.2f}%")
 
         # 更新物料分配详情
-        self.materials_tree.delete(*self.materials_tree.get_children())
-
-        for material_code, allocated_qty in result.allocated_materials.items():
-            required_qty = result.allocated_materials.get(material_code, 0) + result.shortage_materials.get(material_code, 0)
-            shortage_qty = result.shortage_materials.get(material_code, 0)
-
-            self.materials_tree.insert(
-                "",
-                tk.END,
-                values=(
-                    material_code,
-                    f"{required_qty:.2f}",
-                    f"{allocated_qty:.2f}",
-                    f"{shortage_qty:.2f}"
+        rows = {
+            material_code: (
+                material_code,
+                f"{required_qty:.2f}",
+                f"{allocated_qty:.2f}",
+                f"{shortage_qty:.2f}"
+            )
+            for material_code, required_qty, allocated_qty, shortage_qty, _ in metrics.rows()
+        }
+        self.materials_table.update(rows)
+        
+        self.display_sensitivity(result)
+    
+    def display_sensitivity(self, result: AllocationResult):
+        """展示瓶颈物料排序和补到满计划所需的补料"""
+        if self.sensitivity_analyzer is None:
+            from core.sensitivity import SensitivityAnalyzer
+            self.sensitivity_analyzer = SensitivityAnalyzer()
+        analysis = self.sensitivity_analyzer.analyze(result)
+        
+        summary = ""
+        if analysis.steps:
+            full_plan = analysis.steps[-1]
+            summary = (
+                f"补到计划 {full_plan.target_units} 台需补充 {len(full_plan.materials)} 种物料，"
+                f"合计 {full_plan.total_extra:.2f}"
+            )
+            if len(analysis.steps) > 1:
+                next_step = analysis.steps[0]
+                summary += (
+                    f"；下一档 {next_step.target_units} 台需补充 {len(next_step.materials)} 种物料，"
+                    f"合计 {next_step.total_extra:.2f}"
                 )
+        self.sensitivity_var.set(summary)
+        
+        rows = {
+            entry.material_code: (
+                entry.material_code,
+                f"{entry.supported_units:.2f}",
+                f"{entry.extra_quantity:.2f}",
+                entry.units_after,
+                entry.units_unlocked
             )
+            for entry in analysis.bottlenecks
+        }
+        self.bottleneck_table.update(rows)
 
-    def _calculate_avg_material_satisfaction(self, result: AllocationResult) -> float:
-        """
-        计算子项物料平均满足率
-
-        Args:
-            result: 机型分配结果
-
-        Returns:
-            物料平均满足率（百分比）
-        """
-        if not result.allocated_materials or not result.bom_items:
-            return 0.0
-
-        total_satisfaction = 0.0
-        material_count = 0
-
-        # 遍历所有BOM物料
-        for bom_item in result.bom_items:
-            material_code = bom_item.component_item_number
-            required_qty = bom_item.component_num * result.plan_quantity
-            allocated_qty = result.allocated_materials.get(material_code, 0)
-
-            # 计算单个物料的满足率
-            if required_qty > 0:
-                satisfaction = min(allocated_qty / required_qty, 1.0) * 100
-                total_satisfaction += satisfaction
-                material_count += 1
-
-        # 计算平均满足率
-        if material_count > 0:
-            return total_satisfaction / material_count
-        else:
-            return 0.0
-    
     def clear(self):
         """清空结果"""
         self.stats_var.set("")
         self.satisfaction_progress['value'] = 0
         self.satisfaction_label.config(text="0%")
-        self.materials_tree.delete(*self.materials_tree.get_children())
+        self.materials_table.clear()
+        self.sensitivity_var.set("")
+        self.bottleneck_table.clear()
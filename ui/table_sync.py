@@ -0,0 +1,59 @@
+"""
+表格增量刷新 - 按行键对比 Treeview 内容，只执行必要的 item/insert/delete/move
+"""
+import tkinter as tk
+from tkinter import ttk
+from typing import Dict, Tuple
+
+
+class TreeviewSync:
+    """按行键同步 Treeview 内容（行 iid 即行键）"""
+
+    def __init__(self, tree: ttk.Treeview):
+        """
+        Args:
+            tree: 目标 Treeview，其中的行只能通过本对象维护
+        """
+        self.tree = tree
+        self._rows: Dict[str, Tuple] = {}  # 当前已展示的行 {行键: values}，顺序即展示顺序
+
+    def update(self, rows: Dict[str, Tuple]):
+        """
+        将表格更新为新的行数据：删除消失的行、插入新增的行、只改写内容变化的行，
+        行顺序与 rows 不一致时再移动行
+
+        Args:
+            rows: 新的行数据 {行键: values}，按展示顺序排列
+        """
+        tree = self.tree
+        displayed = self._rows
+
+        removed = [key for key in displayed if key not in rows]
+        if removed:
+            tree.delete(*removed)
+            for key in removed:
+                del displayed[key]
+
+        for key, values in rows.items():
+            current = displayed.get(key)
+            if current is None:
+                tree.insert("", tk.END, iid=key, values=values)
+                displayed[key] = values
+            elif current != values:
+                tree.item(key, values=values)
+                displayed[key] = values
+
+        # 保留的行维持原有顺序、新增的行追加在末尾；与目标顺序不同时逐行移动
+        if list(displayed) != list(rows):
+            for index, key in enumerate(rows):
+                tree.move(key, "", index)
+            self._rows = {key: displayed[key] for key in rows}
+
+    def clear(self):
+        """清空表格"""
+        if self._rows:
+            self.tree.delete(*self._rows)
+            self._rows = {}
+
+    def __len__(self):
+        return len(self._rows)